@@ -1,9 +1,41 @@
 import bpy
+import importlib
 import json
 import time
 import os
 from datetime import datetime
 import sys
+import traceback
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
+
+from stage_timings import StageTimer
+
+ADDON_ROOT = os.path.dirname(SRC_DIR)
+for p in (ADDON_ROOT, os.path.dirname(ADDON_ROOT)):
+    if p not in sys.path:
+        sys.path.append(p)
+
+
+def load_offline_detection():
+    """ Imports the offline runner and importer through the addon package so relative imports stay valid. """
+    package = f"{os.getenv('ADDON_MODULE', 'BlendArMocap')}.src.cgt_mediapipe"
+    return (importlib.import_module(f"{package}.cgt_mp_core.mp_offline_runner"),
+            importlib.import_module(f"{package}.cgt_mp_core.mp_detection_cache"),
+            importlib.import_module(f"{package}.cgt_mp_offline_import"))
+
+
+def quit_with_error():
+    """ Logs the active exception and quits Blender with a non-zero exit code so the job fails fast. """
+    traceback.print_exc()
+    print("Detection failed, closing Blender...")
+    try:
+        bpy.ops.wm.quit_blender()
+    finally:
+        sys.exit(1)
+
 
 class BlenderMocapHandler():
     def clear_scene(self):
@@ -32,13 +64,31 @@ class BlenderMocapHandler():
         
     def check_detection_status(self):
         """Checks if the detection process has completed."""
+        try:
+            return self._check_detection_status()
+        except Exception:
+            # exceptions in timers only get printed, the job would wait for its timeout
+            if self.on_done is None:
+                quit_with_error()
+            traceback.print_exc()
+            self.on_done(None)
+            return None
+
+    def _check_detection_status(self):
         if not bpy.context.scene.cgtinker_mediapipe.modal_active:
             if not hasattr(self, "_done"):
                 self._done = True  # Prevents running multiple times
+                self.timer.stop("detection")
                 print("Detection complete")
                 print("FINISHED RUNNING -------------------------------")
-                self.get_cgt_points()
-                bpy.app.timers.register(self._exit_blender, first_interval=0.1)
+                with self.timer.stage("save_blend"):
+                    self.output = self.get_cgt_points()
+                self.timer.write(os.getenv("OUTPUT_DIR", "/shared/out"), self.collection_name)
+                if self.on_done is not None:
+                    # long-lived worker: hand the result back instead of quitting
+                    self.on_done(self.output)
+                else:
+                    bpy.app.timers.register(self._exit_blender, first_interval=0.1)
             return None  # Stop the timer
         return 0.5
 
@@ -47,12 +97,17 @@ class BlenderMocapHandler():
         try:
             bpy.ops.wm.quit_blender()
         except Exception:
-            import sys; sys.exit(0)
+            sys.exit(0)
         return None  # Just in case, to stop the new timer too
 
     # Clear the scene at the start
-    def __init__(self):
+    def __init__(self, collection_name="output", on_done=None):
         self.video_file_name = ""
+        self.collection_name = collection_name
+        # called with the saved .blend path (or None) once detection finished
+        self.on_done = on_done
+        self.timer = StageTimer()
+        self.timer.start("setup")
         # Ensure add-on is enabled
         addon_name = "BlendArMocap"
         self.output = None
@@ -67,8 +122,10 @@ class BlenderMocapHandler():
         bpy.ops.object.delete()
         bpy.context.scene.cgtinker_mediapipe.detection_input_type = "movie"
         self.clear_scene()
+        self.timer.stop("setup")
         
-    def detect(self, video_path, detection_type="POSE", key_frame_step=4, min_detection_confidence=0.5):
+    def detect(self, video_path, detection_type="POSE", key_frame_step=4, min_detection_confidence=0.5,
+               video_sha256=None):
         self.video_file_name = os.path.splitext(os.path.basename(video_path))[0]
 
         # Start detection using EXEC_DEFAULT instead of INVOKE_DEFAULT
@@ -77,26 +134,94 @@ class BlenderMocapHandler():
         bpy.context.scene.cgtinker_mediapipe.key_frame_step = key_frame_step
         bpy.context.scene.cgtinker_mediapipe.min_detection_confidence = min_detection_confidence
         print("Starting detection...")
+        # CGT_OFFLINE_DETECTION=0 falls back to the modal operator
+        if os.getenv("CGT_OFFLINE_DETECTION", "1") != "0":
+            self.detect_offline(video_path, detection_type, key_frame_step, min_detection_confidence, video_sha256)
+            return
+
+        self.timer.start("detection")
         bpy.ops.wm.cgt_feature_detection_operator('EXEC_DEFAULT')
         print("Detection complete")
         bpy.app.timers.register(self.check_detection_status, first_interval=0.5)
         print("This complete")
         # bpy.ops.wm.quit_blender()
         # output = handler.get_cgt_points()
-    
-        
-    def get_cgt_points(self):
-        """Saves the cgt_DRIVERS collection as a .blend file."""
 
-        if "--" in sys.argv:
-            idx = sys.argv.index("--")
-            collection_name = sys.argv[idx + 1]
-            print("Received collection name:", collection_name)
+    def detect_offline(self, video_path, detection_type, key_frame_step, min_detection_confidence,
+                       video_sha256=None):
+        """Detects in a tight loop instead of the modal timer, then keys the drivers in bulk.
+        Results get cached by video content and settings, a cache hit skips decoding and detection."""
+        mp_offline_runner, mp_detection_cache, cgt_mp_offline_import = load_offline_detection()
+        settings = bpy.context.scene.cgtinker_mediapipe
+        model_complexity = {
+            "HAND": settings.hand_model_complexity,
+            "HOLISTIC": settings.holistic_model_complexity,
+        }.get(detection_type, settings.pose_model_complexity)
+        out_dir = os.getenv("OUTPUT_DIR", "/shared/out")
+        os.makedirs(out_dir, exist_ok=True)
+
+        detection_settings = dict(
+            detection_type=detection_type,
+            key_frame_step=key_frame_step,
+            start_frame=bpy.context.scene.frame_current,
+            model_complexity=model_complexity,
+            min_detection_confidence=round(min_detection_confidence, 4),
+            refine_face_landmarks=bool(settings.refine_face_landmarks),
+            # long side frames get downscaled to before detection, 0 keeps the source size
+            inference_size=int(os.getenv("CGT_INFERENCE_SIZE", "0")),
+            # crop frames around the subject of the previous detection
+            roi=os.getenv("CGT_ROI_CROP", "0") == "1",
+            # skip inference on frames changing less than this since the last detection, 0 detects all
+            motion_threshold=float(os.getenv("CGT_MOTION_THRESHOLD", "0")),
+            max_skips=int(os.getenv("CGT_MAX_SKIPS", "3")),
+        )
+
+        # CGT_DETECTION_CACHE="" disables caching
+        cache_dir = os.getenv("CGT_DETECTION_CACHE", "/shared/detection_cache")
+        cache = mp_detection_cache.DetectionCache(cache_dir) if cache_dir else None
+        npz_path = key = None
+        if cache is not None:
+            with self.timer.stage("cache_lookup"):
+                key = mp_detection_cache.cache_key(
+                    video_sha256 or mp_detection_cache.hash_file(video_path), **detection_settings)
+                npz_path = cache.get(key)
+            print(f"Detection cache {'hit' if npz_path else 'miss'}: {key}")
+
+        if npz_path is None:
+            tmp_path = cache.tmp_path(key) if cache is not None \
+                else os.path.join(out_dir, f"{self.collection_name}.detection.npz")
+            with self.timer.stage("detection"):
+                npz_path = mp_offline_runner.run(
+                    video_path, tmp_path, **detection_settings,
+                    # opt-in: 0 splits long movies into one time segment per worker, n into n segments
+                    segments=int(os.getenv("CGT_DETECTION_SEGMENTS", "1")),
+                    # pooled blender workers detect at the same time, share the cores between them
+                    max_workers=max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("BLENDER_POOL_SIZE", "1")))),
+                )
+            if cache is not None:
+                npz_path = cache.put(key, npz_path)
+
+        with self.timer.stage("import"):
+            cgt_mp_offline_import.load(npz_path)
+        if cache is None:
+            os.remove(npz_path)
+        print("Detection complete")
+
+        self._done = True
+        with self.timer.stage("save_blend"):
+            self.output = self.get_cgt_points()
+        self.timer.write(out_dir, self.collection_name)
+        if self.on_done is not None:
+            self.on_done(self.output)
         else:
-            print("No custom collection name passed.")
-            return -1
+            bpy.app.timers.register(self._exit_blender, first_interval=0.1)
+
+        
+    def get_cgt_points(self):
+        """Saves the cgt_DRIVERS collection as a .blend file, returns its path or None."""
+        collection_name = self.collection_name
+        print("Received collection name:", collection_name)
 
-        import os
         out_dir = os.getenv("OUTPUT_DIR", "/shared/out")
         os.makedirs(out_dir, exist_ok=True)
         output_path = os.path.join(out_dir, f"{collection_name}.blend")
@@ -109,7 +234,7 @@ class BlenderMocapHandler():
         collection = bpy.data.collections.get("cgt_DRIVERS")
         if not collection:
             print("Collection 'cgt_DRIVERS' not found.")
-            return -1
+            return None
 
         # Create a new temporary scene
         new_scene = bpy.data.scenes.new(name="ExportScene")
@@ -121,24 +246,33 @@ class BlenderMocapHandler():
         # Save the new .blend
         bpy.ops.wm.save_as_mainfile(filepath=output_path)
         print(f"Saved 'cgt_DRIVERS' collection to {output_path}")
-
-
-    
-handler = BlenderMocapHandler()
-
-# Get args
-if "--" in sys.argv:
-    idx = sys.argv.index("--")
-    collection_name = sys.argv[idx + 1] if len(sys.argv) > idx + 1 else "output"
-    video_path = sys.argv[idx + 2] if len(sys.argv) > idx + 2 else ""
-else:
-    collection_name = "output"
-    video_path = ""
-
-print("Collection Name:", collection_name)
-print("Video Path:", video_path)
-
-handler.detect(video_path)
+        return output_path
+
+
+def parse_args():
+    """ Args: -- <collection_name> <video_path> [video_sha256] """
+    if "--" in sys.argv:
+        idx = sys.argv.index("--")
+        collection_name = sys.argv[idx + 1] if len(sys.argv) > idx + 1 else "output"
+        video_path = sys.argv[idx + 2] if len(sys.argv) > idx + 2 else ""
+        video_sha256 = sys.argv[idx + 3] if len(sys.argv) > idx + 3 else None
+    else:
+        collection_name = "output"
+        video_path = ""
+        video_sha256 = None
+    return collection_name, video_path, video_sha256
+
+
+if __name__ == "__main__":
+    collection_name, video_path, video_sha256 = parse_args()
+    print("Collection Name:", collection_name)
+    print("Video Path:", video_path)
+
+    try:
+        handler = BlenderMocapHandler(collection_name)
+        handler.detect(video_path, video_sha256=video_sha256)
+    except Exception:
+        quit_with_error()
 
 
 
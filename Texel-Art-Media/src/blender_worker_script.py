@@ -0,0 +1,162 @@
+# blender_worker_script.py
+# Long-lived Blender worker: keeps the add-on, mediapipe and cv2 loaded and runs
+# mocap / transform jobs sent by the API over a unix socket.
+#
+# Args: -- <socket_path>
+# Protocol: newline delimited JSON.
+#   worker -> api on connect: {"ready": true, "pid": <int>}
+#   api -> worker:            {"kind": "mocap" | "transform" | "transform_batch", "args": {...}}
+#   worker -> api:            {"ok": true, "output": <path | per-target results>} | {"ok": false, "error": <str>}
+import bpy, os, sys, json, socket, pathlib, traceback
+
+HERE = pathlib.Path(__file__).resolve()
+SRC_DIR = HERE.parent
+if str(SRC_DIR) not in sys.path:
+    sys.path.append(str(SRC_DIR))
+
+import addon_script
+import transform_addon_script
+
+
+def _window_override():
+    """ Timers run without a window in context, operators used by the jobs need one. """
+    window = bpy.context.window_manager.windows[0]
+    return bpy.context.temp_override(window=window, screen=window.screen)
+
+
+def reset_scene():
+    """ Drops everything the previous job left behind so jobs don't leak into each other. """
+    window = bpy.context.window_manager.windows[0]
+    base_scene = bpy.data.scenes[0]
+    window.scene = base_scene
+    for scene in list(bpy.data.scenes):
+        if scene != base_scene:
+            bpy.data.scenes.remove(scene)
+
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for datablock_list in (
+        bpy.data.collections, bpy.data.meshes, bpy.data.armatures, bpy.data.materials,
+        bpy.data.images, bpy.data.textures, bpy.data.actions, bpy.data.node_groups,
+    ):
+        for datablock in list(datablock_list):
+            try:
+                datablock_list.remove(datablock)
+            except Exception:
+                pass
+    bpy.data.orphans_purge(do_recursive=True)
+
+    base_scene.cgtinker_mediapipe.modal_active = False
+    base_scene.frame_set(1)
+
+
+class WorkerServer:
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socket_path)
+        self.server.listen(1)
+        self.server.setblocking(False)
+
+        self.conn = None
+        self.buffer = b""
+        self.busy = False
+        self.handler = None
+
+    def send(self, msg: dict):
+        self.conn.setblocking(True)
+        self.conn.sendall(json.dumps(msg).encode("utf-8") + b"\n")
+        self.conn.setblocking(False)
+
+    def poll(self):
+        """ Timer callback, accepts the api connection and picks up the next job. """
+        if self.conn is None:
+            try:
+                self.conn, _ = self.server.accept()
+            except BlockingIOError:
+                return 0.1
+            self.conn.setblocking(False)
+            self.send({"ready": True, "pid": os.getpid()})
+            return 0.05
+
+        if self.busy:
+            return 0.1
+
+        try:
+            chunk = self.conn.recv(65536)
+        except BlockingIOError:
+            return 0.05
+        if not chunk:
+            # api side went away, nothing left to serve
+            self.shutdown()
+            return None
+
+        self.buffer += chunk
+        if b"\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\n", 1)
+            self.handle(json.loads(line))
+        return 0.05
+
+    def handle(self, msg: dict):
+        kind, args = msg.get("kind"), msg.get("args", {})
+        print(f"[worker] job {kind}: {args}")
+        self.busy = True
+        try:
+            with _window_override():
+                if kind == "mocap":
+                    self.handler = addon_script.BlenderMocapHandler(args["collection_name"], on_done=self.finish_mocap)
+                    self.handler.detect(args["video_path"], video_sha256=args.get("video_sha256"))
+                    return  # finishes through the detection status timer
+                elif kind == "transform":
+                    glb_path = transform_addon_script.run_transform(
+                        args["export_name"], args["blend_input_path"],
+                        args.get("rig_path") or os.getenv("RIG_BLEND_PATH", ""),
+                        args.get("mapping_path") or os.getenv("TRANSFER_MAPPING_PATH", ""))
+                    self.finish({"ok": True, "output": glb_path})
+                elif kind == "transform_batch":
+                    results = transform_addon_script.run_batch(args["blend_input_path"], args["targets"])
+                    self.finish({"ok": True, "output": results})
+                elif kind == "shutdown":
+                    self.finish({"ok": True})
+                    self.shutdown()
+                else:
+                    self.finish({"ok": False, "error": f"Unknown job kind: {kind}"})
+        except Exception as e:
+            traceback.print_exc()
+            self.finish({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+    def finish_mocap(self, output_path):
+        if output_path:
+            self.finish({"ok": True, "output": output_path})
+        else:
+            self.finish({"ok": False, "error": "Detection produced no cgt_DRIVERS collection"})
+
+    def finish(self, reply: dict):
+        try:
+            with _window_override():
+                reset_scene()
+        except Exception:
+            traceback.print_exc()
+        self.handler = None
+        self.busy = False
+        self.send(reply)
+
+    def shutdown(self):
+        for s in (self.conn, self.server):
+            if s is not None:
+                s.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        bpy.app.timers.register(lambda: bpy.ops.wm.quit_blender(), first_interval=0.1)
+
+
+if "--" in sys.argv:
+    socket_path = sys.argv[sys.argv.index("--") + 1]
+else:
+    socket_path = os.path.join("/tmp", f"blender-worker-{os.getpid()}.sock")
+
+server = WorkerServer(socket_path)
+bpy.app.timers.register(server.poll, first_interval=0.1, persistent=True)
+print(f"[worker] listening on {socket_path}")
@@ -1,7 +1,9 @@
 import numpy as np
 import logging
 from mathutils import Euler
-from . import cgt_math
+from typing import List
+from . import cgt_math, cgt_batch_math
+from ..cgt_landmarks import LandmarkArray
 
 
 class CustomData:
@@ -18,19 +20,38 @@ class ProcessorUtils:
     data = None
     # array for comparison, as noise is present every frame values should change
     frame = 0
-    prev_rotation = {}
-    prev_sum = [0.0, 0.0]
+    # euler combat and duplicate check state, not shared between instances
+    # as parallel chains would corrupt each others results
+    prev_rotation: dict = None
+    prev_sum: list = None
+
+    def __init__(self):
+        self.prev_rotation = {}
+        self.prev_sum = [0.0, 0.0]
 
     def has_duplicated_results(self, data=None, detector_type=None, idx=0):
         """ Sums data array values and compares them each frame to avoid duplicated values
             in the timeline. This fixes duplicated frame issue mainly occurring on Windows. """
-        summed = np.sum([v[1] for v in data[:21]])
+        if isinstance(data, LandmarkArray):
+            summed = np.sum(data.points[:21])
+        else:
+            summed = np.sum([v[1] for v in data[:21]])
         if summed == self.prev_sum[idx]:
             return True
 
         self.prev_sum[idx] = summed
         return False
 
+    def unique_frames(self, points: np.ndarray, idx: int = 0) -> np.ndarray:
+        """ has_duplicated_results over (T, N, 3) points, returns a (T,) mask of the frames to keep. """
+        sums = np.sum(points[:, :21], axis=(1, 2))
+        keep = np.ones(len(sums), dtype=bool)
+        if len(sums):
+            keep[0] = sums[0] != self.prev_sum[idx]
+            keep[1:] = sums[1:] != sums[:-1]
+            self.prev_sum[idx] = sums[-1]
+        return keep
+
     def quart_to_euler_combat(self, quart, idx, idx_offset=0, axis='XYZ'):
         """ Converts quart to euler rotation while comparing with previous rotation. """
         if len(self.prev_rotation) > 0:
@@ -86,3 +107,29 @@ class ProcessorUtils:
             self.prev_rotation[prev_rot_idx] = self.offset_euler(euler_rot, offset)
             return self.prev_rotation[prev_rot_idx]
 
+    def euler_tracks(self, quats: np.ndarray, keys: List[int], offsets: np.ndarray = None) -> np.ndarray:
+        """ try_get_euler over (T, K, 4) quaternions of the prev_rotation keys in one vectorized pass.
+            Offsets (K, 3) are applied like try_get_euler's offset, the tracks continue from and
+            update prev_rotation so batches and per frame updates can be mixed. """
+        n = len(quats)
+        eulers = np.empty(quats.shape[:-1] + (3,))
+        if n == 0:
+            return eulers
+
+        prev = np.zeros((len(keys), 3))
+        first = np.zeros(len(keys), dtype=bool)
+        for k, key in enumerate(keys):
+            if key in self.prev_rotation:
+                prev[k] = self.prev_rotation[key]
+            else:
+                first[k] = True
+
+        # rotations without previous data start without offset
+        start = cgt_batch_math.quat_to_euler(quats[0])
+        eulers[0] = cgt_batch_math.euler_track(quats[:1], prev, offsets)[0]
+        eulers[0, first] = start[first]
+        eulers[1:] = cgt_batch_math.euler_track(quats[1:], eulers[0], offsets)
+
+        for key, euler in zip(keys, eulers[-1]):
+            self.prev_rotation[key] = Euler(euler)
+        return eulers
@@ -0,0 +1,409 @@
+""" Batched numpy equivalents of the mathutils rotation helpers used by the calculators.
+Arrays are (N, ...) stacks, quaternions are (w, x, y, z) and eulers use the XYZ order.
+Matrices are indexed m[..., row, col] like mathutils, the private helpers work on
+blender's internal column major layout m[..., col, row]. Results match mathutils
+within float32 precision, the manual tests check it: python cgt_batch_math.py """
+from __future__ import annotations
+from typing import Optional
+
+import numpy as np
+
+_TRACK_AXES = {'X': 0, 'Y': 1, 'Z': 2, '-X': 3, '-Y': 4, '-Z': 5}
+_UP_AXES = {'X': 0, 'Y': 1, 'Z': 2}
+_PI_X2 = 2 * np.pi
+
+
+# region vector
+def project_on_plane(vec: np.ndarray, normal: np.ndarray) -> np.ndarray:
+    """ Removes the normal component of vec, the normal does not have to be unit length. """
+    dot = np.sum(vec * normal, axis=-1, keepdims=True)
+    return vec - normal * dot / np.sum(normal * normal, axis=-1, keepdims=True)
+
+
+def vector_angle(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Unsigned angle between vectors, stable for (anti-)parallel vectors unlike arccos. """
+    return np.arctan2(np.linalg.norm(np.cross(a, b), axis=-1), np.sum(a * b, axis=-1))
+
+
+# endregion
+
+
+# region quaternion
+def quat_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Hamilton product a * b. """
+    a0, a1, a2, a3 = np.moveaxis(a, -1, 0)
+    b0, b1, b2, b3 = np.moveaxis(b, -1, 0)
+    return np.stack([
+        a0 * b0 - a1 * b1 - a2 * b2 - a3 * b3,
+        a0 * b1 + a1 * b0 + a2 * b3 - a3 * b2,
+        a0 * b2 + a2 * b0 + a3 * b1 - a1 * b3,
+        a0 * b3 + a3 * b0 + a1 * b2 - a2 * b1,
+    ], axis=-1)
+
+
+def quat_invert(q: np.ndarray) -> np.ndarray:
+    return q * (1, -1, -1, -1) / np.sum(q * q, axis=-1, keepdims=True)
+
+
+def quat_normalize(q: np.ndarray) -> np.ndarray:
+    length = np.linalg.norm(q, axis=-1, keepdims=True)
+    return np.divide(q, length, out=np.tile([1., 0., 0., 0.], q.shape[:-1] + (1,)), where=length > 0)
+
+
+def _quat_to_mat3(q: np.ndarray) -> np.ndarray:
+    """ Rotation matrices m[..., col, row] of unit quaternions. """
+    q0, q1, q2, q3 = np.moveaxis(np.sqrt(2) * q, -1, 0)
+    qda, qdb, qdc = q0 * q1, q0 * q2, q0 * q3
+    qaa, qab, qac = q1 * q1, q1 * q2, q1 * q3
+    qbb, qbc, qcc = q2 * q2, q2 * q3, q3 * q3
+    m = np.empty(q.shape[:-1] + (3, 3))
+    m[..., 0, 0] = 1 - qbb - qcc
+    m[..., 0, 1] = qdc + qab
+    m[..., 0, 2] = -qdb + qac
+    m[..., 1, 0] = -qdc + qab
+    m[..., 1, 1] = 1 - qaa - qcc
+    m[..., 1, 2] = qda + qbc
+    m[..., 2, 0] = qdb + qac
+    m[..., 2, 1] = -qda + qbc
+    m[..., 2, 2] = 1 - qaa - qbb
+    return m
+
+
+def track_quat(vec: np.ndarray, track: str = 'Z', up: str = 'Y') -> np.ndarray:
+    """ Vector.to_track_quat: rotations pointing the track axis along vec,
+    keeping the up axis as upright as possible. Zero vectors give identity. """
+    vec = np.asarray(vec, dtype=np.float64)
+    axis, upflag = _TRACK_AXES[track], _UP_AXES[up]
+    if axis % 3 == upflag:
+        raise ValueError("Can't have the same axis for track and up")
+
+    # vec_to_quat expects the vector from the target, negative tracks flip it back
+    tvec = -vec if axis > 2 else vec
+    axis %= 3
+    length = np.linalg.norm(tvec, axis=-1)
+    safe_length = np.where(length == 0, 1., length)
+
+    # rotation axis perpendicular to the track axis and the vector
+    eps = 1e-4
+    x, y, z = np.moveaxis(tvec, -1, 0)
+    nor = np.zeros(tvec.shape)
+    if axis == 0:
+        nor[..., 1], nor[..., 2] = -z, y
+        nor[..., 1] = np.where(np.abs(y) + np.abs(z) < eps, 1., nor[..., 1])
+        co = x
+    elif axis == 1:
+        nor[..., 0], nor[..., 2] = z, -x
+        nor[..., 2] = np.where(np.abs(x) + np.abs(z) < eps, 1., nor[..., 2])
+        co = y
+    else:
+        nor[..., 0], nor[..., 1] = -y, x
+        nor[..., 0] = np.where(np.abs(x) + np.abs(y) < eps, 1., nor[..., 0])
+        co = z
+    co = co / safe_length
+    nor /= np.linalg.norm(nor, axis=-1, keepdims=True)
+
+    half = .5 * np.arccos(np.clip(co, -1, 1))
+    q = np.concatenate([np.cos(half)[..., None], nor * np.sin(half)[..., None]], axis=-1)
+
+    # roll around the track axis so up points up
+    fp = _quat_to_mat3(q)[..., 2, :]
+    if axis == 0:
+        angle = .5 * np.arctan2(fp[..., 2], fp[..., 1]) if upflag == 1 else -.5 * np.arctan2(fp[..., 1], fp[..., 2])
+    elif axis == 1:
+        angle = -.5 * np.arctan2(fp[..., 2], fp[..., 0]) if upflag == 0 else .5 * np.arctan2(fp[..., 0], fp[..., 2])
+    else:
+        angle = .5 * np.arctan2(-fp[..., 1], -fp[..., 0]) if upflag == 0 else -.5 * np.arctan2(-fp[..., 0], -fp[..., 1])
+    si = np.sin(angle) / safe_length
+    q2 = np.concatenate([np.cos(angle)[..., None], tvec * si[..., None]], axis=-1)
+    q = quat_multiply(q2, q)
+
+    q[length == 0] = (1, 0, 0, 0)
+    return q
+
+
+# endregion
+
+
+# region matrix
+def _is_negative(m: np.ndarray) -> np.ndarray:
+    return np.einsum('...i,...i->...', np.cross(m[..., 0, :], m[..., 1, :]), m[..., 2, :]) < 0
+
+
+def _mat3_normalized_to_quat(m: np.ndarray) -> np.ndarray:
+    """ Quaternions of matrices with unit columns m[..., col, row], negative matrices get negated first. """
+    m = np.where(_is_negative(m)[..., None, None], -m, m)
+    q = np.empty(m.shape[:-2] + (4,))
+
+    m00, m01, m02 = m[..., 0, 0], m[..., 0, 1], m[..., 0, 2]
+    m10, m11, m12 = m[..., 1, 0], m[..., 1, 1], m[..., 1, 2]
+    m20, m21, m22 = m[..., 2, 0], m[..., 2, 1], m[..., 2, 2]
+
+    # each branch solves for its largest component, s keeps w positive
+    cases = [
+        ((m22 < 0) & (m00 > m11), 1 + m00 - m11 - m22, m12 < m21, 1,
+         ((0, m12 - m21), (2, m01 + m10), (3, m20 + m02))),
+        ((m22 < 0) & (m00 <= m11), 1 - m00 + m11 - m22, m20 < m02, 2,
+         ((0, m20 - m02), (1, m01 + m10), (3, m12 + m21))),
+        ((m22 >= 0) & (m00 < -m11), 1 - m00 - m11 + m22, m01 < m10, 3,
+         ((0, m01 - m10), (1, m20 + m02), (2, m12 + m21))),
+        ((m22 >= 0) & (m00 >= -m11), 1 + m00 + m11 + m22, np.zeros(m00.shape, dtype=bool), 0,
+         ((1, m12 - m21), (2, m20 - m02), (3, m01 - m10))),
+    ]
+    for mask, trace, flip, main, others in cases:
+        if not np.any(mask):
+            continue
+        s = 2 * np.sqrt(np.maximum(trace[mask], 0))
+        s = np.where(flip[mask], -s, s)
+        q[mask, main] = .25 * s
+        inv = np.divide(1, s, out=np.zeros_like(s), where=s != 0)
+        for idx, value in others:
+            q[mask, idx] = value[mask] * inv
+
+    length_sq = np.sum(q * q, axis=-1)
+    return np.where((np.abs(length_sq - 1) >= 6e-4)[..., None], quat_normalize(q), q)
+
+
+def matrix_to_quat(matrix: np.ndarray) -> np.ndarray:
+    """ Rotations of (N, 3, 3) matrices, like Matrix.to_quaternion() and the rotation of Matrix.decompose().
+    Scaled axes get normalized, non orthogonal matrices give blender's approximation. """
+    m = np.swapaxes(np.asarray(matrix, dtype=np.float64), -1, -2)
+    m = m / np.linalg.norm(m, axis=-1, keepdims=True)
+    return _mat3_normalized_to_quat(m)
+
+
+def quat_to_matrix(q: np.ndarray) -> np.ndarray:
+    """ (N, 3, 3) rotation matrices of unit quaternions, like Quaternion.to_matrix(). """
+    return np.swapaxes(_quat_to_mat3(np.asarray(q, dtype=np.float64)), -1, -2)
+
+
+# endregion
+
+
+# region euler
+def _mat3_to_euler_pair(m: np.ndarray) -> np.ndarray:
+    """ Both XYZ euler solutions (N, 2, 3) of rotation matrices m[..., col, row]. """
+    cy = np.hypot(m[..., 0, 0], m[..., 0, 1])
+    regular = cy > 16 * np.finfo(np.float32).eps
+    eul = np.empty(m.shape[:-2] + (2, 3))
+    eul[..., 0, 0] = np.where(regular, np.arctan2(m[..., 1, 2], m[..., 2, 2]), np.arctan2(-m[..., 2, 1], m[..., 1, 1]))
+    eul[..., 0, 1] = np.arctan2(-m[..., 0, 2], cy)
+    eul[..., 0, 2] = np.where(regular, np.arctan2(m[..., 0, 1], m[..., 0, 0]), 0.)
+    eul[..., 1, 0] = np.where(regular, np.arctan2(-m[..., 1, 2], -m[..., 2, 2]), eul[..., 0, 0])
+    eul[..., 1, 1] = np.where(regular, np.arctan2(-m[..., 0, 2], -cy), eul[..., 0, 1])
+    eul[..., 1, 2] = np.where(regular, np.arctan2(-m[..., 0, 1], -m[..., 0, 0]), 0.)
+    return eul
+
+
+def quat_to_euler_pair(q: np.ndarray) -> np.ndarray:
+    """ Both euler solutions (N, 2, 3) of quaternions. """
+    return _mat3_to_euler_pair(_quat_to_mat3(quat_normalize(np.asarray(q, dtype=np.float64))))
+
+
+def euler_to_quat(euler: np.ndarray) -> np.ndarray:
+    """ Quaternions of XYZ eulers, like Euler.to_quaternion(). """
+    half = np.asarray(euler, dtype=np.float64) * .5
+    ci, cj, ch = np.moveaxis(np.cos(half), -1, 0)
+    si, sj, sh = np.moveaxis(np.sin(half), -1, 0)
+    cc, cs, sc, ss = ci * ch, ci * sh, si * ch, si * sh
+    return np.stack([cj * cc + sj * ss, cj * sc - sj * cs, cj * ss + sj * cc, cj * cs - sj * sc], axis=-1)
+
+
+def compatible_euler(eul: np.ndarray, old: np.ndarray) -> np.ndarray:
+    """ Moves eulers by full turns towards old, like blender's compatible_eul. """
+    eul = np.array(eul, dtype=np.float64)
+    d = eul - old
+    eul = np.where(d > np.pi, eul - np.floor(d / _PI_X2 + .5) * _PI_X2, eul)
+    eul = np.where(d < -np.pi, eul + np.floor(-d / _PI_X2 + .5) * _PI_X2, eul)
+    d = eul - old
+
+    # one axis off by more than half a turn while the others are within a quarter
+    large, small = np.abs(d) > np.pi, np.abs(d) < np.pi / 2
+    for i, (j, k) in enumerate(((1, 2), (0, 2), (0, 1))):
+        turn = large[..., i] & small[..., j] & small[..., k]
+        eul[..., i] -= np.where(turn, np.sign(d[..., i]) * _PI_X2, 0.)
+    return eul
+
+
+def _pick_compatible(pair: np.ndarray, old: np.ndarray) -> np.ndarray:
+    """ The compatible solution of an euler pair (..., 2, 3) closest to old (..., 3). """
+    old = old[..., None, :]
+    pair = compatible_euler(pair, old)
+    d = np.sum(np.abs(pair - old), axis=-1)
+    return np.where((d[..., 0] > d[..., 1])[..., None], pair[..., 1, :], pair[..., 0, :])
+
+
+def quat_to_euler(q: np.ndarray, compat: Optional[np.ndarray] = None) -> np.ndarray:
+    """ Quaternion.to_euler('XYZ', compat) per element, compat defaults to no rotation. """
+    pair = quat_to_euler_pair(q)
+    if compat is None:
+        compat = np.zeros(pair.shape[:-2] + (3,))
+    return _pick_compatible(pair, np.asarray(compat, dtype=np.float64))
+
+
+def matrix_to_euler(matrix: np.ndarray, compat: Optional[np.ndarray] = None) -> np.ndarray:
+    """ Matrix.to_euler('XYZ', compat) per element, compat defaults to no rotation. """
+    m = np.swapaxes(np.asarray(matrix, dtype=np.float64), -1, -2)
+    pair = _mat3_to_euler_pair(m / np.linalg.norm(m, axis=-1, keepdims=True))
+    if compat is None:
+        compat = np.zeros(pair.shape[:-2] + (3,))
+    return _pick_compatible(pair, np.asarray(compat, dtype=np.float64))
+
+
+def offset_euler(euler: np.ndarray, offset) -> np.ndarray:
+    """ Offsets eulers by multiples of pi. """
+    return euler + np.pi * np.asarray(offset, dtype=np.float64)
+
+
+def _wrap(d: np.ndarray) -> np.ndarray:
+    """ Differences moved by full turns into [-pi, pi), the first step of compatible_euler. """
+    return d - np.floor(d / _PI_X2 + .5) * _PI_X2
+
+
+def euler_track(quats: np.ndarray, prev: np.ndarray, offset: Optional[np.ndarray] = None) -> np.ndarray:
+    """ Converts (T, K, 4) quaternions to (T, K, 3) eulers, every frame compatible to the one
+    before, starting from prev (K, 3). Offsets (K, 3) get removed for the comparison
+    and added to the results, as calc_utils.ProcessorUtils.try_get_euler does. """
+    shift = np.zeros(3) if offset is None else np.pi * np.asarray(offset, dtype=np.float64)
+    old = np.asarray(prev, dtype=np.float64) - shift
+    n, k = quats.shape[:2]
+    if n == 0:
+        return np.empty((0, k, 3))
+
+    # compatible eulers differ from the previous one by less than half a turn per axis, which
+    # leaves picking one of the two solutions per frame. Differences to the previous frame
+    # don't depend on its full turns, so the pick only depends on the previous pick.
+    pairs = quat_to_euler_pair(quats)
+    first = _wrap(pairs[0] - old[:, None])
+    deltas = _wrap(pairs[1:, :, None, :, :] - pairs[:-1, :, :, None, :])
+    costs = np.sum(np.abs(deltas), axis=-1)
+    picks = costs[..., 0] > costs[..., 1]
+
+    rows = np.arange(k)
+    branch = np.empty((n, k), dtype=np.intp)
+    first_costs = np.sum(np.abs(first), axis=-1)
+    branch[0] = first_costs[:, 0] > first_costs[:, 1]
+    for t in range(1, n):
+        branch[t] = picks[t - 1, rows, branch[t - 1]]
+
+    steps = np.empty((n, k, 3))
+    steps[0] = first[rows, branch[0]]
+    steps[1:] = deltas[np.arange(n - 1)[:, None], rows, branch[:-1], branch[1:]]
+    return old + np.cumsum(steps, axis=0) + shift
+
+
+# endregion
+
+
+# region manual tests
+def _rotation_error(a: np.ndarray, b: np.ndarray) -> float:
+    """ Largest difference of quaternions describing the same rotation, q and -q are equal. """
+    return np.minimum(np.abs(a - b).max(axis=-1), np.abs(a + b).max(axis=-1)).max()
+
+
+def _check_invariants(rng, n: int, tol: float = 1e-9):
+    """ Checks needing numpy only, they run outside of blender. """
+    vecs, normals = rng.normal(size=(n, 3)), rng.normal(size=(n, 3))
+    quats, compats = rng.normal(size=(n, 4)), rng.uniform(-4 * np.pi, 4 * np.pi, size=(n, 3))
+    units = quat_normalize(quats)
+
+    assert np.abs(np.linalg.norm(units, axis=-1) - 1).max() < tol, "quat_normalize: not unit length"
+    assert (quat_normalize(np.zeros((1, 4))) == (1, 0, 0, 0)).all(), "quat_normalize: zero length"
+    identity = np.tile([1., 0., 0., 0.], (n, 1))
+    assert _rotation_error(quat_multiply(units, quat_invert(units)), identity) < tol, "quat_invert"
+
+    # matrices are orthonormal rotations and round trip to the same quaternion
+    mats = quat_to_matrix(units)
+    assert np.abs(mats @ np.swapaxes(mats, -1, -2) - np.eye(3)).max() < tol, "quat_to_matrix: not orthonormal"
+    assert np.abs(np.linalg.det(mats) - 1).max() < tol, "quat_to_matrix: not a rotation"
+    assert _rotation_error(matrix_to_quat(mats), units) < tol, "matrix_to_quat round trip"
+    assert _rotation_error(matrix_to_quat(mats * rng.uniform(.1, 10, size=(n, 1, 3))), units) < tol, \
+        "matrix_to_quat: scaled axes"
+    assert np.abs(quat_to_matrix(quat_multiply(units, units[::-1])) - mats @ mats[::-1]).max() < tol, \
+        "quat_multiply: doesn't compose like matrices"
+
+    # eulers describe the same rotation and stay compatible
+    eulers = quat_to_euler(quats, compats)
+    assert _rotation_error(euler_to_quat(eulers), units) < tol, "quat_to_euler round trip"
+    assert np.abs(matrix_to_euler(mats, compats) - eulers).max() < 1e-6, "matrix_to_euler: differs from quats"
+    assert np.abs(compatible_euler(eulers + _PI_X2 * rng.integers(-3, 4, size=(n, 3)), compats) - eulers).max() \
+        < 1e-6, "compatible_euler: full turns"
+
+    # vectorized tracks match converting frame by frame, compatible to the previous result
+    walk = np.cumsum(rng.normal(size=(n, 2, 4)) * .15, axis=0) + 1
+    prev, offset = compats[:2], np.array([[0, 0, 0], [-.5, 0, 0]])
+    tracks = euler_track(walk, prev, offset)
+    expected = np.empty_like(tracks)
+    for t in range(n):
+        prev = expected[t] = offset_euler(quat_to_euler(walk[t], offset_euler(prev, -offset)), offset)
+    assert np.abs(tracks - expected).max() < 1e-6, "euler_track: differs from frame by frame"
+    assert _rotation_error(euler_to_quat(offset_euler(tracks, -offset)), quat_normalize(walk)) < tol, \
+        "euler_track: rotation changed"
+
+    # track quats point the track axis along the vector
+    axes = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1], [-1, 0, 0], [0, -1, 0], [0, 0, -1]])
+    for track, idx in _TRACK_AXES.items():
+        for up in _UP_AXES:
+            if track[-1] == up:
+                continue
+            pointing = quat_to_matrix(track_quat(vecs, track, up)) @ axes[idx]
+            assert np.abs(pointing - vecs / np.linalg.norm(vecs, axis=-1, keepdims=True)).max() < 1e-6, \
+                f"track_quat {track} {up}"
+
+    projected = project_on_plane(vecs, normals)
+    assert np.abs(np.sum(projected * normals, axis=-1)).max() < tol, "project_on_plane: normal component left"
+    unit_vecs = vecs / np.linalg.norm(vecs, axis=-1, keepdims=True)
+    unit_normals = normals / np.linalg.norm(normals, axis=-1, keepdims=True)
+    expected = np.arccos(np.clip(np.sum(unit_vecs * unit_normals, axis=-1), -1, 1))
+    assert np.abs(vector_angle(vecs, normals) - expected).max() < 1e-6, "vector_angle"
+    assert np.abs(vector_angle(vecs, -2 * vecs) - np.pi).max() < tol, "vector_angle: anti-parallel"
+
+
+def _check_mathutils(rng, n: int, tol: float = 1e-5):
+    """ Compares against mathutils within its float32 precision. """
+    from mathutils import Euler, Matrix, Quaternion, Vector
+
+    vecs, quats, mats = rng.normal(size=(n, 3)), rng.normal(size=(n, 4)), rng.normal(size=(n, 3, 3))
+    compats = rng.uniform(-4 * np.pi, 4 * np.pi, size=(n, 3))
+
+    for track in _TRACK_AXES:
+        for up in _UP_AXES:
+            if track[-1] == up:
+                continue
+            expected = np.array([Vector(v).to_track_quat(track, up) for v in vecs])
+            assert _rotation_error(track_quat(vecs, track, up), expected) < tol, f"track_quat {track} {up}"
+
+    expected = np.array([Matrix(m).to_quaternion() for m in mats])
+    assert _rotation_error(matrix_to_quat(mats), expected) < tol, "matrix_to_quat"
+    expected = np.array([Quaternion(q).to_matrix() for q in quats])
+    assert np.abs(quat_to_matrix(quats) - expected).max() < tol, "quat_to_matrix"
+    expected = np.array([Euler(e).to_quaternion() for e in compats])
+    assert _rotation_error(euler_to_quat(compats), expected) < tol, "euler_to_quat"
+    expected = np.array([Quaternion(q).to_euler('XYZ', Euler(c)) for q, c in zip(quats, compats)])
+    assert np.abs(quat_to_euler(quats, compats) - expected).max() < tol, "quat_to_euler"
+    expected = np.array([Matrix(m).to_euler('XYZ', Euler(c)) for m, c in zip(mats, compats)])
+    assert np.abs(matrix_to_euler(mats, compats) - expected).max() < tol, "matrix_to_euler"
+
+    # random walk of two rotations, the second one offset like the torso
+    walk = np.cumsum(rng.normal(size=(n, 2, 4)) * .15, axis=0) + 1
+    prev, offset = compats[:2], np.array([[0, 0, 0], [-.5, 0, 0]])
+    expected = np.empty((n, 2, 3))
+    for k in range(2):
+        euler = Euler(prev[k])
+        for t in range(n):
+            compat = Euler(np.array(euler) - np.pi * offset[k])
+            euler = Euler(np.array(Quaternion(walk[t, k]).to_euler('XYZ', compat)) + np.pi * offset[k])
+            expected[t, k] = euler
+    assert np.abs(euler_track(walk, prev, offset) - expected).max() < tol, "euler_track"
+
+
+if __name__ == '__main__':
+    # python cgt_batch_math.py, the mathutils comparison needs blender's python or the bpy module
+    _check_invariants(np.random.default_rng(0), 2000)
+    try:
+        import mathutils
+    except ImportError:
+        print("mathutils not available, skipped the comparison")
+    else:
+        _check_mathutils(np.random.default_rng(0), 2000)
+    print("cgt_batch_math checks passed")
+# endregion
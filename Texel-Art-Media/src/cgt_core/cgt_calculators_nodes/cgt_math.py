@@ -1,6 +1,7 @@
 import numpy as np
 from mathutils import Euler, Matrix, Vector, Quaternion
 from math import radians
+from . import cgt_batch_math
 
 
 # region vector cgt_utils
@@ -473,9 +474,8 @@ def try_get_euler(quart_rotation, offset: [], prev_rot_idx: int = -1, prev_rotat
     return offset_euler(m_rot, offset)
 
 # endregion
-# region manual numpy implementation (slower than mathutils)
+# region numpy implementation (cgt_batch_math, also takes (N, ...) arrays)
 def _generate_matrix(tangent: np.array, normal: np.array, binormal: np.array):
-    # not tested
     """ generate a numpy matrix at loc [0, 0, 0]. """
     matrix = np.array([
         [tangent[0], tangent[1], tangent[2], 0],
@@ -485,119 +485,36 @@ def _generate_matrix(tangent: np.array, normal: np.array, binormal: np.array):
     return matrix
 
 
-def _decompose_matrix(matrix: np.matrix):
-    # not tested
-    """ manual decompose a matrix (still in development) """
-    # location -> last column of matrix
-    loc = np.array(matrix[:3, 3:4])
-
-    # scale -> length of the first the column vectors
-    sx = vector_length(np.array(matrix[:3, 0:1]))
-    sy = vector_length(np.array(matrix[:3, 1:2]))
-    sz = vector_length(np.array(matrix[:3, 2:3]))
-    sca = np.array([sx, sy, sz])
-
-    # rotation -> divide first three column vectors by the scaling factors
-    # todo: fix for negative scale and apply shear
-    c1 = matrix[:3, 0:1] / sx
-    c2 = matrix[:3, 1:2] / sy
-    c3 = matrix[:3, 2:3] / sz
-
-    # recreate matrix (loc = [0, 0, 0]
-    rotation_matrix = np.matrix([np.append(col, [v]) for col, v in
-                                 [[c1, 0], [c2, 0], [c3, 0], [loc, 1]]])
-    quat = matrix3x3_to_quaternion(rotation_matrix)
+def _decompose_matrix(matrix: np.array):
+    """ returns loc, quaternion (w, x, y, z) and scale of a 4x4 matrix like Matrix.decompose() """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    loc = matrix[:3, 3]
+    # scale -> length of the column vectors, negative if the matrix flips
+    sca = np.linalg.norm(matrix[:3, :3], axis=0)
+    if np.linalg.det(matrix[:3, :3]) < 0:
+        sca = -sca
+    quat = cgt_batch_math.matrix_to_quat(matrix[:3, :3])
     return [loc, quat, sca]
 
 
 def euler_to_quaternion(yaw, pitch, roll):
-    # not tested
-    """ manual to euler conversion using np """
-    # slower than mathutils
-    cy = np.cos(yaw * .5)
-    sy = np.sin(yaw * .5)
-    cp = np.cos(pitch * .5)
-    sp = np.sin(pitch * .5)
-    cr = np.cos(roll * .5)
-    sr = np.sin(roll * .5)
-
-    w = cr * cp * cy + sr * sp * sy
-    x = sr * cp * cy - cr * sp * sy
-    y = cr * sp * cy + sr * cp * sy
-    z = cr * cp * sy - sr * sp * cy
-
-    quart = np.array([w, z, y, x])
-    return quart
-
-
-def quaternion_to_euler(q: np.array) -> np.array:
-    # not tested
-    """ Manual quaternion q (w, x, y, z) to euler conversion
-    https://en.wikipedia.org/wiki/Conversion_between_quaternions_and_Euler_angles
-    """
-    # x axis roll
-    sinr_cosp = 2 * (q[0] * q[1] + q[2] * q[3])
-    cosr_cosp = 1 - 2 * (q[1] * q[1] + q[2] * q[2])
-    roll = np.atan2(sinr_cosp, cosr_cosp)
-
-    # y axis pitch
-    sinp = 2 * (q[0] * q[1] - q[3] * q[1])
-    if abs(sinp) >= 1:
-        pitch = np.copysign(np.pi / 2, sinp)  # use 90 degrees if out of range
-    else:
-        pitch = np.asin(sinp)
-
-    # z axis yaw
-    siny_cosp = 2 * (q[0] * q[3] + q[1] * q[2])
-    cosy_cosp = 1 - 2 * (q[2] * q[2] + q[3] * q[3])
-    yaw = np.atan2(siny_cosp, cosy_cosp)
+    """ roll (x), pitch (y) and yaw (z) radians to quaternion (w, x, y, z) """
+    return cgt_batch_math.euler_to_quat(np.array([roll, pitch, yaw]))
 
-    angles = np.array(pitch, yaw, roll)
-    return angles
 
+def quaternion_to_euler(q: np.array, combat: np.array = None) -> np.array:
+    """ quaternion q (w, x, y, z) to euler x, y, z, closest to the combat rotation if given """
+    return cgt_batch_math.quat_to_euler(np.asarray(q), combat)
 
-def matrix3x3_to_quaternion(m: np.matrix):
-    # blender formality xzy
-    """ Returns quaternion from 3x3 matrix. """
-    if m[2, 2] < 0:
-        if m[0, 0] > m[1, 1]:
-            t = 1 + m[0, 0] - m[1, 1] - m[2, 2]
-            q = [t, m[0, 1] + m[1, 0], m[2, 0] + m[0, 2], m[1, 2] - m[2, 1]]
-        else:
-            t = 1 - m[0, 0] + m[1, 1] - m[2, 2]
-            q = [m[0, 1] + m[1, 0], t, m[1, 2] + m[2, 1], m[2, 0] - m[0, 2]]
-    else:
-        if m[0, 0] < -m[1, 1]:
-            t = 1 - m[0, 0] - m[1, 1] + m[2, 2]
-            q = [m[2, 0] + m[0, 2], m[1, 2] + m[2, 1], t, m[0, 1] - m[1, 0]]
-        else:
-            t = 1 + m[0, 0] + m[1, 1] + m[2, 2]
-            q = [m[1, 2] - m[2, 1], m[2, 0] - m[0, 2], m[0, 1] - m[1, 0], t]
 
-    # x y z w
-    q = [e * (.5 / np.sqrt(t)) for e in q]
-    # bpy sys -w x y z
-    q = [-q[3], q[0], q[1], q[2]]
-    return q
+def matrix3x3_to_quaternion(m: np.array):
+    """ Returns quaternion (w, x, y, z) from 3x3 matrix. """
+    return cgt_batch_math.matrix_to_quat(m)
 
 
 def matrix3x3_to_euler(matrix: np.ndarray) -> np.ndarray:
     """ Returns euler x, y, z angles from 3x3 rotation matrix """
-    # http://eecs.qmul.ac.uk/~gslabaugh/publications/euler.pdf
-    # https://www.meccanismocomplesso.org/en/3d-rotations-and-euler-angles-in-python/
-    tol = np.float64(0.000000000000001)
-    if abs(matrix[0][0]) < tol and abs(matrix[1][0]) < tol:
-        phi = 0
-        theta = np.arctan2(-matrix[2][0], matrix[0][0])
-        psi = np.arctan2(-matrix[1][2], matrix[1][1])
-    else:
-        phi = np.arctan2(matrix[1][0], matrix[0][0])
-        sp = np.sin(phi)
-        cp = np.cos(phi)
-        theta = np.arctan2(-matrix[2][0], cp * matrix[0][0] + sp * matrix[1][0])
-        psi = np.arctan2(sp * matrix[0][2] - cp * matrix[1][2], cp * matrix[1][1] - sp * matrix[0][1])
-
-    return np.array([psi, theta, phi])
+    return cgt_batch_math.matrix_to_euler(matrix)
 
 # endregion
 # endregion
@@ -1,20 +1,25 @@
 import logging
 import numpy as np
 from mathutils import Euler
+from typing import Tuple
 
 from .calc_utils import ProcessorUtils, CustomData
-from . import cgt_math
+from . import cgt_math, cgt_batch_math
 from ..cgt_patterns import cgt_nodes
+from ..cgt_landmarks import LandmarkArray, as_points
 
 
 class FaceRotationCalculator(cgt_nodes.CalculatorNode, ProcessorUtils):
+    # rotation targets in the order of update's rotation data (pivot, chin driver)
+    rotation_idx = np.array([468, 469])
+
     # processed results
     def __init__(self):
+        super().__init__()
         # increase shape to add specific driver data (maybe not required for the face)
         n = 468
         self.rotation_data = []
-        custom_data_arr = [CustomData(idx+n) for idx in range(0, 5)]
-        self.pivot, self.chin_driver, self.left_mouth_corner, self.right_mouth_corner, *_ = custom_data_arr
+        self.pivot, self.chin_driver = [CustomData(idx+n) for idx in range(0, 2)]
 
     def update(self, data, frame=-1):
         """ Process the landmark detection results. """
@@ -27,17 +32,14 @@ class FaceRotationCalculator(cgt_nodes.CalculatorNode, ProcessorUtils):
             logging.error(f"Index Error occurred: {data}, {frame} - check face nodes")
             return [[], [], []], frame
 
-        self.data = data[0]
-        if len(self.data) < 468:
+        if len(data[0]) < 468:
             return [[], [], []], frame
 
-        # increase the data size to hold custom data (check __init__)
-        for i in range(4):
-            self.data.append([468+i, [0., 0., 0.]])
-        self.custom_landmark_origin()
+        points, self.pivot.loc = self.custom_landmark_origin(as_points(data[0]))
+        self.data = LandmarkArray(points)
 
         # get distances and rotations to determine movements
-        self.set_rotation_driver_data()
+        self.set_rotation_driver_data(points)
         if self.has_duplicated_results(self.data, "face"):
             return [[], [], []], frame
         return [self.data, self.rotation_data, []], frame
@@ -46,102 +48,81 @@ class FaceRotationCalculator(cgt_nodes.CalculatorNode, ProcessorUtils):
         """ Returns the processed data """
         return self.data, self.rotation_data, [], self.frame, self.has_duplicated_results(self.data)
 
-    def mouth_corners(self):
-        """ Calculates the angle from the mouth center to the mouth corner """
-        # center point of mouth corners gets projected on vector from upper to lower lip
-        corner_center = cgt_math.center_point(self.data[61][1], self.data[291][1])
-        projected_center = cgt_math.project_point_on_vector(corner_center, self.data[0][1], self.data[17][1])
-        # center point between upper and lower lip
-        mouth_height_center = cgt_math.center_point(self.data[0][1], self.data[17][1])
-
-        # vectors from center points to mouth corners
-        left_vec = cgt_math.to_vector(projected_center, self.data[61][1])
-        left_hv = cgt_math.to_vector(mouth_height_center, self.data[61][1])
-        right_vec = cgt_math.to_vector(projected_center, self.data[291][1])
-        right_hv = cgt_math.to_vector(mouth_height_center, self.data[291][1])
-
-        # angle between the vectors expecting users don't record upside down
-        if mouth_height_center[2] > projected_center[2]:
-            right_corner_angle = cgt_math.angle_between(left_vec, left_hv)
-            left_corner_angle = cgt_math.angle_between(right_vec, right_hv)
-        else:
-            right_corner_angle = -cgt_math.angle_between(left_vec, left_hv)
-            left_corner_angle = -cgt_math.angle_between(right_vec, right_hv)
-
-        self.left_mouth_corner.loc = [0, 0, left_corner_angle]
-        self.right_mouth_corner.loc = [0, 0, right_corner_angle]
-        self.data.append([self.left_mouth_corner.idx, self.left_mouth_corner.loc])
-        self.data.append([self.right_mouth_corner.idx, self.right_mouth_corner.loc])
-
-    def set_rotation_driver_data(self):
-        """ Get face and chin rotation """
-        self.face_mesh_rotation()
+    def batch(self, landmarks: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ Calculates a whole sequence of (T, 468, 3) face landmarks at once.
+            Returns (T, 468, 3) locations relative to the pivot, (T, 2, 3) eulers of the rotation_idx targets,
+            (T, 0, 3) scales and a (T,) mask of frames update wouldn't drop as duplicates.
+            Continues from and updates the euler state of per frame updates. """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        n = len(landmarks)
+        if landmarks.ndim != 3 or landmarks.shape[1] < 468:
+            return np.empty((n, 0, 3)), np.empty((n, 0, 3)), np.empty((n, 0, 3)), np.zeros(n, dtype=bool)
+
+        points, pivot = self.custom_landmark_origin(landmarks)
+        self.pivot.loc = pivot[-1] if n else None
+
+        rotations = np.empty((n, len(self.rotation_idx), 3))
+        head = cgt_batch_math.quat_invert(cgt_batch_math.matrix_to_quat(self.face_mesh_rotation(points)))
+        rotations[:, 0] = self.euler_tracks(head[:, None], [self.pivot.idx])[:, 0]
+        rotations[:, 1] = 0
+        rotations[:, 1, 0] = self.chin_rotation(points)
+        return points, rotations, np.empty((n, 0, 3)), self.unique_frames(points)
+
+    def set_rotation_driver_data(self, points: np.ndarray):
+        """ Get face and chin rotation of a single frame, mathutils is faster than numpy at this size. """
         try:
+            matrix = cgt_math.generate_matrix(*self.face_mesh_rotation(points))
+            loc, self.pivot.rot, scale = cgt_math.decompose_matrix(matrix)
             head_rotation = self.try_get_euler(self.pivot.rot, prev_rot_idx=self.pivot.idx)
-            # head_rotation = self.quart_to_euler_combat(self.pivot.rot, self.pivot.idx, axis='XZY')
-        except AttributeError:
+        except (AttributeError, TypeError):
             logging.warning("Exchange method in cgt_maths for other targets than blender.")
             head_rotation = [0, 0, 0]
 
-        self.chin_rotation()
-        chin_rotation = self.chin_driver.rot
+        self.chin_driver.rot = Euler((self.chin_rotation(points), 0, 0))
         # store rotation data
         self.rotation_data = [
             [self.pivot.idx, head_rotation],
-            [self.chin_driver.idx, chin_rotation],
-            # [self._mouth_corner_driver.idx, self._mouth_corner_driver.rot]
+            [self.chin_driver.idx, self.chin_driver.rot],
         ]
 
-    def chin_rotation(self):
-        """ Calculate the chin rotation. """
-        # draw vector from point between eyes to mouth and chin
-        nose_dir = cgt_math.to_vector(self.data[168][1], self.data[2][1])
-        chin_dir = cgt_math.to_vector(self.data[168][1], self.data[200][1])
-
-        # calculate the Z rotation
-        nose_dir_z, chin_dir_z = cgt_math.null_axis([nose_dir, chin_dir], 'X')
-        z_angle = cgt_math.angle_between(nose_dir_z, chin_dir_z) * 1.8
+    @staticmethod
+    def chin_rotation(points: np.ndarray) -> np.ndarray:
+        """ Calculate the chin x-rotation of (..., 468, 3) points. """
+        # draw vector from point between eyes to mouth and chin, ignoring the X axis
+        nose_dir = (points[..., 2, :] - points[..., 168, :]) * (0, 1, 1)
+        chin_dir = (points[..., 200, :] - points[..., 168, :]) * (0, 1, 1)
+        z_angle = cgt_batch_math.vector_angle(nose_dir, chin_dir) * 1.8
 
         # in the detection results is no X-rotation available
-        # nose_dir_x, chin_dir_x = m_V.null_axis([nose_dir, chin_dir], 'Z')
-        # chin_rotation = m_V.rotate_towards(self.data[152][1], self.data[6][1], 'Y', 'Z')
-
         # due to the base angle it's required to offset the rotation
-        self.chin_driver.rot = Euler(((z_angle - 3.14159 * .07) * 1.175, 0, 0))
+        return (z_angle - 3.14159 * .07) * 1.175
 
-    def face_mesh_rotation(self):
-        """ Calculate face quaternion using
-            points to approximate the transformation matrix. """
-        origin = np.array([0, 0, 0])
+    @staticmethod
+    def face_mesh_rotation(points: np.ndarray) -> np.ndarray:
+        """ Approximate the head transformation matrix from (..., 468, 3) points relative to the pivot.
+            Returns (..., 3, 3) matrices with tangent, normal and binormal as rows like cgt_math.generate_matrix. """
+        forward_point = (points[..., 1, :] + points[..., 4, :]) / 2  # nose
+        right_point = (points[..., 447, :] + points[..., 366, :]) / 2  # temple.R
+        down_point = points[..., 152, :]  # chin
 
-        forward_point = cgt_math.center_point(np.array(self.data[1][1]), np.array(self.data[4][1]))  # nose
-        right_point = cgt_math.center_point(np.array(self.data[447][1]), np.array(self.data[366][1]))  # temple.R
-        down_point = np.array(self.data[152][1])  # chin
-
-        # direction vectors from imaginary origin
-        normal = cgt_math.normalize(cgt_math.to_vector(origin, forward_point))
-        tangent = cgt_math.normalize(cgt_math.to_vector(origin, right_point))
-        binormal = cgt_math.normalize(cgt_math.to_vector(origin, down_point))
-
-        # generate matrix to decompose it and access quaternion rotation
-        try:
-            matrix = cgt_math.generate_matrix(tangent, normal, binormal)
-            loc, quart, scale = cgt_math.decompose_matrix(matrix)
-        except TypeError:
-            logging.warning("Exchange method in cgt_math for other targets than Blender.")
-            quart = None
-        self.pivot.rot = quart
+        # direction vectors from imaginary origin as matrix rows
+        matrix = np.stack([right_point, forward_point, down_point], axis=-2)
+        return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True)
 
     # region cgt_utils
-    def custom_landmark_origin(self):
-        """ Sets face mesh position to approximate origin """
-        self.data = [[idx, np.array([-lmrk[0], lmrk[2], -lmrk[1]])] for idx, lmrk in self.data[:468]]
-        self.approximate_pivot_location()
-        self.data = [[idx, np.array(lmrk) - np.array(self.pivot.loc)] for idx, lmrk in self.data[:468]]
-
-    def approximate_pivot_location(self):
-        """ Sets to approximate origin based on canonical face mesh geometry """
-        right = cgt_math.center_point(np.array(self.data[447][1]), np.array(self.data[366][1]))  # temple.R
-        left = cgt_math.center_point(np.array(self.data[137][1]), np.array(self.data[227][1]))  # temple.L
-        self.pivot.loc = cgt_math.center_point(right, left)  # approximate origin
+    @staticmethod
+    def custom_landmark_origin(landmarks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Sets face mesh position of (..., 468, 3) landmarks to approximate origin.
+            Returns the points in blender space and the (..., 3) pivot locations. """
+        points = landmarks[..., :468, [0, 2, 1]] * (-1, 1, -1)
+        pivot = FaceRotationCalculator.approximate_pivot_location(points)
+        points -= pivot[..., None, :]
+        return points, pivot
+
+    @staticmethod
+    def approximate_pivot_location(points: np.ndarray) -> np.ndarray:
+        """ Returns approximate origin based on canonical face mesh geometry """
+        right = (points[..., 447, :] + points[..., 366, :]) / 2  # temple.R
+        left = (points[..., 137, :] + points[..., 227, :]) / 2  # temple.L
+        return (right + left) / 2  # approximate origin
     # endregion
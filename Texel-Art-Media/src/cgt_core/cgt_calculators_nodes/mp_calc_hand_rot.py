@@ -1,6 +1,8 @@
 import numpy as np
-from . import calc_utils, cgt_math
+from typing import Tuple
+from . import calc_utils, cgt_math, cgt_batch_math
 from ..cgt_patterns import cgt_nodes
+from ..cgt_landmarks import LandmarkArray, as_points
 
 
 class HandRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils):
@@ -11,6 +13,15 @@ class HandRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils
         [13, 17],  # ring finger
         [17, 21],  # pinky
     ]
+    # wrist followed by the joints of each finger
+    finger_chains = np.array([[0, *range(mcp, tip)] for mcp, tip in fingers])
+    # mcps of index finger to pinky
+    z_mcps = np.array([5, 9, 13, 17])
+    # rotation targets of batch, the wrist holds the hand rotation
+    rotation_idx = np.array([0, 1, 2, 3, 5, 6, 7, 9, 10, 11, 13, 14, 15, 17, 18, 19])
+    # default hand rotation for a rigify A-Pose rig, as matrix to rotate row vectors
+    a_pose = {orientation: np.array([cgt_math.rotate_point_euler(axis, rotation) for axis in np.eye(3)])
+              for orientation, rotation in (("L", [-60, -60, 0]), ("R", [-60, 60, 0]))}
 
     data: np.ndarray = None
 
@@ -29,8 +40,7 @@ class HandRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils
         self.right_hand_data = self.set_global_origin(self.data[1])
 
         # get finger angles
-        self.left_angles = self.finger_angles(self.left_hand_data)
-        self.right_angles = self.finger_angles(self.right_hand_data)
+        self.left_angles, self.right_angles = self.finger_angles(self.left_hand_data, self.right_hand_data)
 
         # get hand rotation
         left_hand_rot = self.global_hand_rotation(self.left_hand_data, 0, "L")
@@ -59,155 +69,86 @@ class HandRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils
 
         return [locations, angles, [[], []]], frame
 
-    def finger_angles(self, hand):
-        """ Get finger x-angles from landmarks. """
-        if not hand or len(hand) < 20:
-            return []
-
-        x_angles = self.get_x_angles(hand)
-        z_angles = self.get_z_angles(hand)
-
-        data = []
-        for idx in range(0, 20):
-            if x_angles[idx] != 0 or z_angles[idx] != 0:
-                joint_angle = [idx, np.array([x_angles[idx], 0, z_angles[idx]])]
-                data.append(joint_angle)
-
-        return data
-
-    def get_z_angles(self, hand):
-        """ Project finger mcps on a vector between index and pinky mcp.
-            Create circles around the mcps circles facing in the direction of vectors depending on the palm.
-            Searching for the closest point on the circle to the fingers dip and calculate the angle.
+    def finger_angles(self, *hands):
+        """ Get finger x- and z-angles of all hands in one batch.
+            Returns [[idx, [x, 0, z]], ...] per hand. """
+        results = [[] for _ in hands]
+        valid = [i for i, hand in enumerate(hands) if hand and len(hand) > 20]
+        if not valid:
+            return results
+
+        angles = self.hand_angles(np.stack([as_points(hands[i]) for i in valid]))
+        for i, hand_angles in zip(valid, angles):
+            joints = np.flatnonzero(np.any(hand_angles != 0, axis=-1))
+            results[i] = [[int(idx), hand_angles[idx]] for idx in joints]
+        return results
+
+    def hand_angles(self, points: np.ndarray) -> np.ndarray:
+        """ Finger eulers [x, 0, z] from (..., 21, 3) landmarks with the wrist as origin.
+            Leading axes may hold hands and frames, returns (..., 20, 3). """
+        angles = np.zeros(points.shape[:-2] + (20, 3))
+        angles[..., 0] = self.get_x_angles(points)
+        angles[..., 2] = self.get_z_angles(points)
+        return angles
+
+    def get_z_angles(self, points: np.ndarray) -> np.ndarray:
+        """ Project finger mcps on the vector between index and pinky mcp.
+            The z-angle is the signed angle between the mcp-dip vector and the plane spanned by
+            a palm direction and its perpendicular to that vector (the plane of the circle the
+            former implementation searched). Palm directions are wrist-pinky for index and middle
+            finger and thumb-index for ring finger and pinky.
             Thumb gets projected on a plane between thumb mcp, index mcp and wrist to calculate the z-angle.
+            Returns (..., 20) angles.
         """
-        data = [0] * 20
-        joints = np.array([[0, 1, 2]])
-
-        def calculate_thumb_angle():
-            # create plane to project thumb mcp & pip on plane
-            plane = np.array([np.array([0, 0, 0]), hand[1][1], hand[5][1]])
-            thumb_proj = [cgt_math.project_vec_on_plane(plane, joints, p)
-                          for p in [hand[1][1], hand[5][1], hand[2][1]]]
-
-            # vectors to calculate angle
-            thumb_vecs = [cgt_math.to_vector(tp[0], tp[1]) for tp in [
-                [thumb_proj[0], thumb_proj[1]],
-                [thumb_proj[0], thumb_proj[2]]]]
-
-            return cgt_math.angle_between(np.array(thumb_vecs[0]), np.array(thumb_vecs[1]))
-
-        data[1] = calculate_thumb_angle()
-
-        # calculate other finger angles
-        tangent = cgt_math.to_vector(np.array(hand[5][1]), np.array(hand[17][1]))
-        # get pips, mcps and their dists (mcps projected on tangent)
-        mcps = [cgt_math.project_point_on_vector(
-            np.array(hand[finger[0]][1]), np.array(hand[5][1]), np.array(hand[17][1]))
-            for finger in self.fingers[1:]]
-        pips = [np.array(hand[finger[1] - 2][1]) for finger in self.fingers[1:]]
-        dists = [cgt_math.get_vector_distance(mcps[i], pips[i]) for i in range(0, 4)]
-
-        # circle direction vectors related to the hand to calc angles
-        pinky_vec = cgt_math.to_vector(np.array(hand[0][1]), np.array(hand[17][1]))
-        thumb_vec = cgt_math.to_vector(np.array(hand[1][1]), np.array(hand[5][1]))
-        dirs = [pinky_vec, pinky_vec, thumb_vec, thumb_vec]
-
-        points = 20
-        for i in range(0, 4):
-            # create a circle around tangent in target dir
-            # and find the closest point from circle to pip
-            circle = cgt_math.create_circle_around_vector(tangent, mcps[i], dists[i], points, dirs[i])
-            closest = cgt_math.get_closest_idx(pips[i], circle)
-
-            # angle between the closest point on circle to mcp and pip to mcp vectors
-            mcp_pip = cgt_math.to_vector(mcps[i], pips[i])
-            mcp_closest = cgt_math.to_vector(mcps[i], circle[closest])
-
-            # expand the arr of the circle to avoid index errors
-            # form a triangle on the circle facing the closet point to the pip
-            expanded_circle = circle + circle + circle
-            a = expanded_circle[closest + points + 6]
-            b = expanded_circle[closest + points - 6]
-
-            # calculate the normal from the triangle
-            plane = np.array([a, circle[closest], b])
-            normal = cgt_math.normal_from_plane(plane)
-            normal = cgt_math.normalize(normal)
-
-            # get the distance from the triangle to the pip
-            dist = cgt_math.distance_from_plane(pips[i], normal, circle[closest])
-
-            # check if the finger angle should be pos or neg based on the dist
-            angle = cgt_math.angle_between(np.array(mcp_pip), np.array(mcp_closest))
-            if dist < 0:
-                angle = -angle
-            else:
-                pass
-
-            data[self.fingers[i + 1][0]] = angle
-
-        return data
-
-    def get_x_angles(self, hand):
-        """ Get finger x angle by calculating the angle between each finger joint """
-        # add the wrist as origin to all fingers (0, 0, 0)
-        fingers = [[hand[idx][1] for idx in range(finger[0], finger[1])] for finger in self.fingers]
-        wrist_origin = np.array([0, 0, 0])
-        fingers = [np.array([wrist_origin] + finger) for finger in fingers]
-        joints = np.array([[0, 1, 2]])
-
-        # straighten fingers by plane projection
-        for idx, finger in enumerate(fingers):
-            plane = np.array([np.array([0, 0, 0]), finger[1], finger[4]])
-            f = [cgt_math.project_vec_on_plane(plane, joints, p) for p in finger]
-            fingers[idx] = f
-
-        # setup joints to calc finger angles
-        x_joints = [[0, 1, 2], [1, 2, 3], [2, 3, 4]]
-        x_finger_angles = [cgt_math.joint_angles(finger, x_joints) for finger in fingers]
-
-        data = [0] * 20
-        for idx, angles in enumerate(x_finger_angles):
-            if angles is None:
-                break
-
-            # iter over every finger joint and calc angle
-            mcp, tip = self.fingers[idx]
-            for angle_idx, finger_idx in enumerate(range(mcp, tip - 1)):
-                data[finger_idx] = angles[angle_idx]
-
-        return data
+        angles = np.zeros(points.shape[:-2] + (20,))
+
+        # thumb pip projected on the plane wrist, thumb mcp, index mcp
+        thumb_mcp, index_mcp = points[..., 1, :], points[..., 5, :]
+        thumb_pip = cgt_batch_math.project_on_plane(points[..., 2, :], np.cross(thumb_mcp, index_mcp))
+        angles[..., 1] = cgt_batch_math.vector_angle(index_mcp - thumb_mcp, thumb_pip - thumb_mcp)
+
+        # mcps projected on the tangent from index to pinky mcp
+        tangent = (points[..., 17, :] - index_mcp)[..., None, :]
+        mcps = points[..., self.z_mcps, :] - index_mcp[..., None, :]
+        mcps = index_mcp[..., None, :] + tangent * (
+                np.sum(mcps * tangent, axis=-1, keepdims=True) / np.sum(tangent * tangent, axis=-1, keepdims=True))
+
+        # plane normals, the tangent without its component along the palm directions
+        pinky_vec = points[..., 17, :] - points[..., 0, :]
+        thumb_vec = index_mcp - thumb_mcp
+        dirs = np.stack([pinky_vec, pinky_vec, thumb_vec, thumb_vec], axis=-2)
+        normals = -cgt_batch_math.project_on_plane(tangent, dirs)
+        normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+
+        # signed angle of mcp-dip out of the plane
+        mcp_dip = points[..., self.z_mcps + 2, :] - mcps
+        dist = np.sum(mcp_dip * normals, axis=-1)
+        in_plane = np.linalg.norm(mcp_dip - dist[..., None] * normals, axis=-1)
+        angles[..., self.z_mcps] = np.arctan2(dist, in_plane)
+        return angles
+
+    def get_x_angles(self, points: np.ndarray) -> np.ndarray:
+        """ Get finger x angle by calculating the angle between each finger joint
+            after straightening the fingers by projection on the plane wrist, mcp and tip.
+            Returns (..., 20) angles. """
+        # wrist as origin followed by the finger joints
+        fingers = points[..., self.finger_chains, :]
+        normals = np.cross(fingers[..., 1, :], fingers[..., 4, :])[..., None, :]
+        bones = np.diff(cgt_batch_math.project_on_plane(fingers, normals), axis=-2)
+
+        angles = np.zeros(points.shape[:-2] + (20,))
+        angles[..., self.finger_chains[:, 1:4]] = cgt_batch_math.vector_angle(bones[..., :-1, :], bones[..., 1:, :])
+        return angles
 
     def global_hand_rotation(self, hand, combat_idx_offset: int = 0, orientation: str = "R"):
         """ Calculates approximate hand rotation by generating
             a matrix using the palm as approximate triangle. """
-        if hand == []:
+        if len(hand) == 0:
             return []
 
-        # default hand rotation for a rigify A-Pose rig,
-        if orientation == "R":
-            rotation = [-60, 60, 0]
-        else:
-            rotation = [-60, -60, 0]
-
-        # rotate points before calculating the rotation
-        rotated_points = [cgt_math.rotate_point_euler(np.array(hand[idx][1]), rotation) for idx in [1, 5, 13]]
-
-        # setup vectors to create an matrix
-        tangent = cgt_math.normalize(cgt_math.to_vector(
-            rotated_points[0],
-            rotated_points[1]
-        ))
-        binormal = cgt_math.normalize(cgt_math.to_vector(
-            rotated_points[1],
-            rotated_points[2]
-        ))
-        normal = cgt_math.normalize(np.cross(binormal, tangent))
-
         # rotation from matrix
         try:
-            matrix = cgt_math.generate_matrix(normal, tangent, binormal)
+            matrix = cgt_math.generate_matrix(*self.palm_matrix(as_points(hand), orientation))
             loc, quart, sca = cgt_math.decompose_matrix(matrix)
             euler = self.try_get_euler(quart, prev_rot_idx=combat_idx_offset)
             hand_rotation = ([0, euler])
@@ -218,6 +159,42 @@ class HandRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils
 
         return hand_rotation
 
+    @classmethod
+    def palm_matrix(cls, points: np.ndarray, orientation: str = "R") -> np.ndarray:
+        """ Returns (..., 3, 3) matrices with the normal, tangent and binormal of the palm triangle
+            as rows like cgt_math.generate_matrix from (..., 21, 3) points. """
+        # rotate points before calculating the rotation
+        rotated_points = points[..., [1, 5, 13], :] @ cls.a_pose[orientation]
+
+        # setup vectors to create an matrix
+        tangent = rotated_points[..., 1, :] - rotated_points[..., 0, :]
+        binormal = rotated_points[..., 2, :] - rotated_points[..., 1, :]
+        tangent /= np.linalg.norm(tangent, axis=-1, keepdims=True)
+        binormal /= np.linalg.norm(binormal, axis=-1, keepdims=True)
+        normal = np.cross(binormal, tangent)
+        normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+        return np.stack([normal, tangent, binormal], axis=-2)
+
+    def batch(self, landmarks: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ Calculates a whole sequence of (T, 2, 21, 3) left and right hand landmarks at once.
+            Returns (T, 2, 21, 3) locations, (T, 2, 16, 3) eulers of the rotation_idx targets,
+            (T, 2, 0, 3) scales and a (T, 2) mask of frames update wouldn't drop as duplicates.
+            Continues from and updates the euler state of per frame updates. """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        n = len(landmarks)
+
+        # set_global_origin
+        points = landmarks[..., [0, 2, 1]] * (-1, 1, -1)
+        points -= points[..., :1, :]
+
+        rotations = self.hand_angles(points)[..., self.rotation_idx, :]
+        matrices = np.stack([self.palm_matrix(points[:, 0], "L"), self.palm_matrix(points[:, 1], "R")], axis=1)
+        quats = cgt_batch_math.quat_invert(cgt_batch_math.matrix_to_quat(matrices))
+        rotations[..., 0, :] = self.euler_tracks(quats, [0, 100])  # offset for euler combat
+
+        keep = np.stack([self.unique_frames(points[:, 0], 1), self.unique_frames(points[:, 1], 0)], axis=1)
+        return points, rotations, np.empty((n, 2, 0, 3)), keep
+
     def landmarks_to_hands(self, left_hand, right_hand):
         """ Determines to which hand the landmark data belongs """
         left_hand = self.set_global_origin(left_hand)
@@ -231,8 +208,6 @@ class HandRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils
         if data is None or len(data) == 0:
             return data
 
-        if len(data) > 0:
-            data = [[idx, np.array([-landmark[0], landmark[2], -landmark[1]])] for idx, landmark in data[0]]
-            data = [[idx, landmark - data[0][1]] for idx, landmark in data]
-
-        return data
+        points = as_points(data[0])
+        points = points[:, [0, 2, 1]] * (-1, 1, -1)
+        return LandmarkArray(points - points[0])
@@ -1,18 +1,26 @@
 import numpy as np
 from mathutils import Euler
-from typing import List
-from . import calc_utils, cgt_math
+from typing import List, Tuple
+from . import calc_utils, cgt_math, cgt_batch_math
 from ..cgt_patterns import cgt_nodes
+from ..cgt_landmarks import LandmarkArray, as_points
 
 
 class PoseRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils):
     shoulder_center = None
     hip_center = None
 
+    # rotation targets in the order of update's rotation data
+    rotation_idx = np.array([34, 33, 23, 25, 24, 26, 12, 14, 16, 11, 13, 15, 27, 28])
+    # parent, child landmarks of the ik chain rotations
+    limb_chains = np.array([[23, 25], [25, 27], [24, 26], [26, 28],
+                            [12, 14], [14, 16], [16, 20], [11, 13], [13, 15], [15, 19]])
+
     rotation_data = []
     scale_data = []
 
     def __init__(self):
+        super().__init__()
         self.shoulder_center = calc_utils.CustomData(34)
         self.pose_offset = calc_utils.CustomData(35)
         self.hip_center = calc_utils.CustomData(33)
@@ -21,16 +29,11 @@ class PoseRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils
         """ Apply the processed data to references. """
         if not data or len(data) < 33:
             return [[], [], []], frame
-        self.data = data
-
-        # increase the data size to hold custom data (check __init__)
-        for i in range(2):
-            self.data.append([33 + i, [0., 0., 0.]])
 
         self.rotation_data = []
         self.scale_data = []
 
-        self.prepare_landmarks()
+        self.prepare_landmarks(data)
         self.shoulder_hip_location()
         self.set_hip_as_origin()
         try:
@@ -42,6 +45,65 @@ class PoseRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils
             return [[], [], []], frame
         return [self.data, self.rotation_data, []], frame
 
+    def batch(self, landmarks: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ Calculates a whole sequence of (T, 33, 3) pose landmarks at once.
+            Returns (T, 36, 3) locations, (T, 14, 3) eulers of the rotation_idx targets,
+            (T, 0, 3) scales and a (T,) mask of frames update wouldn't drop as duplicates.
+            Continues from and updates the euler state of per frame updates. """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        n = len(landmarks)
+
+        # prepare_landmarks, shoulder_hip_location and set_hip_as_origin
+        points = np.zeros((n, 36, 3))
+        points[:, :33] = landmarks[:, :33][..., [0, 2, 1]] * (-1, 1, -1)
+        shoulder_center = (points[:, 11] + points[:, 12]) / 2
+        hip_center = (points[:, 23] + points[:, 24]) / 2
+        points[:, 33] = hip_center
+        points[:, 34] = shoulder_center
+        points[:, :35] -= hip_center[:, None]
+        points[:, 35] = hip_center
+
+        quats, keys = [], []
+
+        # shoulder_rotation, rotations from the centers towards shoulder.R and hip.R
+        shoulder_center, hip_center = (points[:, 11] + points[:, 12]) / 2, (points[:, 23] + points[:, 24]) / 2
+        quats += [cgt_batch_math.track_quat(points[:, 12] - shoulder_center, 'Z', 'Y'),
+                  cgt_batch_math.track_quat(points[:, 24] - hip_center, 'Z', 'Y')]
+        keys += [7, 8]
+
+        # torso_rotation, from the triangle connecting hips and the shoulder center
+        normal = np.cross(points[:, 24] - points[:, 23], shoulder_center - points[:, 23])
+        rows = np.stack([points[:, 24] - hip_center, shoulder_center - hip_center, normal], axis=1)
+        rows /= np.linalg.norm(rows, axis=-1, keepdims=True)
+        quats.append(cgt_batch_math.quat_invert(cgt_batch_math.matrix_to_quat(rows)))
+        keys.append(self.hip_center.idx)
+
+        # limb_rotations, pointing from the child back to the parent landmark
+        for parent, child in self.limb_chains:
+            quats.append(cgt_batch_math.track_quat(points[:, parent] - points[:, child], '-Y', 'Z'))
+            keys.append(int(parent))
+
+        # foot_rotation, from knee, ankle and foot index
+        for knee, ankle, foot in ((25, 27, 31), (26, 28, 32)):
+            loc = points[:, [knee, ankle, foot]]
+            tangent = np.cross(loc[:, 1] - loc[:, 0], loc[:, 2] - loc[:, 0])
+            rows = np.stack([tangent, loc[:, 1] - loc[:, 2], loc[:, 0] - loc[:, 2]], axis=1)
+            rows /= np.linalg.norm(rows, axis=-1, keepdims=True)
+            quats.append(cgt_batch_math.quat_invert(cgt_batch_math.matrix_to_quat(rows)))
+            keys.append(ankle)
+
+        offsets = np.zeros((len(keys), 3))
+        offsets[2] = (-.5, 0, 0)
+        eulers = self.euler_tracks(np.stack(quats, axis=1), keys, offsets)
+
+        rotations = np.empty((n, len(self.rotation_idx), 3))
+        # offset between hip & shoulder rot = real shoulder rot
+        rotations[:, 0] = eulers[:, 0] - eulers[:, 1]
+        rotations[:, 1] = eulers[:, 2]
+        rotations[:, 2:] = eulers[:, 3:]
+
+        return points, rotations, np.empty((n, 0, 3)), self.unique_frames(points)
+
     def calculate_rotations(self):
         """ Creates custom rotation data for driving the cgt_rig. """
         self.shoulder_rotation()
@@ -147,22 +209,21 @@ class PoseRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils
         self.rotation_data.append([self.shoulder_center.idx, euler])
 
     def shoulder_hip_location(self):
-        """ Appending custom location data for driving the cgt_rig. """
-        self.shoulder_center.loc = cgt_math.center_point(self.data[11][1], self.data[12][1])
-        self.data.append([self.shoulder_center.idx, self.shoulder_center.loc])
-
-        self.hip_center.loc = cgt_math.center_point(self.data[23][1], self.data[24][1])
-        self.data.append([self.hip_center.idx, self.hip_center.loc])
+        """ Custom location data for driving the cgt_rig. """
+        self.shoulder_center.loc = cgt_math.center_point(self.data.points[11], self.data.points[12])
+        self.hip_center.loc = cgt_math.center_point(self.data.points[23], self.data.points[24])
 
-    def prepare_landmarks(self):
-        """ Prepare landmark orientation. """
-        self.data = [[idx, np.array([-landmark[0], landmark[2], -landmark[1]])]
-                     for idx, landmark in self.data]
+    def prepare_landmarks(self, data):
+        """ Prepare landmark orientation, rows 33-35 hold the custom data (check __init__). """
+        points = np.zeros((36, 3))
+        landmarks = as_points(data)[:33]
+        points[:33] = landmarks[:, [0, 2, 1]] * (-1, 1, -1)
+        self.data = LandmarkArray(points)
 
     def set_hip_as_origin(self):
+        points = self.data.points
         self.pose_offset.loc = self.hip_center.loc
-        self.data = [[idx, np.array([landmark[0] - self.hip_center.loc[0],
-                                     landmark[1] - self.hip_center.loc[1],
-                                     landmark[2] - self.hip_center.loc[2]])]
-                     for idx, landmark in self.data]
-        self.data.append([self.pose_offset.idx, self.pose_offset.loc])
+        points[self.hip_center.idx] = self.hip_center.loc
+        points[self.shoulder_center.idx] = self.shoulder_center.loc
+        points[:35] -= self.hip_center.loc
+        points[self.pose_offset.idx] = self.pose_offset.loc
@@ -0,0 +1,63 @@
+from __future__ import annotations
+from typing import Iterator, List, Union
+
+import numpy as np
+
+
+class LandmarkArray:
+    """ Landmarks of a single detection as contiguous (N, 3) array, the row is the landmark index.
+    Indexing and iterating still yields [idx, [x, y, z]] pairs for code which expects
+    the list representation, calculators and output nodes use the points directly. """
+    __slots__ = ('points', 'visibility', 'frame')
+
+    def __init__(self, points: np.ndarray, visibility: np.ndarray = None, frame: int = -1):
+        self.points = points
+        self.visibility = np.ones(len(points), dtype=np.float32) if visibility is None else visibility
+        self.frame = frame
+
+    @classmethod
+    def from_proto(cls, landmark_list, frame: int = -1) -> LandmarkArray:
+        """ landmark_list: A (normalized) landmark list proto message. """
+        landmarks = landmark_list.landmark
+        n = len(landmarks)
+        points = np.fromiter(
+            (v for lm in landmarks for v in (lm.x, lm.y, lm.z)), dtype=np.float32, count=n * 3).reshape(n, 3)
+        visibility = np.fromiter((lm.visibility for lm in landmarks), dtype=np.float32, count=n)
+        return cls(points, visibility, frame)
+
+    @classmethod
+    def from_pairs(cls, pairs: List, dtype=np.float32) -> LandmarkArray:
+        """ Converts [[idx, [x, y, z]], ...] ordered by idx. """
+        if not len(pairs):
+            return cls(np.empty((0, 3), dtype=dtype))
+        return cls(np.array([landmark for _, landmark in pairs], dtype=dtype))
+
+    def to_pairs(self) -> List:
+        return [[idx, landmark] for idx, landmark in enumerate(self.points.tolist())]
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def __bool__(self) -> bool:
+        return len(self.points) > 0
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return [[idx, self.points[idx]] for idx in range(*key.indices(len(self.points)))]
+        if key < 0:
+            key += len(self.points)
+        return [key, self.points[key]]
+
+    def __iter__(self) -> Iterator:
+        for idx, landmark in enumerate(self.points):
+            yield [idx, landmark]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)} landmarks, frame={self.frame})"
+
+
+def as_points(data, dtype=np.float64) -> np.ndarray:
+    """ Returns a copy of the landmark locations as (N, 3) array, from a LandmarkArray or a pair list. """
+    if isinstance(data, LandmarkArray):
+        return np.array(data.points, dtype=dtype)
+    return LandmarkArray.from_pairs(data, dtype).points
@@ -8,11 +8,11 @@ import bpy.types
 from ..cgt_naming import COLLECTIONS
 from mathutils import Vector, Quaternion, Euler
 from ..cgt_patterns import cgt_nodes
+from ..cgt_landmarks import LandmarkArray
 
 
 class BpyOutputNode(cgt_nodes.OutputNode):
     parent_col = COLLECTIONS.drivers
-    prev_rotation = {}
 
     @abstractmethod
     def update(self, data, frame):
@@ -21,6 +21,14 @@ class BpyOutputNode(cgt_nodes.OutputNode):
     @staticmethod
     def translate(target: List[bpy.types.Object], data, frame: int):
         """ Translates and keyframes bpy empty objects. """
+        if isinstance(data, LandmarkArray):
+            for ob, location in zip(target, data.points):
+                ob.location = location
+                ob.keyframe_insert(data_path="location", frame=frame)
+            if len(data) > len(target):
+                logging.debug(f"missing translation index at {frame}")
+            return
+
         try:
             for landmark in data:
                 target[landmark[0]].location = Vector((landmark[1]))
@@ -51,13 +59,13 @@ class BpyOutputNode(cgt_nodes.OutputNode):
             logging.debug(f"missing quat_euler_rotate index {data}, {frame}")
             pass
 
-    def euler_rotate(self, target, data, frame, idx_offset=0):
+    @staticmethod
+    def euler_rotate(target, data, frame):
         """ Translates and keyframes bpy empty objects. """
         try:
             for landmark in data:
                 target[landmark[0]].rotation_euler = landmark[1]
                 target[landmark[0]].keyframe_insert(data_path="rotation_euler", frame=frame)
-                self.prev_rotation[landmark[0] + idx_offset] = landmark[1]
         except IndexError:
             logging.debug(f"missing euler_rotate index at {data}, {frame}")
             pass
\ No newline at end of file
@@ -102,65 +102,22 @@ class FreemocapLoader:
         calc_pose = mp_calc_pose_rot.PoseRotationCalculator()
         calc_hand = mp_calc_hand_rot.HandRotationCalculator()
 
-        # prepare tracking data
-        frames = list(range(self.number_of_frames))
-        hand_data, face_data, pose_data = [], [], []
-        for frame in frames:
-            this_frame_hand_data, this_frame_face_data, this_frame_pose_data = self.get_freemocap_session_data(frame)
-            hand_data.append(this_frame_hand_data)
-            pose_data.append(this_frame_pose_data)
-            face_data.append(this_frame_face_data)
-
         # calc rotations and additional locations
+        frames = list(range(self.number_of_frames))
+        tracked_points = self.mediapipe3d_frames_trackedPoints_xyz[frames]
         logging.info("Calculating additional rotations and locations for hands.")
-        hand_results = np.array([calc_hand.update(data, frame) for data, frame in zip(hand_data, frames)], dtype=object)
+        hand_locations, hand_rotations, _, hand_keep = calc_hand.batch(
+            tracked_points[:, self.first_left_hand_point:self.first_face_point].reshape(len(frames), 2, -1, 3))
+        left_hand_locs, left_hand_rots = self.transform_arrays(
+            hand_locations[:, 0], hand_rotations[:, 0], hand_keep[:, 0], calc_hand.rotation_idx, frames)
+        right_hand_locs, right_hand_rots = self.transform_arrays(
+            hand_locations[:, 1], hand_rotations[:, 1], hand_keep[:, 1], calc_hand.rotation_idx, frames)
         logging.info("Calculating additional rotations and locations for pose.")
-        pose_results = np.array([calc_pose.update(data, frame) for data, frame in zip(pose_data, frames)], dtype=object)
+        pose_locations, pose_rotations = self.batch_transforms(
+            calc_pose, tracked_points[:, self.first_body_point:self.first_left_hand_point], frames)
         logging.info("Calculating additional rotations and locations for face.")
-        face_results = np.array([calc_face.update(data, frame) for data, frame in zip(face_data, frames)], dtype=object)
-
-        def split_transform_data(transform, m_frame):
-            """ Returns locs and rots [[n (objs)], [x, y, z, idx, frame]] """
-            if not len(transform.shape) > 1:
-                return np.array([])
-            return np.array([np.array([*x, i, m_frame]) for x, i in zip(transform[:, 1], transform[:, 0])])
-
-        def flatten_generic_tracking_data(results):
-            """ Returns locs and rots [[n], [n (objs)], [x, y, z, idx, frame]] for pose or face. """
-            locations, rotations = [], []
-
-            for _tuple, m_frame in results:
-                loc, rot, _ = _tuple
-
-                if len(loc) > 0:
-                    locations.append(split_transform_data(np.array(loc, dtype=object), m_frame))
-                if len(rot) > 0:
-                    rotations.append(split_transform_data(np.array(rot, dtype=object), m_frame))
-
-            return [np.array(locations, dtype=object), np.array(rotations, dtype=object)]
-
-        def flatten_hand_tracking_data(results):
-            """ Returns locs and rots [[n], [n (objs)], [x, y, z, idx, frame]] for left and right hand. """
-            transform_arrays = [[], [], [], []]
-
-            for _tuple, m_frame in results:
-                locations, rotations, _ = _tuple
-
-                left_loc_data, right_loc_data = np.array(locations, dtype=object)
-                left_rot_data, right_rot_data = np.array(rotations, dtype=object)
-
-                transform_data = [left_loc_data, right_loc_data, left_rot_data, right_rot_data]
-                for arr, data in zip(transform_arrays, transform_data):
-                    if not len(data) > 0:
-                        continue
-                    arr.append(split_transform_data(data, m_frame))
-
-            return [np.array(arr, dtype=object) for arr in transform_arrays]
-
-        # f-curves require raveled locations therefore flatten shapes or the tracking results
-        pose_locations, pose_rotations = flatten_generic_tracking_data(pose_results)
-        left_hand_locs, right_hand_locs, left_hand_rots, right_hand_rots = flatten_hand_tracking_data(hand_results)
-        face_locations, face_rotations = flatten_generic_tracking_data(face_results)
+        face_locations, face_rotations = self.batch_transforms(
+            calc_face, tracked_points[:, self.first_face_point:], frames)
 
         def apply_data_to_fcurves(data, objects: List[Any], data_path: str = 'location'):
             """ Applies data directly to fcurvers to prevent recalculation of fcurves. """
@@ -197,6 +154,32 @@ class FreemocapLoader:
         apply_data_to_fcurves(face_locations, face_output.face, 'location')
         apply_data_to_fcurves(face_rotations, face_output.face, 'rotation_euler')
 
+    @classmethod
+    def batch_transforms(cls, calculator, points: np.ndarray, frames: List[int]):
+        """ Returns locs and rots [[n], [n (objs)], [x, y, z, idx, frame]] calculated for all frames at once
+            by a calculator providing batch (pose or face). """
+        locations, rotations, _, keep = calculator.batch(points)
+        return cls.transform_arrays(locations, rotations, keep, calculator.rotation_idx, frames)
+
+    @staticmethod
+    def transform_arrays(locations: np.ndarray, rotations: np.ndarray, keep: np.ndarray,
+                         rotation_idx: np.ndarray, frames: List[int]):
+        """ Returns locs and rots [[n], [n (objs)], [x, y, z, idx, frame]] of the kept frames of batch results. """
+        if not np.any(keep):
+            return np.array([]), np.array([])
+
+        kept_frames = np.asarray(frames)[keep]
+
+        def transform_array(values, indices):
+            arr = np.empty(values.shape[:2] + (5,))
+            arr[..., :3] = values
+            arr[..., 3] = indices
+            arr[..., 4] = kept_frames[:, None]
+            return arr
+
+        return (transform_array(locations[keep], np.arange(locations.shape[1])),
+                transform_array(rotations[keep], rotation_idx))
+
     def get_freemocap_session_data(self, frame: int):
         """ Gets data from frame. Splits to default mediapipe formatting. """
         if self.frame == self.number_of_frames - 1:
@@ -1,10 +1,15 @@
 from __future__ import annotations
-from typing import Union, Tuple
+from typing import Optional, Union, Tuple
+import queue
+import threading
 import time
 import cv2
 import logging
 import numpy as np
 
+# skipping at least this many frames seeks instead of grabbing them one by one
+SEEK_SKIP = 16
+
 
 class Stream:
     updated: bool = None
@@ -14,9 +19,22 @@ class Stream:
         'rgb': cv2.COLOR_BGR2RGB,
         'bgr': cv2.COLOR_RGB2BGR
     }
+    color_space: str = 'bgr'
+    # space and mirroring frames get delivered in by update()
+    frame_space: str = 'bgr'
+    flip: bool = True
     dim: Tuple[int, int]
     is_movie: bool = False
     frame_configured: bool = False
+    prefetch_stats: dict = None
+    _decoded: np.ndarray = None
+    _decoded_shape: tuple = None
+    _buffers: np.ndarray = None
+    inference_dim: Optional[Tuple[int, int]] = None
+    sample_step: int = 1
+    _skip: int = 0
+    _producer: Optional[threading.Thread] = None
+    _producer_error: Optional[BaseException] = None
 
     def __init__(self, capture_input: Union[str, int], title: str = "Stream Detection",
                  width: int = 640, height: int = 480, backend: int = 0):
@@ -40,11 +58,219 @@ class Stream:
         self.title = title
 
     def update(self):
-        self.updated, frame = self.capture.read()
-        self.frame = cv2.flip(frame, 1)
+        """ Reads the next frame into self.frame. Frames live in reused buffers which a later
+        update() overwrites in place, callers copy frames they keep beyond that. """
+        if self._producer is not None:
+            return self._update_prefetched()
+
+        self.updated, self._decoded = self._read(self._decoded)
+        if not self.updated or self._decoded is None:
+            self.frame = None
+            return
+
+        if self._buffers is None or self._decoded.shape != self._decoded_shape:
+            self._allocate(self._decoded, 1)
+        # the buffer gets reused for every frame, a fresh view of it keeps the read only
+        # flag the detector sets from sticking to the buffer
+        self.frame = self._prepare(self._decoded, self._buffers[0])
+        self.color_space = self.frame_space
 
     def set_color_space(self, space):
+        if space == self.color_space:
+            return
         self.frame = cv2.cvtColor(self.frame, self.color_spaces[space])
+        self.color_space = space
+
+    # region sampling
+    def set_sampling(self, step: int, offset: int = 0):
+        """ Only decodes every step-th frame, starting offset frames ahead.
+        Skipped frames get grabbed without being retrieved, large steps seek. """
+        self.sample_step = max(1, step)
+        self._skip = offset
+
+    def set_inference_size(self, long_side: int):
+        """ Downscales frames to long_side pixels (keeping the aspect) before they get colour converted. """
+        w = self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)
+        h = self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        if long_side <= 0 or w <= 0 or h <= 0 or max(w, h) <= long_side:
+            self.inference_dim = None
+            return
+        aspect = long_side / max(w, h)
+        self.inference_dim = (int(w * aspect), int(h * aspect))
+
+    def _skip_frames(self, count: int) -> bool:
+        if count <= 0:
+            return True
+        if self.is_movie and count >= SEEK_SKIP:
+            position = self.capture.get(cv2.CAP_PROP_POS_FRAMES)
+            return self.capture.set(cv2.CAP_PROP_POS_FRAMES, position + count)
+        for _ in range(count):
+            if not self.capture.grab():
+                return False
+        return True
+
+    def _read(self, frame: np.ndarray = None):
+        if not self._skip_frames(self._skip):
+            return False, None
+        self._skip = self.sample_step - 1
+        return self.capture.read() if frame is None else self.capture.read(frame)
+    # endregion
+
+    def frame_count(self) -> int:
+        """ Frame count reported by the container, may be 0 or approximate for some codecs. """
+        return max(0, int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+
+    def seek(self, index: int):
+        """ Moves a movie to frame index, has to be called before prefetching starts. """
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+    # region prefetch
+    def start_prefetch(self, size: int = 4, color_space: str = None, dim: Tuple[int, int] = None):
+        """ Decodes frames on a producer thread into a ring of preallocated buffers.
+        Frames get sampled, flipped, optionally resized to dim and converted to color_space
+        (defaults to the frame_space) before update() hands them out. cv2 releases the GIL while decoding,
+        so decoding overlaps with detection on the consuming thread. """
+        if self._producer is not None:
+            return
+
+        self._ring_size = max(2, size)
+        if color_space is not None:
+            self.frame_space = color_space
+        if dim is not None:
+            self.inference_dim = dim
+        self._buffers = None
+        self._held = None
+        self._free = queue.Queue()
+        for slot in range(self._ring_size):
+            self._free.put(slot)
+        self._filled = queue.Queue()
+        self._stop = threading.Event()
+        self._producer_error = None
+        self.prefetch_stats = {'frames': 0, 'starved': 0, 'overflow': 0, 'dropped': 0}
+
+        self._producer = threading.Thread(target=self._produce, name=f"{self.title} prefetch", daemon=True)
+        self._producer.start()
+
+    def stop_prefetch(self):
+        if self._producer is None:
+            return
+        self._stop.set()
+        self._producer.join()
+        self._producer = None
+
+    def _allocate(self, frame: np.ndarray, slots: int):
+        self._decoded_shape = frame.shape
+        (h, w) = frame.shape[:2]
+        if self.inference_dim is not None:
+            (w, h) = self.inference_dim
+            self._resized = np.empty((h, w, 3), dtype=np.uint8)
+        self._flipped = np.empty((h, w, 3), dtype=np.uint8)
+        self._buffers = np.empty((slots, h, w, 3), dtype=np.uint8)
+
+    def _prepare(self, frame: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """ Resizes, flips and converts a decoded bgr frame into dst. """
+        src = frame
+        if self.inference_dim is not None:
+            src = cv2.resize(frame, self.inference_dim, dst=self._resized, interpolation=cv2.INTER_AREA)
+        if self.flip and self.frame_space != 'bgr':
+            cv2.flip(src, 1, dst=self._flipped)
+            cv2.cvtColor(self._flipped, self.color_spaces[self.frame_space], dst=dst)
+        elif self.flip:
+            cv2.flip(src, 1, dst=dst)
+        elif self.frame_space != 'bgr':
+            cv2.cvtColor(src, self.color_spaces[self.frame_space], dst=dst)
+        else:
+            np.copyto(dst, src)
+        return dst
+
+    def _acquire_slot(self) -> Optional[int]:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            self.prefetch_stats['overflow'] += 1
+
+        if not self.is_movie:
+            # live input: drop the oldest frame rather than falling behind
+            try:
+                slot, _ = self._filled.get_nowait()
+                if slot is not None:
+                    self.prefetch_stats['dropped'] += 1
+                    return slot
+            except queue.Empty:
+                pass
+
+        while not self._stop.is_set():
+            try:
+                return self._free.get(timeout=.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _produce(self):
+        try:
+            self._produce_frames()
+        except BaseException as e:
+            # update() raises it once the frames queued before the failure got handed out
+            self._producer_error = e
+            self._filled.put((None, False))
+
+    def _produce_frames(self):
+        frame = None
+        while not self._stop.is_set():
+            updated, frame = self._read(frame)
+            if not updated or frame is None:
+                self._filled.put((None, False))
+                if self.is_movie:
+                    return
+                frame = None
+                time.sleep(.01)
+                continue
+
+            if self._buffers is None:
+                self._allocate(frame, self._ring_size)
+
+            slot = self._acquire_slot()
+            if slot is None:
+                return
+
+            self._prepare(frame, self._buffers[slot])
+            self._filled.put((slot, True))
+
+    def _update_prefetched(self):
+        if self._held is not None:
+            self._free.put(self._held)
+            self._held = None
+
+        if self._filled.empty():
+            self.prefetch_stats['starved'] += 1
+
+        slot, self.updated = None, False
+        while True:
+            try:
+                slot, self.updated = self._filled.get(timeout=.1)
+                break
+            except queue.Empty:
+                if self._producer.is_alive():
+                    continue
+            # the producer may have queued its last frames between the timeout and its exit
+            try:
+                slot, self.updated = self._filled.get_nowait()
+            except queue.Empty:
+                pass
+            break
+
+        if slot is None:
+            self.frame = None
+            if self._producer_error is not None and self._filled.empty():
+                error, self._producer_error = self._producer_error, None
+                raise error
+            return
+
+        self._held = slot
+        self.frame = self._buffers[slot]
+        self.color_space = self.frame_space
+        self.prefetch_stats['frames'] += 1
+    # endregion
 
     def resize_movie_frame(self):
         if not self.frame_configured:
@@ -99,6 +325,7 @@ class Stream:
 
     def __del__(self):
         logging.debug("DEL STREAM")
+        self.stop_prefetch()
         self.capture.release()
         cv2.destroyAllWindows()
 
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import ast
+import hashlib
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+# bump when the npz layout changes, calculator changes are covered by calculator_version
+CACHE_FORMAT = 1
+ADDON_INIT = Path(__file__).resolve().parents[3] / "__init__.py"
+# sources whose changes alter the cached results
+CALCULATOR_SOURCES = [
+    *sorted((Path(__file__).resolve().parents[2] / "cgt_core" / "cgt_calculators_nodes").glob("*.py")),
+    Path(__file__).resolve().parent / "mp_offline_runner.py",
+]
+_calculator_version = None
+
+
+def addon_version() -> str:
+    """ Version from the add-on's bl_info, read without importing bpy. """
+    try:
+        tree = ast.parse(ADDON_INIT.read_text())
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'bl_info' for t in node.targets):
+                return ".".join(str(v) for v in ast.literal_eval(node.value)["version"])
+    except (OSError, SyntaxError, ValueError, KeyError):
+        logging.warning(f"Could not read add-on version from {ADDON_INIT}")
+    return "unknown"
+
+
+def calculator_version() -> str:
+    """ Digest of the calculator and runner sources, so results of older calculators aren't replayed. """
+    global _calculator_version
+    if _calculator_version is None:
+        h = hashlib.sha256()
+        for path in CALCULATOR_SOURCES:
+            h.update(path.name.encode())
+            h.update(path.read_bytes())
+        _calculator_version = h.hexdigest()
+    return _calculator_version
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(video_sha256: str, **settings) -> str:
+    """ Key of detection results: the video content, every setting changing the results,
+    the add-on version and the calculator sources. """
+    payload = json.dumps({
+        'video': video_sha256,
+        'settings': settings,
+        'version': addon_version(),
+        'calculators': calculator_version(),
+        'format': CACHE_FORMAT,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DetectionCache:
+    """ Offline detection results (npz) on disk, addressed by cache_key. """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.npz")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        return path if os.path.exists(path) else None
+
+    def tmp_path(self, key: str) -> str:
+        """ Path to write results to before they get committed with put. """
+        os.makedirs(os.path.dirname(self.path_for(key)), exist_ok=True)
+        return os.path.join(os.path.dirname(self.path_for(key)), f".{key}.{uuid.uuid4().hex}.npz")
+
+    def put(self, key: str, npz_path: str) -> str:
+        """ Moves a results file into the cache, concurrent writers of the same key are fine. """
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(npz_path, path)
+        return path
@@ -1,25 +1,87 @@
 from __future__ import annotations
 
+import numpy as np
 from mediapipe import solutions
 from abc import abstractmethod
 
 from . import cv_stream
+from .mp_roi import RegionOfInterest
+from .mp_motion import MotionGate, SKIPPED
 from ...cgt_core.cgt_patterns import cgt_nodes
+from ...cgt_core.cgt_landmarks import LandmarkArray
+
+# negates x of (N, 3) landmark arrays
+MIRROR_X = np.array([-1, 1, 1], dtype=np.float32)
 
 
 class DetectorNode(cgt_nodes.InputNode):
     stream: cv_stream.Stream = None
     solution = None
+    mp_lib = None
+    headless: bool = False
+    # detectors which can mirror their results don't need the stream to flip frames
+    mirrors_landmarks: bool = False
+    # detected data in normalized image coordinates has to be mapped back from roi crops
+    image_space_data: bool = False
+    roi: RegionOfInterest = None
+    motion_gate: MotionGate = None
+    frame: int = -1
 
     def __init__(self, stream: cv_stream.Stream = None):
         self.stream = stream
+        self.mp_lib = None
         self.drawing_utils = solutions.drawing_utils
         self.drawing_style = solutions.drawing_styles
 
+    def update(self, data, frame):
+        self.frame = frame
+        return self.exec_detection(self.get_mp_lib()), frame
+
     @abstractmethod
-    def update(self, *args):
+    def create_mp_lib(self, static_image_mode: bool):
+        """ Returns a new mediapipe solution instance (e.g. solutions.pose.Pose). """
         pass
 
+    def get_mp_lib(self):
+        """ The solution graph is built once and kept for the life of the stream,
+        so tracking carries over between frames of a movie or webcam. """
+        if self.mp_lib is None:
+            self.mp_lib = self.create_mp_lib(static_image_mode=False)
+        return self.mp_lib
+
+    def set_headless(self, headless: bool = True):
+        """ Headless detection doesn't draw results or poll cv2 windows.
+        The stream delivers frames converted to rgb once and only flips them,
+        if the detector can't mirror its landmarks instead. """
+        self.headless = headless
+        if self.stream is not None:
+            self.stream.frame_space = 'rgb' if headless else 'bgr'
+            self.stream.flip = not (headless and self.mirrors_landmarks)
+
+    def set_roi(self, roi: bool = True, padding: float = .25):
+        """ Headless detection on a padded crop around the previous frame's landmarks. """
+        self.roi = RegionOfInterest(padding) if roi else None
+
+    def set_motion_gate(self, threshold: float = .02, max_skips: int = 3):
+        """ Headless detection returns SKIPPED instead of running inference on frames
+        which barely changed since the last detection, threshold 0 disables. """
+        self.motion_gate = MotionGate(threshold, max_skips) if threshold > 0 else None
+
+    def image_landmarks(self, mp_res) -> list:
+        """ Normalized image landmark protos framing the subject. """
+        return []
+
+    def mirror_data(self, data):
+        """ Returns detected data as if detected on a horizontally flipped frame. """
+        return data
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_prefetch()
+        if self.mp_lib is not None:
+            self.mp_lib.close()
+            self.mp_lib = None
+
     @abstractmethod
     def contains_features(self, mp_res):
         pass
@@ -56,6 +118,9 @@ class DetectorNode(cgt_nodes.InputNode):
             # ignore frame if not available
             return self.empty_data()
 
+        if self.headless:
+            return self.exec_headless_detection(mp_lib)
+
         # detect features in frame
         self.stream.frame.flags.writeable = False
         self.stream.set_color_space('rgb')
@@ -79,10 +144,35 @@ class DetectorNode(cgt_nodes.InputNode):
 
         return self.detected_data(mp_res)
 
-    def cvt2landmark_array(self, landmark_list):
+    def exec_headless_detection(self, mp_lib):
+        self.stream.set_color_space('rgb')
+        frame = self.stream.frame
+        if self.motion_gate is not None and self.motion_gate.skip(frame):
+            return SKIPPED
+        if self.roi is not None:
+            frame = self.roi.crop(frame)
+        frame.flags.writeable = False
+        mp_res = mp_lib.process(frame)
+
+        if not self.contains_features(mp_res):
+            if self.roi is not None:
+                self.roi.lost()
+            return self.empty_data()
+
+        data = self.detected_data(mp_res)
+        if self.roi is not None:
+            self.roi.update(self.image_landmarks(mp_res))
+            if self.image_space_data:
+                data = self.roi.to_frame(data)
+        if not self.stream.flip:
+            data = self.mirror_data(data)
+        return data
+
+    def cvt2landmark_array(self, landmark_list) -> LandmarkArray:
         """landmark_list: A normalized landmark list proto message to be annotated on the image."""
-        return [[idx, [landmark.x, landmark.y, landmark.z]] for idx, landmark in enumerate(landmark_list.landmark)]
+        return LandmarkArray.from_proto(landmark_list, self.frame)
 
     def __del__(self):
+        self.close()
         if self.stream is not None:
             del self.stream
@@ -6,19 +6,20 @@ from mediapipe.python.solutions.drawing_utils import DrawingSpec
 
 
 class FaceDetector(DetectorNode):
+    image_space_data = True
+
     def __init__(self, stream, refine_face_landmarks: bool = False, min_detection_confidence: float = 0.7):
         DetectorNode.__init__(self, stream)
         self.solution = mp.solutions.face_mesh
         self.refine_face_landmarks = refine_face_landmarks
         self.min_detection_confidence = min_detection_confidence
 
-    def update(self, data, frame):
-        with self.solution.FaceMesh(
-                max_num_faces=1,
-                static_image_mode=False,
-                refine_landmarks=self.refine_face_landmarks,
-                min_detection_confidence=self.min_detection_confidence) as mp_lib:
-            return self.exec_detection(mp_lib), frame
+    def create_mp_lib(self, static_image_mode: bool):
+        return self.solution.FaceMesh(
+            max_num_faces=1,
+            static_image_mode=static_image_mode,
+            refine_landmarks=self.refine_face_landmarks,
+            min_detection_confidence=self.min_detection_confidence)
 
     def empty_data(self):
         return [[[]]]
@@ -26,6 +27,9 @@ class FaceDetector(DetectorNode):
     def detected_data(self, mp_res):
         return [self.cvt2landmark_array(landmark) for landmark in mp_res.multi_face_landmarks]
 
+    def image_landmarks(self, mp_res):
+        return mp_res.multi_face_landmarks
+
     def contains_features(self, mp_res):
         if not mp_res.multi_face_landmarks:
             return False
@@ -1,12 +1,15 @@
 import mediapipe as mp
 from mediapipe.framework.formats import classification_pb2
 
-from .mp_detector_node import DetectorNode
+from .mp_detector_node import DetectorNode, MIRROR_X
+from ...cgt_core.cgt_landmarks import LandmarkArray
 from . import cv_stream
 from ...cgt_core.cgt_utils import cgt_timers
 
 
 class HandDetector(DetectorNode):
+    mirrors_landmarks = True
+
     def __init__(self, stream, hand_model_complexity: int = 1, min_detection_confidence: float = .7):
         DetectorNode.__init__(self, stream)
         self.solution = mp.solutions.hands
@@ -14,13 +17,12 @@ class HandDetector(DetectorNode):
         self.min_detection_confidence = min_detection_confidence
 
     # https://google.github.io/mediapipe/solutions/hands#python-solution-api
-    def update(self, data, frame):
-        with self.solution.Hands(
-                static_image_mode=True,
-                max_num_hands=2,
-                model_complexity=self.hand_model_complexity,
-                min_detection_confidence=self.min_detection_confidence) as mp_lib:
-            return self.exec_detection(mp_lib), frame
+    def create_mp_lib(self, static_image_mode: bool):
+        return self.solution.Hands(
+            static_image_mode=static_image_mode,
+            max_num_hands=2,
+            model_complexity=self.hand_model_complexity,
+            min_detection_confidence=self.min_detection_confidence)
 
     @staticmethod
     def separate_hands(hand_data):
@@ -35,6 +37,16 @@ class HandDetector(DetectorNode):
 
         return [[idx, "Right" in str(o)] for idx, o in enumerate(orientation)]
 
+    def image_landmarks(self, mp_res):
+        return mp_res.multi_hand_landmarks or []
+
+    def mirror_data(self, data):
+        """ Hands of a flipped frame: handedness swapped, x of the world landmarks negated. """
+        def mirror(hands):
+            return [LandmarkArray(hand.points * MIRROR_X, hand.visibility, hand.frame) for hand in hands]
+        left_hand_data, right_hand_data = data
+        return [mirror(right_hand_data), mirror(left_hand_data)]
+
     def empty_data(self):
         return [[], []]
 
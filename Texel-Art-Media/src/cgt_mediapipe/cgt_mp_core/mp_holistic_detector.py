@@ -6,6 +6,8 @@ ssl._create_default_https_context = ssl._create_unverified_context
 
 
 class HolisticDetector(mp_detector_node.DetectorNode):
+    image_space_data = True
+
     def __init__(self, stream, model_complexity: int = 1,
                  min_detection_confidence: float = .7, refine_face_landmarks: bool = False):
 
@@ -16,14 +18,13 @@ class HolisticDetector(mp_detector_node.DetectorNode):
         self.refine_face_landmarks = refine_face_landmarks
 
     # https://google.github.io/mediapipe/solutions/holistic#python-solution-api
-    def update(self, data, frame):
-        with self.solution.Holistic(
-                refine_face_landmarks=self.refine_face_landmarks,
-                model_complexity=self.model_complexity,
-                min_detection_confidence=self.min_detection_confidence,
-                static_image_mode=True,
-        ) as mp_lib:
-            return self.exec_detection(mp_lib), frame
+    def create_mp_lib(self, static_image_mode: bool):
+        return self.solution.Holistic(
+            refine_face_landmarks=self.refine_face_landmarks,
+            model_complexity=self.model_complexity,
+            min_detection_confidence=self.min_detection_confidence,
+            static_image_mode=static_image_mode,
+        )
 
     def empty_data(self):
         return [[[], []], [[[]]], []]
@@ -40,6 +41,10 @@ class HolisticDetector(mp_detector_node.DetectorNode):
             r_hand = [self.cvt2landmark_array(mp_res.right_hand_landmarks)]
         return [[l_hand, r_hand], [face], pose]
 
+    def image_landmarks(self, mp_res):
+        return [mp_res.pose_landmarks, mp_res.face_landmarks,
+                mp_res.left_hand_landmarks, mp_res.right_hand_landmarks]
+
     def contains_features(self, mp_res):
         if not mp_res.pose_landmarks:
             return False
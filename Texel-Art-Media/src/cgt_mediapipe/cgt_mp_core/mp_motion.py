@@ -0,0 +1,93 @@
+from __future__ import annotations
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from ...cgt_core.cgt_landmarks import LandmarkArray
+
+# returned by detectors instead of data when inference got skipped
+SKIPPED = object()
+
+
+class MotionGate:
+    """ Decides whether a frame is worth an inference by comparing a small grayscale
+    thumbnail against the one of the last detected frame. Comparing against the last
+    detection instead of the previous frame keeps slow drifts from slipping through,
+    the largest thumbnail pixel change catches small subjects in large frames. """
+
+    def __init__(self, threshold: float = .02, max_skips: int = 3, size: int = 64):
+        # threshold on a 0-1 intensity scale, max_skips consecutive frames without inference
+        self.threshold = threshold
+        self.max_skips = max_skips
+        self.size = size
+        self.reference = None
+        self.skips = 0
+        self.stats = {'frames': 0, 'skipped': 0}
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        scale = self.size / max(h, w)
+        small = cv2.resize(frame, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        return small.astype(np.float32) / 255
+
+    def skip(self, frame: np.ndarray) -> bool:
+        thumb = self.thumbnail(frame)
+        self.stats['frames'] += 1
+        if self.reference is not None and self.reference.shape == thumb.shape and self.skips < self.max_skips \
+                and np.abs(thumb - self.reference).max() < self.threshold:
+            self.skips += 1
+            self.stats['skipped'] += 1
+            return True
+
+        self.reference = thumb
+        self.skips = 0
+        return False
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.stats['skipped'] / max(1, self.stats['frames'])
+
+
+def interpolate(a, b, t: float):
+    """ Linear blend of two detection results of the same layout, holds a where they differ. """
+    if isinstance(a, LandmarkArray) and isinstance(b, LandmarkArray) and len(a) == len(b):
+        return LandmarkArray(a.points + (b.points - a.points) * np.float32(t), a.visibility, a.frame)
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        return [interpolate(x, y, t) for x, y in zip(a, b)]
+    if isinstance(a, float) and isinstance(b, float):
+        return a + (b - a) * t
+    return a
+
+
+class SkipFiller:
+    """ Holds back frames without inference until the next detection,
+    then hands them out with landmarks interpolated in between. """
+
+    def __init__(self):
+        self.prev = None
+        self.prev_frame = None
+        self.pending: List[int] = []
+
+    def skip(self, frame: int):
+        self.pending.append(frame)
+
+    def push(self, data, frame: int) -> List[Tuple[object, int]]:
+        """ Returns [(data, frame), ...] of the pending frames and the detected one. """
+        out = []
+        for at in self.pending:
+            t = (at - self.prev_frame) / (frame - self.prev_frame)
+            out.append((interpolate(self.prev, data, t), at))
+        out.append((data, frame))
+        self.pending.clear()
+        # smoothing averages into the handed out data, keep a copy to interpolate from
+        self.prev, self.prev_frame = interpolate(data, data, 0.), frame
+        return out
+
+    def flush(self) -> List[Tuple[object, int]]:
+        """ Frames skipped before the movie ended keep the last detection. """
+        out = [(interpolate(self.prev, self.prev, 0.), at) for at in self.pending]
+        self.pending.clear()
+        return out
@@ -0,0 +1,348 @@
+from __future__ import annotations
+import argparse
+import contextlib
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from . import cv_stream, mp_motion, mp_smoothing
+from ...cgt_core.cgt_calculators_nodes import mp_calc_face_rot, mp_calc_hand_rot, mp_calc_pose_rot
+from ...cgt_core.cgt_landmarks import LandmarkArray
+
+CHANNELS = ("location", "rotation_euler", "scale")
+# frames a segment detects ahead of its range so tracking has settled
+SEGMENT_OVERLAP = 30
+# automatic segmenting doesn't split movies into shorter parts than this
+MIN_SEGMENT_FRAMES = 240
+
+
+def get_detector(detection_type: str, stream: cv_stream.Stream, model_complexity: int = 1,
+                 min_detection_confidence: float = 0.5, refine_face_landmarks: bool = False):
+    from . import mp_hand_detector, mp_face_detector, mp_pose_detector, mp_holistic_detector
+    if detection_type == 'HAND':
+        return mp_hand_detector.HandDetector(stream, model_complexity, min_detection_confidence)
+    elif detection_type == 'POSE':
+        return mp_pose_detector.PoseDetector(stream, model_complexity, min_detection_confidence)
+    elif detection_type == 'FACE':
+        return mp_face_detector.FaceDetector(stream, refine_face_landmarks, min_detection_confidence)
+    elif detection_type == 'HOLISTIC':
+        return mp_holistic_detector.HolisticDetector(
+            stream, model_complexity, min_detection_confidence, refine_face_landmarks)
+    raise ValueError(f"Unknown detection type: {detection_type}")
+
+
+class OfflineCalculator:
+    """ Runs the rotation calculators of a detection type, without the bpy output nodes.
+        Results are split per output target: pose, face, hand.L and hand.R. """
+
+    def __init__(self, detection_type: str):
+        self.detection_type = detection_type
+        self.pose = mp_calc_pose_rot.PoseRotationCalculator()
+        self.face = mp_calc_face_rot.FaceRotationCalculator()
+        self.hand = mp_calc_hand_rot.HandRotationCalculator()
+
+    @staticmethod
+    def split_hands(results):
+        loc, rot, sca = results
+        return [('hand.L', [loc[0], rot[0], sca[0]]), ('hand.R', [loc[1], rot[1], sca[1]])]
+
+    def update(self, data, frame: int) -> List[Tuple[str, list]]:
+        if self.detection_type == 'POSE':
+            return [('pose', self.pose.update(data, frame)[0])]
+        elif self.detection_type == 'FACE':
+            return [('face', self.face.update(data, frame)[0])]
+        elif self.detection_type == 'HAND':
+            return self.split_hands(self.hand.update(data, frame)[0])
+
+        # holistic data: [hands, face, pose]
+        hands, face, pose = data
+        return [
+            *self.split_hands(self.hand.update(hands, frame)[0]),
+            ('face', self.face.update(face, frame)[0]),
+            ('pose', self.pose.update(pose, frame)[0]),
+        ]
+
+
+class TransformRecorder:
+    """ Collects calculator results as rows of [frame, idx, x, y, z] per target and channel. """
+
+    def __init__(self):
+        self.blocks: Dict[str, List[np.ndarray]] = {}
+
+    def record(self, target: str, results: list, frame: int):
+        for channel, chunk in zip(CHANNELS, results):
+            if isinstance(chunk, LandmarkArray):
+                rows = np.empty((len(chunk), 5))
+                rows[:, 0], rows[:, 1], rows[:, 2:] = frame, np.arange(len(chunk)), chunk.points
+            else:
+                rows = [[frame, landmark[0], *landmark[1]] for landmark in chunk
+                        if isinstance(landmark, (list, tuple)) and len(landmark) == 2
+                        and landmark[1] is not None and len(landmark[1]) == 3]
+            if len(rows):
+                self.blocks.setdefault(f"{target}.{channel}", []).append(np.asarray(rows, dtype=np.float64))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {key: np.concatenate(blocks) for key, blocks in self.blocks.items()}
+
+
+def detect(mov_path: str, detection_type: str, key_frame_step: int, start_frame: int,
+           model_complexity: int, min_detection_confidence: float, refine_face_landmarks: bool,
+           prefetch: int, decimate: bool = True, inference_size: int = 0, roi: bool = False,
+           motion_threshold: float = 0, max_skips: int = 3,
+           seek: int = 0, record_from: int = None, stop_at: int = None
+           ) -> Tuple[Dict[str, np.ndarray], int]:
+    """ Detects a movie in a tight loop, starting at movie frame seek.
+        With decimate only key frames get decoded and detected, then low-pass filtered
+        across keys. Otherwise it mirrors the movie branch of the modal operator:
+        every frame gets detected and smoothed until the next key frame.
+        With roi, frames get cropped around the subject of the previous detection.
+        With a motion_threshold, frames which barely changed since the last detection skip
+        inference (at most max_skips in a row) and get landmarks interpolated instead.
+        Scene frames before record_from run for warm-up only, recording stops before stop_at.
+        Returns the recorded arrays and the last detected scene frame. """
+    stream = cv_stream.Stream(mov_path, "Offline Detection")
+    if seek > 0:
+        stream.seek(seek)
+
+    frame, step = start_frame + seek, 1
+    key_filter = None
+    if decimate:
+        offset = -frame % key_frame_step
+        stream.set_sampling(key_frame_step, offset)
+        frame, step = frame + offset, key_frame_step
+        key_filter = mp_smoothing.KeyframeFilter()
+    if inference_size > 0:
+        stream.set_inference_size(inference_size)
+
+    # nothing gets displayed, headless detection configures the stream's colour space and flipping
+    detector = get_detector(detection_type, stream, model_complexity, min_detection_confidence, refine_face_landmarks)
+    detector.set_headless()
+    detector.set_roi(roi)
+    detector.set_motion_gate(motion_threshold, max_skips)
+    filler = mp_motion.SkipFiller()
+    if prefetch > 0:
+        stream.start_prefetch(prefetch)
+    calculator = OfflineCalculator(detection_type)
+    recorder = TransformRecorder()
+    record_from = start_frame + seek if record_from is None else record_from
+
+    def calculate(data, at):
+        for target, results in calculator.update(data, at):
+            if record_from <= at and (stop_at is None or at < stop_at):
+                recorder.record(target, results, at)
+
+    def process(data, at):
+        if key_filter is not None:
+            for key_data, key_frame in key_filter.push(data, at):
+                calculate(key_data, key_frame)
+        else:
+            mp_smoothing.simple_smoothing(memo, data)
+            if at % key_frame_step == 0:
+                calculate(memo, at)
+                memo.clear()
+
+    # the key filter needs the key after stop_at to smooth the last recorded one
+    last = None if stop_at is None else stop_at + (key_frame_step if decimate else 0)
+    memo = []
+    try:
+        while last is None or frame < last:
+            data, _ = detector.update([], frame)
+            if data is None:
+                break
+
+            if data is mp_motion.SKIPPED:
+                filler.skip(frame)
+            else:
+                for frame_data, at in filler.push(data, frame):
+                    process(frame_data, at)
+            frame += step
+
+        for frame_data, at in filler.flush():
+            process(frame_data, at)
+        if key_filter is not None:
+            for key_data, key_frame in key_filter.flush():
+                calculate(key_data, key_frame)
+    finally:
+        if detector.roi is not None:
+            logging.info(f"Region of interest: {detector.roi.stats}")
+        if detector.motion_gate is not None:
+            logging.info(f"Motion skipping: {detector.motion_gate.stats}, "
+                         f"skip ratio {detector.motion_gate.skip_ratio:.2f}")
+        detector.close()
+        del detector
+
+    if stream.prefetch_stats is not None:
+        logging.info(f"Prefetch: {stream.prefetch_stats}")
+    return recorder.arrays(), frame - step
+
+
+def _detect_segment(kwargs):
+    return detect(**kwargs)
+
+
+@contextlib.contextmanager
+def _plain_main():
+    """ Spawned processes re-run the parent's __main__, blender's script main imports bpy
+        which only exists in the blender binary. Hands them an empty main instead. """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+def segment_bounds(frame_count: int, segments: int, overlap: int, key_frame_step: int,
+                   start_frame: int) -> List[Tuple[int, int, int]]:
+    """ Splits movie frames into (warmup, first, end) ranges.
+        Boundaries land right after a key frame, so each segment starts with the
+        empty smoothing memo the sequential loop would have there. """
+    def align(index):
+        while index < frame_count and (start_frame + index - 1) % key_frame_step != 0:
+            index += 1
+        return index
+
+    overlap = -(-overlap // key_frame_step) * key_frame_step
+    starts = sorted({0, *(align(frame_count * i // segments) for i in range(1, segments))})
+    starts = [idx for idx in starts if idx < frame_count]
+    ends = starts[1:] + [None]
+    return [(max(0, first - overlap) if first > 0 else 0, first, end) for first, end in zip(starts, ends)]
+
+
+def unwind_rotations(prev: np.ndarray, cur: np.ndarray):
+    """ Moves each object's euler rotations in cur onto the equivalent euler branch
+        closest to where prev ends. Segments only share a short warm-up, so euler
+        continuity may have settled on other turns than the sequential run did. """
+    for idx in np.unique(cur[:, 1]):
+        prev_rows = prev[prev[:, 1] == idx]
+        if len(prev_rows) == 0:
+            continue
+        last = prev_rows[-1, 2:]
+        mask = cur[:, 1] == idx
+        rows = cur[mask, 2:]
+
+        candidates = []
+        # (x, y, z) and (x + pi, pi - y, z + pi) describe the same rotation
+        for branch in (rows, rows * (1, -1, 1) + np.pi):
+            turns = np.round((last - branch[0]) / (2 * np.pi)) * 2 * np.pi
+            candidates.append((np.abs(last - branch[0] - turns).sum(), branch + turns))
+        cur[mask, 2:] = min(candidates, key=lambda c: c[0])[1]
+
+
+def stitch_segments(segments: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """ Concatenates per segment results in order. """
+    keys = sorted({key for seg_arrays in segments for key in seg_arrays})
+    stitched = {}
+    for key in keys:
+        parts = [seg_arrays[key] for seg_arrays in segments if key in seg_arrays and len(seg_arrays[key])]
+        if key.endswith('.rotation_euler'):
+            for prev, cur in zip(parts, parts[1:]):
+                unwind_rotations(prev, cur)
+        stitched[key] = np.concatenate(parts) if parts else np.empty((0, 5))
+    return stitched
+
+
+def run(mov_path: str, out_path: str, detection_type: str = 'POSE', key_frame_step: int = 4,
+        start_frame: int = 1, model_complexity: int = 1, min_detection_confidence: float = 0.5,
+        refine_face_landmarks: bool = False, prefetch: int = 4, segments: int = 1,
+        overlap: int = SEGMENT_OVERLAP, decimate: bool = True, inference_size: int = 0,
+        roi: bool = False, motion_threshold: float = 0, max_skips: int = 3, max_workers: int = 0) -> str:
+    """ Detects a movie and saves the calculator results as npz.
+        With segments > 1 (or 0 for one per worker) the movie gets split in time segments
+        which run in up to max_workers (0 for one per core) separate processes. Each segment
+        warms the tracker up on overlap frames before its own range, those results get
+        discarded when stitching. """
+    started = time.perf_counter()
+    settings = dict(
+        mov_path=mov_path, detection_type=detection_type, key_frame_step=key_frame_step,
+        start_frame=start_frame, model_complexity=model_complexity,
+        min_detection_confidence=min_detection_confidence,
+        refine_face_landmarks=refine_face_landmarks, prefetch=prefetch,
+        decimate=decimate, inference_size=inference_size, roi=roi,
+        motion_threshold=motion_threshold, max_skips=max_skips)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    bounds = [(0, 0, None)]
+    if segments != 1:
+        stream = cv_stream.Stream(mov_path, "Offline Detection")
+        frame_count = stream.frame_count()
+        del stream
+        if segments == 0:
+            segments = min(max_workers, frame_count // MIN_SEGMENT_FRAMES)
+        if segments > 1:
+            bounds = segment_bounds(frame_count, segments, overlap, key_frame_step, start_frame)
+
+    if len(bounds) == 1:
+        arrays, end_frame = detect(**settings)
+    else:
+        jobs = [dict(settings, seek=warmup, record_from=start_frame + first,
+                     stop_at=None if end is None else start_frame + end)
+                for warmup, first, end in bounds]
+        # forking the multithreaded blender process may deadlock, spawn fresh interpreters there
+        fork = 'bpy' not in sys.modules and 'fork' in multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if fork else 'spawn')
+        with ProcessPoolExecutor(max_workers=min(len(jobs), max_workers), mp_context=context) as pool:
+            with _plain_main():
+                futures = [pool.submit(_detect_segment, job) for job in jobs]
+            results = [future.result() for future in futures]
+
+        arrays = stitch_segments([seg_arrays for seg_arrays, _ in results])
+        end_frame = results[-1][1]
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"Offline detection of {end_frame - start_frame + 1} frames "
+                 f"in {len(bounds)} segment(s) took {elapsed:.2f}s")
+
+    if not out_path.endswith('.npz'):
+        out_path += '.npz'
+    np.savez(
+        out_path,
+        detection_type=np.array(detection_type),
+        start_frame=np.array(start_frame),
+        end_frame=np.array(end_frame),
+        key_frame_step=np.array(key_frame_step),
+        **arrays
+    )
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mediapipe detection writing an npz for Blender to import.")
+    parser.add_argument("movie")
+    parser.add_argument("output")
+    parser.add_argument("--type", default='POSE', choices=['POSE', 'HAND', 'FACE', 'HOLISTIC'])
+    parser.add_argument("--key-frame-step", type=int, default=4)
+    parser.add_argument("--start-frame", type=int, default=1)
+    parser.add_argument("--model-complexity", type=int, default=1)
+    parser.add_argument("--min-detection-confidence", type=float, default=0.5)
+    parser.add_argument("--refine-face-landmarks", action='store_true')
+    parser.add_argument("--prefetch", type=int, default=4, help="Ring size of decoded frames, 0 disables.")
+    parser.add_argument("--segments", type=int, default=1, help="Parallel time segments, 0 for one per worker.")
+    parser.add_argument("--max-workers", type=int, default=0, help="Segment processes at once, 0 for one per core.")
+    parser.add_argument("--overlap", type=int, default=SEGMENT_OVERLAP)
+    parser.add_argument("--no-decimate", dest='decimate', action='store_false',
+                        help="Detect every frame and average between keys like the modal operator.")
+    parser.add_argument("--inference-size", type=int, default=0, help="Long side to downscale frames to, 0 keeps.")
+    parser.add_argument("--roi", action='store_true',
+                        help="Crop frames to the subject of the previous detection.")
+    parser.add_argument("--motion-threshold", type=float, default=0,
+                        help="Skip inference on frames changing less than this (0-1), 0 detects every frame.")
+    parser.add_argument("--max-skips", type=int, default=3, help="Most consecutive frames without inference.")
+    args = parser.parse_args()
+
+    out = run(args.movie, args.output, args.type, args.key_frame_step, args.start_frame,
+              args.model_complexity, args.min_detection_confidence, args.refine_face_landmarks, args.prefetch,
+              args.segments, args.overlap, args.decimate, args.inference_size, args.roi,
+              args.motion_threshold, args.max_skips, args.max_workers)
+    print(out)
+
+
+if __name__ == '__main__':
+    main()
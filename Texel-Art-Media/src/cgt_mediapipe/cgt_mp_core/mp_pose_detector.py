@@ -1,9 +1,16 @@
 import mediapipe as mp
 
 from . import cv_stream, mp_detector_node
+from .mp_detector_node import MIRROR_X
+from ...cgt_core.cgt_landmarks import LandmarkArray
 
 
 class PoseDetector(mp_detector_node.DetectorNode):
+    mirrors_landmarks = True
+    # landmark indices swapping left and right
+    # https://google.github.io/mediapipe/solutions/pose#pose-landmark-model-blazepose-ghum-3d
+    mirrored_indices = [0, 4, 5, 6, 1, 2, 3, 8, 7, 10, 9] + [i + 1 if i % 2 else i - 1 for i in range(11, 33)]
+
     def __init__(self, stream, pose_model_complexity: int = 1, min_detection_confidence: float = 0.7):
         mp_detector_node.DetectorNode.__init__(self, stream)
         self.pose_model_complexity = pose_model_complexity
@@ -11,17 +18,26 @@ class PoseDetector(mp_detector_node.DetectorNode):
         self.solution = mp.solutions.pose
 
     # https://google.github.io/mediapipe/solutions/pose#python-solution-api
-    def update(self, data, frame):
+    def create_mp_lib(self, static_image_mode: bool):
         # BlazePose GHUM 3D
-        with self.solution.Pose(
-                static_image_mode=True,
-                model_complexity=self.pose_model_complexity,
-                min_detection_confidence=self.min_detection_confidence) as mp_lib:
-            return self.exec_detection(mp_lib), frame
+        return self.solution.Pose(
+            static_image_mode=static_image_mode,
+            model_complexity=self.pose_model_complexity,
+            min_detection_confidence=self.min_detection_confidence)
 
     def detected_data(self, mp_res):
         return self.cvt2landmark_array(mp_res.pose_world_landmarks)
 
+    def image_landmarks(self, mp_res):
+        return [mp_res.pose_landmarks]
+
+    def mirror_data(self, data):
+        """ World landmarks of a flipped frame: left and right swapped, x negated. """
+        if not data:
+            return data
+        return LandmarkArray(data.points[self.mirrored_indices] * MIRROR_X,
+                             data.visibility[self.mirrored_indices], data.frame)
+
     def empty_data(self):
         return []
 
@@ -0,0 +1,113 @@
+from __future__ import annotations
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from ...cgt_core.cgt_landmarks import LandmarkArray
+
+
+class RegionOfInterest:
+    """ Crops frames to a padded box around the subject of the previous detection.
+    The box only moves once the subject leaves its inner margin, so consecutive frames
+    share the crop and mediapipe's own tracking stays valid. Without a subject the
+    next frame gets searched in full. """
+
+    def __init__(self, padding: float = .25, min_size: float = .2, margin: float = .05):
+        # padding relative to the subject size, min_size and margin relative to the frame
+        self.padding = padding
+        self.min_size = min_size
+        self.margin = margin
+        self.box: Optional[Tuple[int, int, int, int]] = None
+        self.frame_shape: Tuple[int, int] = (0, 0)
+        self.crop_box: Optional[Tuple[int, int, int, int]] = None
+        self.stats = {'cropped': 0, 'full': 0, 'lost': 0, 'moved': 0, 'pixels': 0}
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """ Returns the (contiguous) image to detect on and remembers where it came from. """
+        h, w = frame.shape[:2]
+        if self.frame_shape != (h, w):
+            self.box = None
+        self.frame_shape = (h, w)
+        self.crop_box = self.box
+
+        if self.box is None:
+            self.stats['full'] += 1
+            self.stats['pixels'] += h * w
+            return frame
+
+        x0, y0, x1, y1 = self.box
+        self.stats['cropped'] += 1
+        self.stats['pixels'] += (x1 - x0) * (y1 - y0)
+        return np.ascontiguousarray(frame[y0:y1, x0:x1])
+
+    def update(self, landmark_lists: Iterable):
+        """ Places the box for the next frame from normalized landmark protos of the current crop. """
+        xs, ys = [], []
+        for landmark_list in landmark_lists:
+            if landmark_list is None:
+                continue
+            for landmark in landmark_list.landmark:
+                xs.append(landmark.x)
+                ys.append(landmark.y)
+
+        if not xs:
+            self.lost()
+            return
+
+        h, w = self.frame_shape
+        x0, y0, cw, ch = self.crop_origin()
+        xs = np.clip(np.asarray(xs) * cw + x0, 0, w)
+        ys = np.clip(np.asarray(ys) * ch + y0, 0, h)
+        subject = (xs.min(), ys.min(), xs.max(), ys.max())
+
+        if self.box is not None and self.contains(subject):
+            return
+
+        size = max(subject[2] - subject[0], subject[3] - subject[1])
+        pad = max(size * self.padding, self.min_size * max(w, h) / 2 - size / 2)
+        box = (
+            int(max(0, subject[0] - pad)), int(max(0, subject[1] - pad)),
+            int(min(w, np.ceil(subject[2] + pad))), int(min(h, np.ceil(subject[3] + pad))))
+        if box[2] - box[0] < 2 or box[3] - box[1] < 2:
+            self.lost()
+            return
+        self.stats['moved'] += 1
+        self.box = box
+
+    def lost(self):
+        if self.box is not None:
+            self.stats['lost'] += 1
+        self.box = None
+
+    def contains(self, subject) -> bool:
+        h, w = self.frame_shape
+        margin = self.margin * max(w, h)
+        x0, y0, x1, y1 = self.box
+        # frame borders don't need a margin, the subject can't leave the box there
+        return (subject[0] >= x0 + margin or x0 == 0) and (subject[1] >= y0 + margin or y0 == 0) \
+            and (subject[2] <= x1 - margin or x1 == w) and (subject[3] <= y1 - margin or y1 == h)
+
+    def crop_origin(self) -> Tuple[int, int, int, int]:
+        """ x, y, width, height of the image the last detection ran on. """
+        h, w = self.frame_shape
+        if self.crop_box is None:
+            return 0, 0, w, h
+        x0, y0, x1, y1 = self.crop_box
+        return x0, y0, x1 - x0, y1 - y0
+
+    def to_frame(self, data):
+        """ Maps normalized image landmarks of the crop back to the full frame, in place.
+        z shares the scale of x, as in mediapipe's normalized landmarks. """
+        if self.crop_box is None:
+            return data
+        if isinstance(data, LandmarkArray):
+            h, w = self.frame_shape
+            x0, y0, cw, ch = self.crop_origin()
+            points = data.points
+            points[:, 0] = points[:, 0] * (cw / w) + x0 / w
+            points[:, 1] = points[:, 1] * (ch / h) + y0 / h
+            points[:, 2] *= cw / w
+        elif isinstance(data, list):
+            for chunk in data:
+                self.to_frame(chunk)
+        return data
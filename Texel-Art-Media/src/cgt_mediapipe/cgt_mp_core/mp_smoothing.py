@@ -0,0 +1,104 @@
+from __future__ import annotations
+import numpy as np
+
+from ...cgt_core.cgt_landmarks import LandmarkArray
+
+
+def simple_smoothing(memo, cur):
+    """ Expects list with sub-lists containing [int, [float, float, float]].
+    Smooths the float part of the sub-lists. """
+    def smooth_by_add_divide(x, y):
+        for i, *_ in enumerate(zip(x, y)):
+            x[i] += y[i]
+            x[i] /= 2
+
+    def addable(x, y):
+        # check if [int, [float, float float]]
+        if not isinstance(x, list) or not isinstance(y, list):
+            print("CATCHED NOT LIST ERR")
+            return False
+
+        if not len(x) == 2 or not len(y) == 2:
+            return False
+
+        if not len(x[1]) == 3 or not len(y[1]) == 3:
+            return False
+
+        smooth_by_add_divide(x[1], y[1])
+        return True
+
+    def smooth_memo_contents(x, y):
+        # checks if addable contents, else splits into sub-arrays
+        # and retries. y may get added to x, if x is empty.
+        if isinstance(y, LandmarkArray):
+            if isinstance(x, LandmarkArray) and len(x) == len(y):
+                x.points += y.points
+                x.points /= 2
+                return
+            y = y.to_pairs()
+        if not isinstance(y, list):
+            return
+        if not isinstance(x, list):
+            x = y
+        if len(x) == 0 and len(y) != 0:
+            x += y
+
+        for l1, l2 in zip(x, y):
+            if isinstance(l1, LandmarkArray) or not addable(l1, l2):
+                smooth_memo_contents(l1, l2)
+
+    smooth_memo_contents(memo, cur)
+    return memo
+
+
+def _is_landmark(x):
+    return isinstance(x, list) and len(x) == 2 and isinstance(x[0], int) \
+        and isinstance(x[1], list) and len(x[1]) == 3
+
+
+def _smooth_keys(prev, cur, nxt):
+    """ [1, 2, 1] / 4 over three key samples of the same structure.
+    Neighbours which don't match the structure of cur get replaced by cur. """
+    if isinstance(cur, LandmarkArray):
+        def matches(x):
+            return isinstance(x, LandmarkArray) and len(x) == len(cur)
+        c = cur.points.astype(np.float64)
+        p = prev.points if matches(prev) else c
+        n = nxt.points if matches(nxt) else c
+        return LandmarkArray((p + 2 * c + n) / 4, cur.visibility, cur.frame)
+
+    if _is_landmark(cur):
+        p = prev if _is_landmark(prev) and prev[0] == cur[0] else cur
+        n = nxt if _is_landmark(nxt) and nxt[0] == cur[0] else cur
+        return [cur[0], [(a + 2 * b + c) / 4 for a, b, c in zip(p[1], cur[1], n[1])]]
+
+    if isinstance(cur, list):
+        def at(x, i):
+            return x[i] if isinstance(x, list) and len(x) == len(cur) else None
+        return [_smooth_keys(at(prev, i), c, at(nxt, i)) for i, c in enumerate(cur)]
+    return cur
+
+
+class KeyframeFilter:
+    """ Low pass for detections which only got sampled on key frames.
+    Zero-phase [1, 2, 1] / 4 over neighbouring keys, so results lag one key behind. """
+
+    def __init__(self):
+        self.prev = self.cur = None
+        self.cur_frame = None
+
+    def push(self, data, frame: int) -> list:
+        """ Adds the detection of a key frame, returns [(smoothed data, frame)] of the previous key. """
+        out = []
+        if self.cur is not None:
+            out.append((_smooth_keys(self.prev, self.cur, data), self.cur_frame))
+        self.prev, self.cur, self.cur_frame = self.cur, data, frame
+        return out
+
+    def flush(self) -> list:
+        """ Returns the last key, smoothed without a successor. """
+        if self.cur is None:
+            return []
+        out = [(_smooth_keys(self.prev, self.cur, None), self.cur_frame)]
+        self.prev = self.cur = None
+        return out
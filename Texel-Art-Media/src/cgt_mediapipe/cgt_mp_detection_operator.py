@@ -3,6 +3,7 @@ import logging
 
 from pathlib import Path
 from ..cgt_core.cgt_patterns import cgt_nodes
+from .cgt_mp_core import mp_smoothing
 
 
 class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
@@ -128,44 +129,7 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
 
     @staticmethod
     def simple_smoothing(memo, cur):
-        """ Expects list with sub-lists containing [int, [float, float, float]].
-        Smooths the float part of the sub-lists. """
-        def smooth_by_add_divide(x, y):
-            for i, *_ in enumerate(zip(x, y)):
-                x[i] += y[i]
-                x[i] /= 2
-
-        def addable(x, y):
-            # check if [int, [float, float float]]
-            if not isinstance(x, list) or not isinstance(y, list):
-                print("CATCHED NOT LIST ERR")
-                return False
-
-            if not len(x) == 2 or not len(y) == 2:
-                return False
-
-            if not len(x[1]) == 3 or not len(y[1]) == 3:
-                return False
-
-            smooth_by_add_divide(x[1], y[1])
-            return True
-
-        def smooth_memo_contents(x, y):
-            # checks if addable contents, else splits into sub-arrays
-            # and retries. y may get added to x, if x is empty.
-            if not isinstance(y, list):
-                return
-            if not isinstance(x, list):
-                x = y
-            if len(x) == 0 and len(y) != 0:
-                x += y
-
-            for l1, l2 in zip(x, y):
-                if not addable(l1, l2):
-                    smooth_memo_contents(l1, l2)
-
-        smooth_memo_contents(memo, cur)
-        return memo
+        return mp_smoothing.simple_smoothing(memo, cur)
 
     def modal(self, context, event):
         """ Run detection as modal operation, finish with 'Q', 'ESC' or 'RIGHT MOUSE'. """
@@ -198,6 +162,9 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
     def cancel(self, context):
         """ Upon finishing detection clear the handlers. """
         self.user.modal_active = False  # noqa
+        # release the mediapipe graph now instead of waiting for gc
+        if self.node_chain is not None:
+            self.node_chain.nodes[0].close()
         del self.node_chain
         wm = context.window_manager
         wm.event_timer_remove(self._timer)
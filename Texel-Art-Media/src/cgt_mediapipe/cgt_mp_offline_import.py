@@ -0,0 +1,52 @@
+from __future__ import annotations
+import logging
+from typing import Dict, List
+
+import bpy
+import numpy as np
+
+from ..cgt_core.cgt_bpy import cgt_fc_actions
+from ..cgt_core.cgt_output_nodes import mp_hand_out, mp_face_out, mp_pose_out
+from .cgt_mp_core.mp_offline_runner import CHANNELS
+
+
+def get_targets(detection_type: str) -> Dict[str, List[bpy.types.Object]]:
+    """ Creates the driver empties the node chains would create and maps them by target name. """
+    targets = {}
+    if detection_type in ('HAND', 'HOLISTIC'):
+        hands = mp_hand_out.CgtMPHandOutNode()
+        targets['hand.L'] = hands.left_hand
+        targets['hand.R'] = hands.right_hand
+    if detection_type in ('FACE', 'HOLISTIC'):
+        targets['face'] = mp_face_out.MPFaceOutputNode().face
+    if detection_type in ('POSE', 'HOLISTIC'):
+        targets['pose'] = mp_pose_out.MPPoseOutputNode().pose
+    return targets
+
+
+def load(path: str) -> int:
+    """ Applies offline detection results directly to f-curves, returns the last detected frame. """
+    with np.load(path) as data:
+        detection_type = str(data['detection_type'])
+        targets = get_targets(detection_type)
+
+        for target, objects in targets.items():
+            has_action = set()
+            for channel in CHANNELS:
+                key = f"{target}.{channel}"
+                if key not in data.files:
+                    continue
+
+                rows = data[key]
+                for idx in np.unique(rows[:, 1]).astype(int):
+                    if idx >= len(objects):
+                        logging.debug(f"No driver object for {target} index {idx}")
+                        continue
+                    ob_rows = rows[rows[:, 1] == idx]
+
+                    # first channel of an object replaces old animation, later ones add to it
+                    helper = cgt_fc_actions.create_actions([objects[idx]], overwrite=idx not in has_action)[0]
+                    has_action.add(idx)
+                    helper.foreach_set(channel, ob_rows[:, 0], ob_rows[:, 2], ob_rows[:, 3], ob_rows[:, 4])
+
+        return int(data['end_frame'])
@@ -0,0 +1,42 @@
+# stage_timings.py
+# Per-stage wall times of a Blender run. Written as <name>.timings.json next to the
+# output, the API picks the file up and exports the stages as metrics.
+import json, os, time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+        self._started = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def start(self, name: str):
+        """ For stages spanning callbacks (e.g. the modal detection). """
+        self._started[name] = time.perf_counter()
+
+    def stop(self, name: str):
+        start = self._started.pop(name, None)
+        if start is not None:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def write(self, out_dir: str, name: str) -> str:
+        path = os.path.join(out_dir, f"{name}.timings.json")
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"stages": self.stages}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[WARN] Could not write timings to {path}: {e}")
+        return path
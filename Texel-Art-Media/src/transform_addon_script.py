@@ -1,5 +1,5 @@
 # transform_addon_script.py
-import bpy, os, sys, pathlib
+import bpy, os, sys, json, pathlib
 import importlib
 
 # Ensure addon sources are importable both inside the packaged addon (BlendArMocap)
@@ -18,30 +18,28 @@ except ImportError:
     # Fallback: direct import when running from the source tree
     from cgt_transfer.core_transfer import tf_load_object_properties, tf_transfer_management
 
+from stage_timings import StageTimer
+
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "/shared/out")
 BUILTIN_MAPPING = pathlib.Path(__file__).parent / "cgt_transfer" / "data" / "Rigify_Humanoid_DefaultFace_v0.6.1.json"
 
-# Args: -- <export_name> <blend_input_path> <rig_path> [mapping_path]
-args = sys.argv
-if "--" in args:
-    i = args.index("--")
-    export_name = args[i+1]
-    blend_input_path = args[i+2]
-    rig_path = args[i+3] if len(args) > i+3 else os.getenv("RIG_BLEND_PATH", "")
-    mapping_path = args[i+4] if len(args) > i+4 else os.getenv("TRANSFER_MAPPING_PATH", "")
-else:
-    export_name = "default_output"
-    blend_input_path = "/tmp/fallback_mocap.blend"
-    rig_path = os.getenv("RIG_BLEND_PATH", "")
-    mapping_path = os.getenv("TRANSFER_MAPPING_PATH", "")
-
-mapping_path = mapping_path or str(BUILTIN_MAPPING)
-mapping_path = os.path.abspath(mapping_path)
-
-if not rig_path or not os.path.exists(rig_path):
-    raise RuntimeError(f"Rig file missing or not found: {rig_path}")
-if not os.path.exists(mapping_path):
-    raise RuntimeError(f"Transfer mapping file missing or not found: {mapping_path}")
+
+def parse_args():
+    """ Args: -- <export_name> <blend_input_path> <rig_path> [mapping_path]
+        or:   -- --batch <spec.json> """
+    args = sys.argv
+    if "--" in args:
+        i = args.index("--")
+        export_name = args[i+1]
+        blend_input_path = args[i+2]
+        rig_path = args[i+3] if len(args) > i+3 else os.getenv("RIG_BLEND_PATH", "")
+        mapping_path = args[i+4] if len(args) > i+4 else os.getenv("TRANSFER_MAPPING_PATH", "")
+    else:
+        export_name = "default_output"
+        blend_input_path = "/tmp/fallback_mocap.blend"
+        rig_path = os.getenv("RIG_BLEND_PATH", "")
+        mapping_path = os.getenv("TRANSFER_MAPPING_PATH", "")
+    return export_name, blend_input_path, rig_path, mapping_path
 
 def clear_scene_hard():
     if bpy.context.object and bpy.context.object.mode != 'OBJECT':
@@ -96,9 +94,11 @@ def import_rig_any(path: str):
     new_objs = [o for o in after - before if isinstance(o, bpy.types.Object)]
     return new_objs
 
-def pick_armature():
+def pick_armature(objects=None):
     """Choose the best armature: prefer Rigify-looking rigs, then common names, else first armature."""
-    arms = [o for o in bpy.data.objects if o.type == 'ARMATURE']
+    if objects is None:
+        objects = bpy.data.objects
+    arms = [o for o in objects if o.type == 'ARMATURE']
     if not arms:
         return None
     # Heuristic 1: name hints
@@ -152,59 +152,168 @@ def delete_collection_recursive(name: str):
     purge(coll)
     bpy.data.collections.remove(coll)
 
+def remove_objects(objects):
+    """ Removes the given objects and the actions their bakes left behind. """
+    for obj in objects:
+        anim = obj.animation_data
+        if anim and anim.action and anim.action.users <= 1:
+            bpy.data.actions.remove(anim.action)
+        bpy.data.objects.remove(obj, do_unlink=True)
+
+def resolve_paths(rig_path: str, mapping_path: str = ""):
+    mapping_path = os.path.abspath(mapping_path or str(BUILTIN_MAPPING))
+    if not rig_path or not os.path.exists(rig_path):
+        raise RuntimeError(f"Rig file missing or not found: {rig_path}")
+    if not os.path.exists(mapping_path):
+        raise RuntimeError(f"Transfer mapping file missing or not found: {mapping_path}")
+    return rig_path, mapping_path
+
+def export_glb(export_name: str, use_selection: bool = False) -> str:
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    glb_path = os.path.join(OUTPUT_DIR, f"{export_name}.glb")
+    bpy.ops.export_scene.gltf(
+        filepath=glb_path,
+        export_format='GLB',
+        use_selection=use_selection,
+        export_apply=True,
+        export_animations=True,
+        export_skins=True
+    )
+    print(f"GLB file exported to: {glb_path}")
+    return glb_path
+
 # -------- Pipeline --------
-clear_scene_hard()
-
-# 1) Import the rig (blend/fbx/obj)
-import_rig_any(rig_path)
-
-# 2) Validate & pick an armature
-rig_obj = pick_armature()
-if not rig_obj:
-    raise RuntimeError("No armature found in rig file")
-
-print(f"Selected Rig set to: {rig_obj!r}")
-
-# 3) Bring in drivers from the mocap .blend
-drivers, pose_driver = append_drivers_collection(blend_input_path)
-print("Drivers Collection:", drivers, "Pose Driver:", pose_driver)
-print(f"Using transfer mapping: {mapping_path}")
-
-# 4) Wire up addon settings (as you had)
-bpy.context.scene.cgtinker_mediapipe.enum_detection_type = 'POSE'
-bpy.context.scene.cgtinker_transfer.selected_driver_collection = pose_driver
-bpy.context.scene.cgtinker_transfer.selected_rig = rig_obj
-
-# Load mapping and transfer onto rig
-tf_load_object_properties.load(bpy.context.scene.objects, mapping_path, rig_obj)
-objs_for_transfer = []
-def _collect(col):
-    objs_for_transfer.extend(list(col.objects))
-    for sub in col.children:
-        _collect(sub)
-if pose_driver:
-    _collect(pose_driver)
-else:
-    raise RuntimeError("Pose driver collection not found in mocap .blend")
-tf_transfer_management.main(objs_for_transfer)
-bpy.context.view_layer.update()
-
-# 5) Bake pose on the detected rig
-bake_pose_action(rig_obj)
-
-# 6) Remove driver collections
-delete_collection_recursive("cgt_DRIVERS")
-
-# 7) Export GLB
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-glb_path = os.path.join(OUTPUT_DIR, f"{export_name}.glb")
-bpy.ops.export_scene.gltf(
-    filepath=glb_path,
-    export_format='GLB',
-    use_selection=False,
-    export_apply=True,
-    export_animations=True,
-    export_skins=True
-)
-print(f"GLB file exported to: {glb_path}")
-bpy.ops.wm.quit_blender()
+def retarget(rig_obj, pose_driver, mapping_path: str, timer: StageTimer):
+    """ Transfers the pose drivers onto the rig and bakes the result into its action. """
+    print(f"Using transfer mapping: {mapping_path}")
+    timer.start("transfer")
+
+    # Wire up addon settings
+    bpy.context.scene.cgtinker_mediapipe.enum_detection_type = 'POSE'
+    bpy.context.scene.cgtinker_transfer.selected_driver_collection = pose_driver
+    bpy.context.scene.cgtinker_transfer.selected_rig = rig_obj
+
+    # Load mapping and transfer onto rig
+    tf_load_object_properties.load(bpy.context.scene.objects, mapping_path, rig_obj)
+    objs_for_transfer = []
+    def _collect(col):
+        objs_for_transfer.extend(list(col.objects))
+        for sub in col.children:
+            _collect(sub)
+    if pose_driver:
+        _collect(pose_driver)
+    else:
+        raise RuntimeError("Pose driver collection not found in mocap .blend")
+    tf_transfer_management.main(objs_for_transfer)
+    bpy.context.view_layer.update()
+    timer.stop("transfer")
+
+    # Bake pose on the detected rig
+    with timer.stage("bake"):
+        bake_pose_action(rig_obj)
+
+
+def run_transform(export_name: str, blend_input_path: str, rig_path: str, mapping_path: str = "") -> str:
+    """ Retargets the mocap drivers onto the rig and exports a GLB, returns the GLB path. """
+    rig_path, mapping_path = resolve_paths(rig_path, mapping_path)
+    timer = StageTimer()
+
+    with timer.stage("clear_scene"):
+        clear_scene_hard()
+
+    # 1) Import the rig (blend/fbx/obj)
+    with timer.stage("import_rig"):
+        import_rig_any(rig_path)
+
+    # 2) Validate & pick an armature
+    rig_obj = pick_armature()
+    if not rig_obj:
+        raise RuntimeError("No armature found in rig file")
+
+    print(f"Selected Rig set to: {rig_obj!r}")
+
+    # 3) Bring in drivers from the mocap .blend
+    with timer.stage("append_drivers"):
+        drivers, pose_driver = append_drivers_collection(blend_input_path)
+    print("Drivers Collection:", drivers, "Pose Driver:", pose_driver)
+
+    # 4) Transfer and bake
+    retarget(rig_obj, pose_driver, mapping_path, timer)
+
+    # 5) Remove driver collections
+    delete_collection_recursive("cgt_DRIVERS")
+
+    # 6) Export GLB
+    with timer.stage("glb_export"):
+        glb_path = export_glb(export_name)
+    timer.write(OUTPUT_DIR, export_name)
+    return glb_path
+
+
+def run_batch(blend_input_path: str, targets: list) -> list:
+    """ Retargets one mocap onto several rigs in this session, importing the drivers once.
+        targets: [{"export_name", "rig_path", "mapping_path"}], returns one result dict per target. """
+    # shared setup is reported with the first target, it is paid once for the batch
+    timer = StageTimer()
+    with timer.stage("clear_scene"):
+        clear_scene_hard()
+    with timer.stage("append_drivers"):
+        drivers, pose_driver = append_drivers_collection(blend_input_path)
+    print("Drivers Collection:", drivers, "Pose Driver:", pose_driver)
+
+    results = []
+    for target in targets:
+        export_name = target["export_name"]
+        rig_objs = []
+        before_colls = set(bpy.data.collections)
+        try:
+            rig_path, mapping_path = resolve_paths(target.get("rig_path", ""), target.get("mapping_path", ""))
+            with timer.stage("import_rig"):
+                rig_objs = import_rig_any(rig_path)
+            rig_obj = pick_armature(rig_objs)
+            if not rig_obj:
+                raise RuntimeError("No armature found in rig file")
+            print(f"[{export_name}] Selected Rig set to: {rig_obj!r}")
+
+            retarget(rig_obj, pose_driver, mapping_path, timer)
+
+            # drivers stay in the scene for the next rig, so only export what the rig brought in
+            bpy.ops.object.select_all(action='DESELECT')
+            for obj in rig_objs:
+                if obj.name in bpy.context.view_layer.objects:
+                    obj.select_set(True)
+            with timer.stage("glb_export"):
+                glb_path = export_glb(export_name, use_selection=True)
+            results.append({"export_name": export_name, "ok": True, "output": glb_path})
+        except Exception as e:
+            print(f"[{export_name}] transform failed: {e}")
+            results.append({"export_name": export_name, "ok": False, "error": f"{type(e).__name__}: {e}"})
+        finally:
+            if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+                bpy.ops.object.mode_set(mode='OBJECT')
+            remove_objects(rig_objs)
+            for coll in set(bpy.data.collections) - before_colls:
+                bpy.data.collections.remove(coll)
+            timer.write(OUTPUT_DIR, export_name)
+            timer = StageTimer()
+
+    delete_collection_recursive("cgt_DRIVERS")
+    return results
+
+
+def run_batch_spec(spec_path: str) -> list:
+    """ Runs a batch described by a json file and writes the results next to it (<spec>.result.json). """
+    with open(spec_path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    results = run_batch(spec["blend_input_path"], spec["targets"])
+    with open(f"{spec_path}.result.json", "w", encoding="utf-8") as f:
+        json.dump(results, f)
+    return results
+
+
+if __name__ == "__main__":
+    if "--batch" in sys.argv:
+        run_batch_spec(sys.argv[sys.argv.index("--batch") + 1])
+    else:
+        run_transform(*parse_args())
+    bpy.ops.wm.quit_blender()
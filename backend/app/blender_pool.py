@@ -0,0 +1,212 @@
+# backend/app/blender_pool.py
+"""Pool of long-lived Blender processes that already loaded the add-on.
+
+Each worker runs ``blender_worker_script.py`` and takes mocap / transform jobs
+over its own unix socket (newline delimited JSON). Workers get recycled after
+``max_jobs`` jobs or once their resident memory exceeds ``max_rss_mb``.
+"""
+from __future__ import annotations
+
+import json, os, queue, signal, socket, subprocess, tempfile, threading, time, uuid, logging
+from typing import Callable, Optional
+
+
+class BlenderPoolError(RuntimeError):
+    """ A worker reported a failed job or died while running it. """
+
+
+class BlenderPoolTimeout(BlenderPoolError):
+    """ A worker did not answer in time and got killed. """
+
+
+class BlenderWorker:
+    def __init__(self, cmd: list[str], socket_path: str, start_timeout: float):
+        self.socket_path = socket_path
+        self.jobs_done = 0
+        self.pid: Optional[int] = None
+        self.sock: Optional[socket.socket] = None
+        self._buffer = b""
+
+        # own process group so xvfb-run, Xvfb and blender get killed together
+        self.process = subprocess.Popen(cmd, stdout=None, stderr=None, start_new_session=True)
+        try:
+            self._connect(start_timeout)
+        except Exception:
+            self.kill()
+            raise
+
+    def _connect(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while self.sock is None:
+            rc = self.process.poll()
+            if rc is not None:
+                raise BlenderPoolError(f"Blender worker exited during startup with code {rc}")
+            if time.monotonic() > deadline:
+                raise BlenderPoolTimeout("Blender worker did not start in time")
+            if os.path.exists(self.socket_path):
+                s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    s.connect(self.socket_path)
+                    self.sock = s
+                    break
+                except OSError:
+                    s.close()
+            time.sleep(0.2)
+
+        hello = self._read_message(deadline)
+        self.pid = hello.get("pid")
+
+    def _read_message(self, deadline: float) -> dict:
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("Timed out waiting for Blender worker")
+            self.sock.settimeout(remaining)
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise BlenderPoolError("Blender worker closed the connection")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def run(self, kind: str, args: dict, timeout: float) -> dict:
+        """ Sends a job and blocks until the worker answers. """
+        try:
+            self.sock.sendall(json.dumps({"kind": kind, "args": args}).encode("utf-8") + b"\n")
+            reply = self._read_message(time.monotonic() + timeout)
+        except socket.timeout:
+            self.kill()
+            raise BlenderPoolTimeout(f"Blender {kind} job timed out")
+        except OSError as e:
+            self.kill()
+            raise BlenderPoolError(f"Blender worker connection failed: {e}")
+
+        self.jobs_done += 1
+        if not reply.get("ok"):
+            raise BlenderPoolError(reply.get("error") or f"Blender {kind} job failed")
+        return reply
+
+    def rss_mb(self) -> Optional[float]:
+        """ Resident memory of the blender process itself (not xvfb-run). """
+        if not self.pid:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return None
+        return None
+
+    def alive(self) -> bool:
+        return self.process.poll() is None and self.sock is not None
+
+    def kill(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        try:
+            os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
+            self.process.wait(timeout=10)
+        except ProcessLookupError:
+            pass
+        except subprocess.TimeoutExpired:
+            os.killpg(os.getpgid(self.process.pid), signal.SIGKILL)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class BlenderPool:
+    def __init__(self, size: int, cmd_builder: Callable[[list[str]], list[str]], worker_script: str,
+                 max_jobs: int = 20, max_rss_mb: float = 4096, start_timeout: float = 180,
+                 socket_dir: Optional[str] = None):
+        self.size = size
+        self.cmd_builder = cmd_builder
+        self.worker_script = worker_script
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.start_timeout = start_timeout
+        self.socket_dir = socket_dir or tempfile.gettempdir()
+
+        # a slot holds a warm worker or None (spawned lazily on next use)
+        self._slots: queue.Queue[Optional[BlenderWorker]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: set[BlenderWorker] = set()
+        self.in_flight = 0
+        self._closed = False
+
+    def start(self) -> None:
+        """ Warms up all workers in the background; jobs wait for the first free one. """
+        for _ in range(self.size):
+            threading.Thread(target=self._refill, daemon=True).start()
+
+    def _spawn(self) -> BlenderWorker:
+        socket_path = os.path.join(self.socket_dir, f"blender-worker-{uuid.uuid4().hex[:12]}.sock")
+        cmd = self.cmd_builder(["--python", self.worker_script, "--", socket_path])
+        worker = BlenderWorker(cmd, socket_path, self.start_timeout)
+        with self._lock:
+            self._workers.add(worker)
+        logging.info(f"Blender worker ready (pid {worker.pid})")
+        return worker
+
+    def _refill(self) -> None:
+        try:
+            self._slots.put(self._spawn())
+        except Exception:
+            logging.exception("Could not start Blender worker")
+            self._slots.put(None)
+
+    def _discard(self, worker: BlenderWorker) -> None:
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+
+    def _should_recycle(self, worker: BlenderWorker) -> bool:
+        if worker.jobs_done >= self.max_jobs:
+            return True
+        rss = worker.rss_mb()
+        return rss is not None and rss > self.max_rss_mb
+
+    def run(self, kind: str, args: dict, timeout: float) -> dict:
+        """ Runs a job on the next free worker, blocking until it is done. """
+        worker = self._slots.get()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            if worker is None or not worker.alive():
+                if worker is not None:
+                    self._discard(worker)
+                worker = None
+                worker = self._spawn()
+            try:
+                return worker.run(kind, args, timeout)
+            except BlenderPoolError:
+                if not worker.alive():
+                    self._discard(worker)
+                    worker = None
+                raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._release(worker)
+
+    def _release(self, worker: Optional[BlenderWorker]) -> None:
+        if self._closed:
+            if worker is not None:
+                self._discard(worker)
+            return
+        if worker is not None and self._should_recycle(worker):
+            logging.info(f"Recycling Blender worker (pid {worker.pid}) after {worker.jobs_done} jobs")
+            self._discard(worker)
+            threading.Thread(target=self._refill, daemon=True).start()
+            return
+        self._slots.put(worker)
+
+    def shutdown(self) -> None:
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.kill()
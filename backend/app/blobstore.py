@@ -0,0 +1,130 @@
+# backend/app/blobstore.py
+"""Content-addressed blob store on local disk.
+
+Blobs are stored once under their sha256 (``<root>/ab/cd/<sha256>``). Writes go
+to a temp file inside the store and are renamed into place, so readers never
+see a partial blob. Reference counts live in the ``blobs`` table (see main.py),
+this module only deals with the files.
+"""
+from __future__ import annotations
+
+import hashlib, os, shutil, tempfile, uuid
+from typing import BinaryIO, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobTooLarge(ValueError):
+    """ A streamed blob went past the allowed size; nothing was stored. """
+
+
+def hash_file(path: str) -> Tuple[str, int]:
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path_for(sha256))
+
+    def _commit(self, tmp_path: str, sha256: str) -> None:
+        """ Renames a finished temp file into place, dropping it if the blob already exists. """
+        dest = self.path_for(sha256)
+        if os.path.exists(dest):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(tmp_path, dest)
+
+    def _tmp_file(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        return os.fdopen(fd, "wb"), tmp_path
+
+    def put_bytes(self, data: bytes) -> Tuple[str, int]:
+        sha256 = hashlib.sha256(data).hexdigest()
+        if not self.exists(sha256):
+            f, tmp_path = self._tmp_file()
+            with f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._commit(tmp_path, sha256)
+        return sha256, len(data)
+
+    def put_stream(self, fileobj: BinaryIO, max_bytes: int = 0) -> Tuple[str, int]:
+        """ Copies a file object into the store in chunks, hashing as it goes (max_bytes 0 = unbounded). """
+        h = hashlib.sha256()
+        size = 0
+        f, tmp_path = self._tmp_file()
+        try:
+            with f:
+                for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes:
+                        raise BlobTooLarge(f"Upload exceeds {max_bytes} bytes")
+                    h.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        sha256 = h.hexdigest()
+        self._commit(tmp_path, sha256)
+        return sha256, size
+
+    def put_file(self, path: str, move: bool = True) -> Tuple[str, int]:
+        """ Adds a file to the store; with move=True the source is consumed. """
+        sha256, size = hash_file(path)
+        if self.exists(sha256):
+            if move:
+                os.remove(path)
+            return sha256, size
+
+        f, tmp_path = self._tmp_file()
+        f.close()
+        try:
+            if move:
+                # rename when on the same filesystem, copy across devices
+                shutil.move(path, tmp_path)
+            else:
+                shutil.copyfile(path, tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._commit(tmp_path, sha256)
+        return sha256, size
+
+    def link(self, sha256: str, dest: str) -> str:
+        """ Exposes a blob under a regular file name (hardlink, copy as fallback). """
+        if os.path.exists(dest):
+            return dest
+        src = self.path_for(sha256)
+        # unique per call, concurrent requests may link the same blob to the same name
+        tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+        return dest
+
+    def delete(self, sha256: str) -> None:
+        try:
+            os.remove(self.path_for(sha256))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,156 @@
+# backend/app/glb_cache.py
+"""Content-addressed cache for exported GLBs.
+
+Entries are keyed by a hash of everything that determines the bake: the mocap
+.blend, the rig, the mapping JSON and the transform script. The GLBs live as
+``<key>.glb`` in the cache directory next to an ``index.json`` holding size and
+access metadata, so the cache survives restarts and is shared across names.
+"""
+from __future__ import annotations
+
+import hashlib, json, logging, os, shutil, tempfile, threading, time
+from typing import Optional, Union
+
+CHUNK_SIZE = 1024 * 1024
+KEY_VERSION = b"glb-v1"
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+_file_digests: dict[str, tuple[float, int, str]] = {}
+
+
+def sha256_file(path: str) -> str:
+    """ Hashes a file in chunks, memoised on (mtime, size) so rigs aren't re-read every request. """
+    st = os.stat(path)
+    memo = _file_digests.get(path)
+    if memo and memo[0] == st.st_mtime and memo[1] == st.st_size:
+        return memo[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _file_digests[path] = (st.st_mtime, st.st_size, digest)
+    return digest
+
+
+def digest_of(source: Union[bytes, str, None]) -> str:
+    """ Digest of raw bytes, of a file path, or empty for a missing input. """
+    if source is None or source == "":
+        return ""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return sha256_bytes(bytes(source))
+    return sha256_file(source)
+
+
+def cache_key(joint_digest: str, rig_digest: str, mapping_digest: str, script_digest: str) -> str:
+    h = hashlib.sha256(KEY_VERSION)
+    for part in (joint_digest, rig_digest, mapping_digest, script_digest):
+        h.update(b"\0")
+        h.update(part.encode("ascii"))
+    return h.hexdigest()
+
+
+class GlbCache:
+    def __init__(self, directory: str, max_bytes: int = 0, flush_interval: float = 30.0):
+        self.directory = directory
+        self.max_bytes = max_bytes  # 0 = unbounded
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+        # hits only touch the in-memory index, a timer persists their access times
+        self._dirty = False
+        self._closed = threading.Event()
+        if flush_interval > 0:
+            threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                             name="glb-cache-index", daemon=True).start()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        # drop entries whose file vanished, adopt files the index doesn't know about
+        index = {k: v for k, v in index.items() if os.path.exists(self.path_for(k))}
+        for fname in os.listdir(self.directory):
+            key, ext = os.path.splitext(fname)
+            if ext == ".glb" and not fname.startswith(".") and key not in index:
+                st = os.stat(os.path.join(self.directory, fname))
+                index[key] = {"size": st.st_size, "created": st.st_mtime, "last_access": st.st_mtime, "hits": 0}
+        return index
+
+    def _save_index(self) -> None:
+        self._dirty = False
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".index-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self.index_path)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.glb")
+
+    def get(self, key: str) -> Optional[str]:
+        """ Returns the cached GLB path or None. """
+        path = self.path_for(key)
+        with self._lock:
+            if not os.path.exists(path):
+                self._index.pop(key, None)
+                return None
+            entry = self._index.setdefault(key, {"size": os.path.getsize(path), "created": time.time(), "hits": 0})
+            entry["hits"] = entry.get("hits", 0) + 1
+            entry["last_access"] = time.time()
+            self._dirty = True
+        return path
+
+    def flush(self) -> None:
+        """ Persists access times of hits since the last write. """
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _flush_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            try:
+                self.flush()
+            except OSError:
+                logging.exception("Could not persist the GLB cache index")
+
+    def close(self) -> None:
+        self._closed.set()
+        self.flush()
+
+    def put(self, key: str, src_path: str, **meta) -> str:
+        """ Moves a freshly exported GLB into the cache (atomic within the cache dir). """
+        dest = self.path_for(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".incoming-", suffix=".glb")
+        os.close(fd)
+        shutil.move(src_path, tmp)
+        os.replace(tmp, dest)
+        now = time.time()
+        with self._lock:
+            self._index[key] = {"size": os.path.getsize(dest), "created": now, "last_access": now, "hits": 0, **meta}
+            self._evict(keep=key)
+            self._save_index()
+        return dest
+
+    def _evict(self, keep: str = "") -> None:
+        """ Drops least recently used entries beyond max_bytes. """
+        if not self.max_bytes:
+            return
+        total = sum(e.get("size", 0) for e in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1].get("last_access", 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+            total -= entry.get("size", 0)
+            del self._index[key]
@@ -1,13 +1,23 @@
 # backend/app/main.py
-from fastapi import FastAPI, UploadFile, HTTPException, File, Form, Depends
+from fastapi import FastAPI, UploadFile, HTTPException, File, Form, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy import Column, Integer, String, LargeBinary, UniqueConstraint, create_engine
+from fastapi.responses import FileResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Column, Integer, BigInteger, Float, String, DateTime, UniqueConstraint, create_engine, func, inspect, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
-from datetime import datetime
-import os, subprocess, shutil, pathlib, sys, shlex, time, signal
+from pydantic import BaseModel
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+import os, subprocess, shutil, pathlib, sys, shlex, time, signal, uuid, logging, json, hashlib
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import Optional
-from io import BytesIO
+
+from .blobstore import BlobStore, BlobTooLarge
+from .blender_pool import BlenderPool, BlenderPoolError, BlenderPoolTimeout
+from .glb_cache import GlbCache, cache_key, digest_of
+from .singleflight import SingleFlight
+from . import metrics
 
 # Configuration
 ADDON_MODULE = os.getenv("ADDON_MODULE", "BlendArMocap")
@@ -32,11 +42,27 @@ TRANSFORM_SCRIPT = os.getenv(
     "TRANSFORM_SCRIPT",
     "/root/.config/blender/4.1/scripts/addons/BlendArMocap/src/transform_addon_script.py",
 )
+# Long-lived Blender processes serving mocap/transform jobs (0 = cold start per job)
+WORKER_SCRIPT = os.getenv(
+    "WORKER_SCRIPT",
+    str(pathlib.Path(TRANSFORM_SCRIPT).parent / "blender_worker_script.py"),
+)
+BLENDER_POOL_SIZE = int(os.getenv("BLENDER_POOL_SIZE", "2"))
+BLENDER_POOL_MAX_JOBS = int(os.getenv("BLENDER_POOL_MAX_JOBS", "20"))
+BLENDER_POOL_MAX_RSS_MB = int(os.getenv("BLENDER_POOL_MAX_RSS_MB", "4096"))
 BUILTIN_MAPPING_PATH = pathlib.Path(TRANSFORM_SCRIPT).resolve().parent / "cgt_transfer" / "data" / "Rigify_Humanoid_DefaultFace_v0.6.1.json"
 
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/shared/in")
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "/shared/out")
 LEGACY_OUT = os.path.expanduser(os.path.join("~", "blender_tmp"))  # legacy fallback
+GLB_CACHE_DIR = os.getenv("GLB_CACHE_DIR", os.path.join(OUTPUT_DIR, "glb_cache"))
+GLB_CACHE_MAX_MB = int(os.getenv("GLB_CACHE_MAX_MB", "0"))  # 0 = unbounded
+BLOB_DIR = os.getenv("BLOB_DIR", "/shared/blobs")
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "1024"))  # 0 = unbounded
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+
+# Bounded pool of background workers running Blender stages for queued jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
 
 DEFAULT_SQLITE = "sqlite:////app/backend/mocap.db"
 DATABASE_URL = os.getenv("DATABASE_URL", DEFAULT_SQLITE)
@@ -46,6 +72,10 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(LEGACY_OUT, exist_ok=True)
 
+glb_cache = GlbCache(GLB_CACHE_DIR, max_bytes=GLB_CACHE_MAX_MB * 1024 * 1024)
+blob_store = BlobStore(BLOB_DIR)
+transform_flights = SingleFlight()
+
 # Database
 engine_kwargs = {}
 if DATABASE_URL.startswith("sqlite:"):
@@ -56,12 +86,22 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+BLEND_MIME = "application/x-blender"
+
+
 class JointsFile(Base):
     __tablename__ = "joints_files"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    filedata = Column(LargeBinary)  # .blend
-    videodata = Column(LargeBinary)  # .mp4, .mov
+    # payloads live in the blob store, rows only reference them
+    blend_sha256 = Column(String(64), nullable=True)  # .blend
+    blend_size = Column(BigInteger, nullable=True)
+    blend_mime = Column(String, nullable=True)
+    video_sha256 = Column(String(64), nullable=True)  # .mp4, .mov
+    video_size = Column(BigInteger, nullable=True)
+    video_mime = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)  # seconds, from ffprobe
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=True)
     __table_args__ = (UniqueConstraint("name", name="unique_name"),)
 
 
@@ -69,12 +109,119 @@ class RigFile(Base):
     __tablename__ = "rig_file"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    rigdata = Column(LargeBinary)  # .blend
+    rig_sha256 = Column(String(64), nullable=True)  # .blend
+    rig_size = Column(BigInteger, nullable=True)
+    rig_mime = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger)
+    mime = Column(String)
+    refcount = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True)  # uuid4 hex
+    kind = Column(String, default="mocap")
+    status = Column(String, index=True, default="queued")  # queued | running | done | failed
+    name = Column(String)  # requested logical name
+    upload_path = Column(String)  # link to the uploaded video the job works on
+    video_sha256 = Column(String(64), nullable=True)  # the upload in the blob store
+    video_size = Column(BigInteger, nullable=True)
+    video_mime = Column(String, nullable=True)
+    result_id = Column(Integer, nullable=True)  # JointsFile.id once done
+    result_name = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 Base.metadata.create_all(bind=engine)
 
 
+def video_mime_for(filename: str) -> str:
+    return "video/quicktime" if pathlib.Path(filename).suffix.lower() == ".mov" else "video/mp4"
+
+
+# Blob references
+def ref_blob(db: Session, sha256: str, size: int, mime: str) -> None:
+    """ Counts one more row referencing the blob (caller commits). """
+    updated = db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.refcount: Blob.refcount + 1}, synchronize_session=False)
+    if not updated:
+        db.add(Blob(sha256=sha256, size=size, mime=mime, refcount=1))
+
+
+def discard_unreferenced_blob(db: Session, sha256: str, job_id: Optional[str] = None) -> None:
+    """ Removes a stored file no row ended up referencing (e.g. a failed job).
+    job_id is the job giving up the blob, it doesn't count as still waiting on it. """
+    if db.query(Blob.sha256).filter(Blob.sha256 == sha256).first() is not None:
+        return
+    # an identical upload may still be waiting on its own job
+    active = db.query(Job.id).filter(Job.video_sha256 == sha256, Job.status.in_(["queued", "running"]))
+    if job_id is not None:
+        active = active.filter(Job.id != job_id)
+    active = active.first()
+    if active is None:
+        blob_store.delete(sha256)
+
+
+# Migration of blobs that used to live in LargeBinary columns
+LEGACY_BLOB_COLUMNS = {
+    JointsFile: [("filedata", "blend"), ("videodata", "video")],
+    RigFile: [("rigdata", "rig")],
+    Job: [],
+}
+
+
+def migrate_legacy_blobs() -> None:
+    """ Adds the reference columns to old tables and moves legacy blob payloads into the store. """
+    insp = inspect(engine)
+    for model, legacy in LEGACY_BLOB_COLUMNS.items():
+        table = model.__tablename__
+        existing = {c["name"] for c in insp.get_columns(table)}
+        with engine.begin() as conn:
+            for column in model.__table__.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {col_type}"))
+
+        for legacy_col, prefix in legacy:
+            if legacy_col not in existing:
+                continue
+            with engine.connect() as conn:
+                ids = [r[0] for r in conn.execute(text(f"SELECT id FROM {table} WHERE {legacy_col} IS NOT NULL"))]
+            # one row at a time so only a single payload is in memory
+            for row_id in ids:
+                with engine.begin() as conn:
+                    row = conn.execute(
+                        text(f"SELECT name, {legacy_col} FROM {table} WHERE id = :id"), {"id": row_id}).first()
+                    if row is None or row[1] is None:
+                        continue
+                    mime = video_mime_for(row[0] or "") if prefix == "video" else BLEND_MIME
+                    sha256, size = blob_store.put_bytes(bytes(row[1]))
+                    conn.execute(text(
+                        f"UPDATE {table} SET {prefix}_sha256 = :sha, {prefix}_size = :size, "
+                        f"{prefix}_mime = :mime, {legacy_col} = NULL WHERE id = :id"),
+                        {"sha": sha256, "size": size, "mime": mime, "id": row_id})
+                    updated = conn.execute(text(
+                        "UPDATE blobs SET refcount = refcount + 1 WHERE sha256 = :sha"), {"sha": sha256}).rowcount
+                    if not updated:
+                        conn.execute(text(
+                            "INSERT INTO blobs (sha256, size, mime, refcount, created_at) "
+                            "VALUES (:sha, :size, :mime, 1, :now)"),
+                            {"sha": sha256, "size": size, "mime": mime, "now": datetime.utcnow()})
+                logging.info(f"Migrated {table}.{legacy_col} of row {row_id} to blob {sha256}")
+
+
+migrate_legacy_blobs()
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -166,28 +313,82 @@ def _blender_cmd(extra: list[str]) -> list[str]:
     return cmd
 
 
-def _run(cmd: list[str]) -> None:
+def _blender_timeout() -> int:
     # Optional: env var to tune timeout; default 15 min
-    timeout_s = int(os.getenv("BLENDER_TIMEOUT", "900"))
+    return int(os.getenv("BLENDER_TIMEOUT", "900"))
 
-    # Don’t PIPE; start a new process group so we can kill Xvfb+Blender together
-    p = subprocess.Popen(cmd, stdout=None, stderr=None, preexec_fn=os.setsid)
-    try:
-        rc = p.wait(timeout=timeout_s)
-    except subprocess.TimeoutExpired:
-        # Kill the whole group: xvfb-run, Xvfb, and blender
-        os.killpg(os.getpgid(p.pid), signal.SIGTERM)
-        raise HTTPException(status_code=504, detail="Blender transform timed out")
 
+def _run(cmd: list[str], timeout_s: Optional[int] = None, kind: str = "transform") -> None:
+    timeout_s = timeout_s or _blender_timeout()
+
+    # Don’t PIPE; start a new process group so we can kill Xvfb+Blender together
+    started = time.monotonic()
+    with metrics.BLENDER_IN_FLIGHT.labels(kind).track_inprogress():
+        p = subprocess.Popen(cmd, stdout=None, stderr=None, preexec_fn=os.setsid)
+        try:
+            rc = p.wait(timeout=timeout_s)
+        except subprocess.TimeoutExpired:
+            # Kill the whole group: xvfb-run, Xvfb, and blender
+            os.killpg(os.getpgid(p.pid), signal.SIGTERM)
+            metrics.BLENDER_TIMEOUTS.labels(kind).inc()
+            metrics.BLENDER_EXITS.labels(kind, "timeout").inc()
+            raise HTTPException(status_code=504, detail=f"Blender {kind} timed out")
+        finally:
+            metrics.BLENDER_WALL_SECONDS.labels(kind, "cold").observe(time.monotonic() - started)
+
+    metrics.BLENDER_EXITS.labels(kind, str(rc)).inc()
     if rc != 0:
         raise HTTPException(status_code=500, detail=f"Blender exited with code {rc}")
 
 
-def run_blender_mocap(collection_name: str, file_path: str) -> None:
-    if not os.path.exists(MOCAP_SCRIPT):
-        raise HTTPException(status_code=500, detail=f"addon_script not found at {MOCAP_SCRIPT}")
-    cmd = _blender_cmd(["--python", MOCAP_SCRIPT, "--", collection_name, file_path])
-    _run(cmd)
+blender_pool: Optional[BlenderPool] = None
+if BLENDER_POOL_SIZE > 0 and os.path.exists(WORKER_SCRIPT):
+    blender_pool = BlenderPool(
+        BLENDER_POOL_SIZE, _blender_cmd, WORKER_SCRIPT,
+        max_jobs=BLENDER_POOL_MAX_JOBS, max_rss_mb=BLENDER_POOL_MAX_RSS_MB,
+    )
+
+
+def _run_pooled(kind: str, args: dict, timeout_s: Optional[int] = None) -> dict:
+    timeout_s = timeout_s or _blender_timeout()
+    started = time.monotonic()
+    try:
+        with metrics.BLENDER_IN_FLIGHT.labels(kind).track_inprogress():
+            reply = blender_pool.run(kind, args, timeout_s)
+    except BlenderPoolTimeout:
+        metrics.BLENDER_TIMEOUTS.labels(kind).inc()
+        metrics.BLENDER_EXITS.labels(kind, "timeout").inc()
+        raise HTTPException(status_code=504, detail=f"Blender {kind} timed out")
+    except BlenderPoolError as e:
+        metrics.BLENDER_EXITS.labels(kind, "error").inc()
+        raise HTTPException(status_code=500, detail=f"Blender {kind} failed: {e}")
+    finally:
+        metrics.BLENDER_WALL_SECONDS.labels(kind, "pooled").observe(time.monotonic() - started)
+    metrics.BLENDER_EXITS.labels(kind, "ok").inc()
+    return reply
+
+
+def _timings_path(name: str) -> str:
+    """ Sidecar the add-on scripts write their per-stage timings to. """
+    return os.path.join(OUTPUT_DIR, f"{name}.timings.json")
+
+
+def run_blender_mocap(collection_name: str, file_path: str, video_sha256: str | None = None) -> None:
+    """ video_sha256 lets Blender look up cached detection results without hashing the video again. """
+    try:
+        if blender_pool is not None:
+            _run_pooled("mocap", {"collection_name": collection_name, "video_path": file_path,
+                                  "video_sha256": video_sha256})
+            return
+        if not os.path.exists(MOCAP_SCRIPT):
+            raise HTTPException(status_code=500, detail=f"addon_script not found at {MOCAP_SCRIPT}")
+        extras = ["--python", MOCAP_SCRIPT, "--", collection_name, file_path]
+        if video_sha256:
+            extras.append(video_sha256)
+        cmd = _blender_cmd(extras)
+        _run(cmd, kind="mocap")
+    finally:
+        metrics.observe_sidecar("mocap", _timings_path(collection_name))
 
 
 def run_blender_transform(name: str, blend_input_path: str, rig_path: str | None = None, mapping_path: str | None = None) -> None:
@@ -201,102 +402,380 @@ def run_blender_transform(name: str, blend_input_path: str, rig_path: str | None
             raise HTTPException(status_code=400, detail="mapping_path provided but no rig_path; set RIG_BLEND_PATH or upload a rig.")
     if mapping_path and not os.path.exists(mapping_path):
         raise HTTPException(status_code=400, detail=f"Mapping file not found: {mapping_path}")
-    extras = ["--python", TRANSFORM_SCRIPT, "--", name, blend_input_path]
-    if rig_path:
-        extras.append(rig_path)
-    if mapping_path:
-        extras.append(mapping_path)
-    cmd = _blender_cmd(extras)
-    _run(cmd)
+    try:
+        if blender_pool is not None:
+            _run_pooled("transform", {
+                "export_name": name, "blend_input_path": blend_input_path,
+                "rig_path": rig_path, "mapping_path": mapping_path,
+            })
+            return
+        extras = ["--python", TRANSFORM_SCRIPT, "--", name, blend_input_path]
+        if rig_path:
+            extras.append(rig_path)
+        if mapping_path:
+            extras.append(mapping_path)
+        cmd = _blender_cmd(extras)
+        _run(cmd)
+    finally:
+        metrics.observe_sidecar("transform", _timings_path(name))
+
+
+def run_blender_transform_batch(blend_input_path: str, targets: list[dict]) -> list[dict]:
+    """ Bakes one mocap onto several rigs in a single Blender session.
+        targets: [{"export_name", "rig_path", "mapping_path"}], returns one result per target. """
+    if not os.path.exists(TRANSFORM_SCRIPT):
+        raise HTTPException(status_code=500, detail=f"transform_addon_script not found at {TRANSFORM_SCRIPT}")
+    # the session pays startup once, but each rig still needs its own bake
+    timeout_s = _blender_timeout() * len(targets)
+    try:
+        return _run_transform_batch(blend_input_path, targets, timeout_s)
+    finally:
+        for target in targets:
+            metrics.observe_sidecar("transform", _timings_path(target["export_name"]))
+
+
+def _run_transform_batch(blend_input_path: str, targets: list[dict], timeout_s: int) -> list[dict]:
+    if blender_pool is not None:
+        reply = _run_pooled("transform_batch", {"blend_input_path": blend_input_path, "targets": targets}, timeout_s)
+        return reply["output"]
+
+    spec_path = os.path.join(OUTPUT_DIR, f"batch_{uuid.uuid4().hex}.json")
+    result_path = f"{spec_path}.result.json"
+    with open(spec_path, "w", encoding="utf-8") as f:
+        json.dump({"blend_input_path": blend_input_path, "targets": targets}, f)
+    try:
+        _run(_blender_cmd(["--python", TRANSFORM_SCRIPT, "--", "--batch", spec_path]), timeout_s, kind="transform_batch")
+        if not os.path.exists(result_path):
+            raise HTTPException(status_code=500, detail="Blender batch transform wrote no results")
+        with open(result_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        for path in (spec_path, result_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# Background jobs
+JOB_STATUSES = ("queued", "running", "done", "failed")
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="blender-job")
+
+
+def _set_job_status(db: Session, job: Job, status: str, **fields) -> None:
+    job.status = status
+    for key, value in fields.items():
+        setattr(job, key, value)
+    job.updated_at = datetime.utcnow()
+    db.commit()
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """ Clip length in seconds via ffprobe, None when it isn't available or can't tell. """
+    ffprobe = shutil.which(os.getenv("FFPROBE_BIN", "ffprobe"))
+    if not ffprobe:
+        return None
+    try:
+        out = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", path],
+            capture_output=True, text=True, timeout=30,
+        )
+        return float(out.stdout.strip())
+    except (subprocess.TimeoutExpired, OSError, ValueError):
+        return None
+
+
+def _save_joints_record(db: Session, name: str, blend: tuple[str, int], video: tuple[str, int],
+                        video_mime: str, duration: Optional[float] = None) -> JointsFile:
+    # another job may claim the same name between lookup and commit; retry with the next free one
+    for _ in range(5):
+        record = JointsFile(
+            name=generate_unique_name(db, name),
+            blend_sha256=blend[0], blend_size=blend[1], blend_mime=BLEND_MIME,
+            video_sha256=video[0], video_size=video[1], video_mime=video_mime, duration=duration,
+        )
+        db.add(record)
+        ref_blob(db, blend[0], blend[1], BLEND_MIME)
+        ref_blob(db, video[0], video[1], video_mime)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            continue
+        db.refresh(record)
+        return record
+    raise HTTPException(status_code=409, detail=f"Could not allocate a unique name for '{name}'")
+
+
+def _fail_job(db: Session, job: Job, error: str, blend_sha256: Optional[str] = None) -> None:
+    """ Marks the job failed and drops its upload and result blobs unless other rows still use them. """
+    db.rollback()
+    _set_job_status(db, job, "failed", error=error)
+    for sha256 in (blend_sha256, job.video_sha256):
+        if sha256:
+            discard_unreferenced_blob(db, sha256, job.id)
+    if job.upload_path and os.path.exists(job.upload_path):
+        os.remove(job.upload_path)
+
+
+def _run_mocap_job(job_id: str) -> None:
+    """ Runs detection for a queued job inside a worker thread and stores the result. """
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job is None or job.status not in ("queued", "running"):
+            return
+        if job.created_at:
+            metrics.STAGE_SECONDS.labels("mocap", "queue_wait", "api").observe(
+                (datetime.utcnow() - job.created_at).total_seconds())
+        _set_job_status(db, job, "running")
+
+        blend = None
+        try:
+            safe_base = safe_name(job.upload_path)
+            stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            collection_name = f"cgt_DRIVERS_{safe_base}_{stamp}"
+
+            with metrics.STAGE_SECONDS.labels("mocap", "detection", "api").time():
+                run_blender_mocap(collection_name, job.upload_path, job.video_sha256)
+
+            blend_path = find_output_blend(collection_name)
+            if not blend_path:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Expected output .blend not found for '{collection_name}' in {OUTPUT_DIR} or {LEGACY_OUT}",
+                )
+
+            with metrics.STAGE_SECONDS.labels("mocap", "store", "api").time():
+                blend = blob_store.put_file(blend_path)
+                video = (job.video_sha256, job.video_size)
+                duration = probe_duration(job.upload_path)
+                record = _save_joints_record(db, job.name, blend, video, job.video_mime, duration)
+        except HTTPException as e:
+            _fail_job(db, job, str(e.detail), blend[0] if blend else None)
+            return
+        except Exception as e:
+            logging.exception(f"Job {job_id} failed")
+            _fail_job(db, job, str(e), blend[0] if blend else None)
+            return
+
+        _set_job_status(db, job, "done", result_id=record.id, result_name=record.name)
+        if os.path.exists(job.upload_path):
+            os.remove(job.upload_path)
+    finally:
+        db.close()
+
+
+def submit_job(job_id: str) -> None:
+    job_executor.submit(_run_mocap_job, job_id)
+
+
+def resume_pending_jobs() -> None:
+    """ Re-queues jobs interrupted by a restart, failing those whose upload vanished. """
+    db = SessionLocal()
+    try:
+        pending = db.query(Job).filter(Job.status.in_(["queued", "running"])).order_by(Job.created_at).all()
+        for job in pending:
+            if not job.video_sha256 or not blob_store.exists(job.video_sha256):
+                _set_job_status(db, job, "failed", error="Upload missing after restart")
+                continue
+            blob_store.link(job.video_sha256, job.upload_path)
+            _set_job_status(db, job, "queued")
+            submit_job(job.id)
+    finally:
+        db.close()
+
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "name": job.name,
+        "result_id": job.result_id,
+        "result_name": job.result_name,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
 
 
 # FastAPI
 app = FastAPI()
+
+
+# registered before CORS so CORS still wraps the 413
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """ Refuses uploads by their Content-Length before the body gets spooled. """
+    length = request.headers.get("content-length")
+    if MAX_UPLOAD_BYTES and length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        return JSONResponse(status_code=413, content={"detail": f"Upload exceeds {MAX_UPLOAD_MB} MB"})
+    return await call_next(request)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # readable by the browser for list paging and conditional requests
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 
+@app.on_event("startup")
+def on_startup():
+    if blender_pool is not None:
+        blender_pool.start()
+    resume_pending_jobs()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # running jobs stay "running" and get picked up again by resume_pending_jobs
+    job_executor.shutdown(wait=False, cancel_futures=True)
+    if blender_pool is not None:
+        blender_pool.shutdown()
+    glb_cache.close()
+
+
 @app.get("/")
 def read_root():
     return {"message": "Hello, World!"}
 
 
-@app.post("/process/video/")
+async def _ingest_upload(file: UploadFile, kind: str) -> tuple[str, int]:
+    """ Streams an upload into the blob store in fixed-size chunks; known content is stored once. """
+    try:
+        sha256, size = await run_in_threadpool(blob_store.put_stream, file.file, MAX_UPLOAD_BYTES)
+    except BlobTooLarge:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_MB} MB")
+    metrics.UPLOAD_BYTES.labels(kind).observe(size)
+    return sha256, size
+
+
+@app.post("/process/video/", status_code=202)
 async def process_video(
     file: UploadFile = File(...),
     name: str = Form(...),
     db: Session = Depends(get_db),
 ):
+    """ Persists the upload and queues detection; poll GET /jobs/{id} for the result. """
     # Validate video type early
     if file.content_type not in ["video/mp4", "video/quicktime"]:
         raise HTTPException(status_code=400, detail="Only MP4 and MOV videos are supported")
 
-    videodata = await file.read()
+    job_id = uuid.uuid4().hex
+    video_sha256, video_size = await _ingest_upload(file, "video")
 
-    # store upload
+    # expose the blob to Blender under the upload name, prefixed so concurrent uploads don't clash
     original = os.path.basename(file.filename)
-    safe_base = safe_name(original)
-    upload_path = os.path.join(UPLOAD_DIR, original)
-    with open(upload_path, "wb") as f:
-        f.write(videodata)
-
-    # collection/output basename
-    stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    collection_name = f"cgt_DRIVERS_{safe_base}_{stamp}"
-
-    # run Blender
-    run_blender_mocap(collection_name, upload_path)
-
-    # find produced .blend
-    blend_path = find_output_blend(collection_name)
-    if not blend_path:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Expected output .blend not found for '{collection_name}' in {OUTPUT_DIR} or {LEGACY_OUT}",
-        )
-
-    # save to DB with unique logical name
-    with open(blend_path, "rb") as f:
-        filedata = f.read()
+    upload_path = blob_store.link(video_sha256, os.path.join(UPLOAD_DIR, f"{job_id}_{original}"))
 
-    unique_name = generate_unique_name(db, name)
-    record = JointsFile(name=unique_name, filedata=filedata, videodata=videodata)
-    db.add(record)
+    job = Job(
+        id=job_id, kind="mocap", status="queued", name=name, upload_path=upload_path,
+        video_sha256=video_sha256, video_size=video_size, video_mime=video_mime_for(original),
+    )
+    db.add(job)
     db.commit()
-    db.refresh(record)
 
-    return {"message": "Processed and saved successfully", "id": record.id, "name": unique_name}
+    submit_job(job_id)
+    return {"message": "Queued for processing", "job_id": job_id, "status": "queued"}
 
 
-def _transform_to_glb(id: int, name: str, db: Session):
-    base = safe_name(name)
-    glb_path = output_glb_path(base)
-    blend_input = os.path.join(OUTPUT_DIR, f"{base}.blend")
+@app.get("/metrics")
+def get_metrics(db: Session = Depends(get_db)):
+    counts = dict(db.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+    for status in JOB_STATUSES:
+        metrics.JOBS.labels(status).set(counts.get(status, 0))
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
-    # cached?
-    if os.path.exists(glb_path):
-        return FileResponse(path=glb_path, filename=f"{base}.glb", media_type="model/gltf-binary")
 
-    # fetch .blend from DB
-    rec = db.query(JointsFile).filter(JointsFile.id == id).first()
-    if not rec:
-        raise HTTPException(status_code=404, detail=f"No .blend stored under id '{id}'")
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+
+def _transform_script_digest() -> str:
+    """ Version of the transform stage; bump TRANSFORM_VERSION to invalidate cached GLBs. """
+    digest = digest_of(TRANSFORM_SCRIPT) if os.path.exists(TRANSFORM_SCRIPT) else ""
+    return f"{os.getenv('TRANSFORM_VERSION', '')}:{digest}"
+
+
+def _glb_response(path: str, name: str, key: str) -> FileResponse:
+    return FileResponse(
+        path=path, filename=f"{safe_name(name)}.glb", media_type="model/gltf-binary",
+        headers={"ETag": f'"{key}"'},
+    )
+
+
+def _glb_key(rec: JointsFile, rig_path: Optional[str], mapping_path: Optional[str],
+             rig_digest: Optional[str] = None) -> str:
+    if rig_digest is None:
+        rig_digest = digest_of(rig_path) if rig_path and os.path.exists(rig_path) else ""
+    return cache_key(
+        rec.blend_sha256 or "",
+        rig_digest,
+        digest_of(mapping_path) if mapping_path else "",
+        _transform_script_digest(),
+    )
+
+
+def _transform_to_glb(rec: JointsFile, name: str, rig_path: Optional[str], mapping_path: Optional[str],
+                      rig_digest: Optional[str] = None) -> FileResponse:
+    """ Returns the GLB for (joints, rig, mapping), baking it only on a cache miss. """
+    key = _glb_key(rec, rig_path, mapping_path, rig_digest)
+    cached = glb_cache.get(key)
+    metrics.GLB_CACHE_REQUESTS.labels("hit" if cached else "miss").inc()
+    if not cached:
+        # identical requests arriving during a bake wait for it instead of baking again
+        cached = transform_flights.do(key, lambda: _bake_glb(key, rec, name, rig_path, mapping_path))
+    return _glb_response(cached, name, key)
+
 
-    with open(blend_input, "wb") as f:
-        f.write(rec.filedata)
+def _bake_glb(key: str, rec: JointsFile, name: str, rig_path: Optional[str], mapping_path: Optional[str]) -> str:
+    # a flight for the same key may have finished between the cache lookup and now
+    cached = glb_cache.get(key)
+    if cached:
+        return cached
 
-    # run Blender transform
-    run_blender_transform(base, blend_input)
+    # work files are named by key so different inputs never share a path
+    export_name = f"glb_{key}"
+    blend_input = blob_store.link(rec.blend_sha256, os.path.join(OUTPUT_DIR, f"{export_name}.blend"))
 
+    with metrics.STAGE_SECONDS.labels("transform", "transform", "api").time():
+        run_blender_transform(export_name, blend_input, rig_path, mapping_path)
+
+    glb_path = output_glb_path(export_name)
     if not os.path.exists(glb_path):
         raise HTTPException(status_code=500, detail=f"Transform completed but {glb_path} not found")
+    return glb_cache.put(key, glb_path, joint_id=rec.id, name=name)
+
 
-    return FileResponse(path=glb_path, filename=f"{base}.glb", media_type="model/gltf-binary")
+def _rig_path_from_record(db: Session, rig_id: int) -> tuple[str, str]:
+    """ Materialises a stored rig into RIGS_DIR, returns (path, digest of its bytes). """
+    rig_rec = db.query(RigFile).filter(RigFile.id == rig_id).first()
+    if not rig_rec:
+        raise HTTPException(status_code=404, detail=f"No rig with id {rig_id}")
+    if not rig_rec.rig_sha256:
+        raise HTTPException(status_code=404, detail=f"Rig {rig_id} has no stored file")
+    rig_path = blob_store.link(rig_rec.rig_sha256, os.path.join(RIGS_DIR, f"{rig_rec.rig_sha256}.blend"))
+    return rig_path, rig_rec.rig_sha256
+
+
+def _resolve_rig(db: Session, rig_id: Optional[int], rig_ref: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+    """ Rig from the DB (rig_id), from RIGS_DIR (rig_ref) or RIG_BLEND_PATH; returns (path, digest or None). """
+    if rig_id is not None:
+        return _rig_path_from_record(db, rig_id)
+    if rig_ref:
+        cand = os.path.join(RIGS_DIR, os.path.basename(rig_ref))
+        if not os.path.exists(cand):
+            raise HTTPException(status_code=404, detail=f"rig_ref not found: {rig_ref}")
+        return cand, None
+    return os.getenv("RIG_BLEND_PATH"), None
 
 
 @app.get("/transform/rig")
@@ -318,44 +797,14 @@ def transform_rig_get(
     if not name:
         raise HTTPException(status_code=400, detail="Missing required name")
 
-    base = safe_name(name)
-    glb_path = output_glb_path(base)
-    blend_input = os.path.join(OUTPUT_DIR, f"{base}.blend")
-
-    cache_ok = not any([rig_id, rig_ref, mapping_ref])
-    if cache_ok and os.path.exists(glb_path):
-        return FileResponse(path=glb_path, filename=f"{base}.glb", media_type="model/gltf-binary")
-
     rec = db.query(JointsFile).filter(JointsFile.id == joint_pk).first()
-    if not rec:
+    if not rec or not rec.blend_sha256:
         raise HTTPException(status_code=404, detail=f"No .blend stored under id '{joint_pk}'")
-    with open(blend_input, "wb") as f:
-        f.write(rec.filedata)
-
-    rig_path: Optional[str] = None
-    if rig_id is not None:
-        rig_rec = db.query(RigFile).filter(RigFile.id == rig_id).first()
-        if not rig_rec:
-            raise HTTPException(status_code=404, detail=f"No rig with id {rig_id}")
-        rig_base = safe_name(rig_rec.name)
-        rig_path = os.path.join(RIGS_DIR, f"{rig_base}.blend")
-        with open(rig_path, "wb") as f:
-            f.write(rig_rec.rigdata)
-    elif rig_ref:
-        cand = os.path.join(RIGS_DIR, os.path.basename(rig_ref))
-        if not os.path.exists(cand):
-            raise HTTPException(status_code=404, detail=f"rig_ref not found: {rig_ref}")
-        rig_path = cand
-    else:
-        rig_path = os.getenv("RIG_BLEND_PATH")
 
+    rig_path, rig_digest = _resolve_rig(db, rig_id, rig_ref)
     mapping_path = _resolve_mapping_path(mapping_ref, None)
 
-    run_blender_transform(base, blend_input, rig_path, mapping_path)
-
-    if not os.path.exists(glb_path):
-        raise HTTPException(status_code=500, detail=f"Transform completed but {glb_path} not found")
-    return FileResponse(path=glb_path, filename=f"{base}.glb", media_type="model/gltf-binary")
+    return _transform_to_glb(rec, name, rig_path, mapping_path, rig_digest)
 
 
 @app.post("/transform/rig")
@@ -369,21 +818,12 @@ async def transform_rig_post(
     mapping_file: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
 ):
-    base = safe_name(name)
-    glb_path = output_glb_path(base)
-    blend_input = os.path.join(OUTPUT_DIR, f"{base}.blend")
-
-    cache_ok = not any([rig_file, rig_ref, mapping_file, mapping_ref, rig_id])
-    if cache_ok and os.path.exists(glb_path):
-        return FileResponse(path=glb_path, filename=f"{base}.glb", media_type="model/gltf-binary")
-
     rec = db.query(JointsFile).filter(JointsFile.id == id).first()
-    if not rec:
+    if not rec or not rec.blend_sha256:
         raise HTTPException(status_code=404, detail=f"No .blend stored under id '{id}'")
-    with open(blend_input, "wb") as f:
-        f.write(rec.filedata)
 
     rig_path: Optional[str] = None
+    rig_digest: Optional[str] = None
     if rig_file is not None:
         rig_path = _save_rig_upload(rig_file)
     elif rig_ref:
@@ -392,67 +832,279 @@ async def transform_rig_post(
             raise HTTPException(status_code=404, detail=f"rig_ref not found: {rig_ref}")
         rig_path = cand
     elif rig_id is not None:
-        rig_rec = db.query(RigFile).filter(RigFile.id == rig_id).first()
-        if not rig_rec:
-            raise HTTPException(status_code=404, detail=f"No rig with id {rig_id}")
-        rig_base = safe_name(rig_rec.name)
-        rig_path = os.path.join(RIGS_DIR, f"{rig_base}.blend")
-        with open(rig_path, "wb") as f:
-            f.write(rig_rec.rigdata)
+        rig_path, rig_digest = _rig_path_from_record(db, rig_id)
 
     mapping_path = _resolve_mapping_path(mapping_ref, mapping_file)
 
-    # run Blender transform with the rig path
-    run_blender_transform(base, blend_input, rig_path, mapping_path)
+    # run Blender transform with the rig path (or reuse the cached bake)
+    return await run_in_threadpool(_transform_to_glb, rec, name, rig_path, mapping_path, rig_digest)
+
+
+class BatchTarget(BaseModel):
+    joint_id: Optional[int] = None
+    rig_id: Optional[int] = None
+    rig_ref: Optional[str] = None
+    mapping_ref: Optional[str] = None
+
+
+class TransformBatchRequest(BaseModel):
+    name: str
+    # defaults for targets that leave them out: one clip onto many rigs, or many clips onto one rig
+    joint_id: Optional[int] = None
+    rig_id: Optional[int] = None
+    targets: list[BatchTarget]
+
+
+def _transform_batch(req: TransformBatchRequest, db: Session) -> dict:
+    results: list[dict] = []
+    pending: dict[str, dict] = {}  # cache key -> bake target
+    for target in req.targets:
+        joint_id = target.joint_id if target.joint_id is not None else req.joint_id
+        rig_id = target.rig_id if target.rig_id is not None else req.rig_id
+        result = {"joint_id": joint_id, "rig_id": rig_id, "rig_ref": target.rig_ref, "mapping_ref": target.mapping_ref}
+        results.append(result)
+
+        rec = db.query(JointsFile).filter(JointsFile.id == joint_id).first() if joint_id is not None else None
+        if not rec or not rec.blend_sha256:
+            result.update(status="failed", error=f"No .blend stored under id '{joint_id}'")
+            continue
+        try:
+            rig_path, rig_digest = _resolve_rig(db, rig_id, target.rig_ref)
+            if not rig_path:
+                raise HTTPException(status_code=400, detail="No rig given; set rig_id, rig_ref or RIG_BLEND_PATH")
+            mapping_path = _resolve_mapping_path(target.mapping_ref, None)
+        except HTTPException as e:
+            result.update(status="failed", error=str(e.detail))
+            continue
+
+        key = _glb_key(rec, rig_path, mapping_path, rig_digest)
+        result.update(key=key, url=f"/transform/glb/{key}")
+        if glb_cache.get(key):
+            metrics.GLB_CACHE_REQUESTS.labels("hit").inc()
+            result.update(status="done", cached=True)
+            continue
+        metrics.GLB_CACHE_REQUESTS.labels("miss").inc()
+        result.update(status="pending", cached=False)
+        pending.setdefault(key, {"rec": rec, "rig_path": rig_path, "mapping_path": mapping_path})
+
+    # keys another request is baking are waited on, the rest get claimed so bakes of
+    # the same key never share an output file
+    waiting: dict[str, Future] = {}
+    for key in list(pending):
+        future = transform_flights.claim(key)
+        if future is not None:
+            waiting[key] = future
+            del pending[key]
+            continue
+        # a flight for the key may have finished between the cache lookup and the claim
+        cached = glb_cache.get(key)
+        if cached:
+            transform_flights.resolve(key, cached)
+            del pending[key]
+
+    # one Blender session per clip, the drivers get appended once for all of its rigs
+    by_joint: dict[str, list[str]] = {}
+    for key, item in pending.items():
+        by_joint.setdefault(item["rec"].blend_sha256, []).append(key)
+
+    errors: dict[str, str] = {}
+    try:
+        for blend_sha256, keys in by_joint.items():
+            rec = pending[keys[0]]["rec"]
+            blend_input = blob_store.link(blend_sha256, os.path.join(OUTPUT_DIR, f"batch_{blend_sha256}.blend"))
+            targets = [
+                {"export_name": f"glb_{key}", "rig_path": pending[key]["rig_path"],
+                 "mapping_path": pending[key]["mapping_path"]}
+                for key in keys
+            ]
+            try:
+                with metrics.STAGE_SECONDS.labels("transform_batch", "transform", "api").time():
+                    outcomes = run_blender_transform_batch(blend_input, targets)
+            except HTTPException as e:
+                errors.update({key: str(e.detail) for key in keys})
+                for key in keys:
+                    transform_flights.resolve(key, error=e)
+                    del pending[key]
+                continue
+            for key, outcome in zip(keys, outcomes):
+                glb_path = output_glb_path(f"glb_{key}")
+                if not outcome.get("ok") or not os.path.exists(glb_path):
+                    errors[key] = outcome.get("error") or f"Transform completed but {glb_path} not found"
+                    transform_flights.resolve(key, error=HTTPException(status_code=500, detail=errors[key]))
+                else:
+                    transform_flights.resolve(key, glb_cache.put(key, glb_path, joint_id=rec.id, name=req.name))
+                del pending[key]
+    finally:
+        # release claims a failure left unresolved, waiters would block forever otherwise
+        for key in pending:
+            transform_flights.resolve(key, error=HTTPException(status_code=500, detail="Batch transform aborted"))
+
+    for key, future in waiting.items():
+        try:
+            future.result()
+        except HTTPException as e:
+            errors[key] = str(e.detail)
+        except Exception as e:
+            errors[key] = f"{type(e).__name__}: {e}"
+
+    for result in results:
+        if result.get("status") == "pending":
+            key = result["key"]
+            if key in errors:
+                result.update(status="failed", error=errors[key])
+            else:
+                result.update(status="done")
+    return {"name": req.name, "results": results}
+
+
+@app.post("/transform/batch")
+async def transform_batch(req: TransformBatchRequest, db: Session = Depends(get_db)):
+    """
+    Retargets clips onto several rigs; misses for the same clip are baked in one Blender session.
+    Each result carries a url under /transform/glb/{key} to fetch its GLB.
+    """
+    if not req.targets:
+        raise HTTPException(status_code=400, detail="No targets given")
+    return await run_in_threadpool(_transform_batch, req, db)
 
-    if not os.path.exists(glb_path):
-        raise HTTPException(status_code=500, detail=f"Transform completed but {glb_path} not found")
-    return FileResponse(path=glb_path, filename=f"{base}.glb", media_type="model/gltf-binary")
+
+@app.get("/transform/glb/{key}")
+def get_cached_glb(key: str, name: str = "animation"):
+    path = glb_cache.get(key) if len(key) == 64 and key.isalnum() else None
+    if not path:
+        raise HTTPException(status_code=404, detail="GLB not found")
+    return _glb_response(path, name, key)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
 
 
 @app.get("/video/{file_id}")
-def get_video(file_id: int, db: Session = Depends(get_db)):
-    entry = db.query(JointsFile).filter(JointsFile.id == file_id).first()
-    if not entry or not entry.videodata:
+def get_video(file_id: int, request: Request, db: Session = Depends(get_db)):
+    entry = db.query(JointsFile.video_sha256, JointsFile.video_mime).filter(JointsFile.id == file_id).first()
+    if not entry or not entry.video_sha256:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    ext = pathlib.Path(entry.name).suffix.lower()
-    mime = "video/quicktime" if ext == ".mov" else "video/mp4"
+    # blobs are content addressed, so the digest is a strong validator
+    etag = f'"{entry.video_sha256}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=3600"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
 
-    return StreamingResponse(BytesIO(entry.videodata), media_type=mime)
+    # FileResponse answers Range / If-Range with 206 and reads the file in fixed chunks
+    return FileResponse(blob_store.path_for(entry.video_sha256), media_type=entry.video_mime or "video/mp4",
+                        headers=headers)
+
+
+LIST_MAX_LIMIT = 500
+
+
+def _list_page(request: Request, query, id_column, before: Optional[int], since: Optional[int],
+               limit: Optional[int], to_dict) -> Response:
+    """
+    Keyset page of a projection query. Without `limit` all matching rows are returned.
+    Rows are newest first and `before` pages back through older rows; `since` returns only rows
+    newer than the id a client already has, oldest first so a limited page never skips rows.
+    The cursor for the next page (`before`, or `since` when given) is sent as X-Next-Cursor;
+    unchanged pages answer 304 through ETag / Last-Modified.
+    """
+    if before is not None:
+        query = query.filter(id_column < before)
+    if since is not None:
+        query = query.filter(id_column > since)
+    query = query.order_by(id_column.asc() if since is not None else id_column.desc())
+    if limit is None:
+        page = query.all()
+        has_more = False
+    else:
+        limit = max(1, min(limit, LIST_MAX_LIMIT))
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        page = rows[:limit]
+    items = [to_dict(r) for r in page]
+
+    body = json.dumps(items, separators=(",", ":")).encode("utf-8")
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    stamps = [r.created_at for r in page if r.created_at is not None]
+    last_modified = max(stamps).replace(tzinfo=timezone.utc, microsecond=0) if stamps else None
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if has_more:
+        headers["X-Next-Cursor"] = str(items[-1]["id"])
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        not_modified = _not_modified_since(request.headers.get("if-modified-since"), last_modified)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        return last_modified <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
 
 
 @app.get("/joints/")
-def get_joints_files(db: Session = Depends(get_db)):
-    files = db.query(JointsFile).all()
-    return [{"id": f.id, "name": f.name} for f in files]
+def get_joints_files(
+    request: Request,
+    before: Optional[int] = None,
+    since: Optional[int] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    query = db.query(JointsFile.id, JointsFile.name, JointsFile.created_at, JointsFile.blend_size, JointsFile.duration)
+    return _list_page(request, query, JointsFile.id, before, since, limit, lambda f: {
+        "id": f.id, "name": f.name, "created_at": _iso(f.created_at), "size": f.blend_size, "duration": f.duration,
+    })
 
 
 @app.get("/joints/{file_id}")
 def download_joints_file(file_id: int, db: Session = Depends(get_db)):
     rec = db.query(JointsFile).filter(JointsFile.id == file_id).first()
-    if not rec:
+    if not rec or not rec.blend_sha256:
         raise HTTPException(status_code=404, detail="File not found")
     out = os.path.join("/tmp", f"{rec.name}.blend")
-    with open(out, "wb") as f:
-        f.write(rec.filedata)
+    shutil.copyfile(blob_store.path_for(rec.blend_sha256), out)
     return {"message": "File restored", "filepath": out}
 
 
 @app.get("/rigs/")
-def get_rigs_files(db: Session = Depends(get_db)):
-    files = db.query(RigFile).all()
-    return [{"id": f.id, "name": f.name} for f in files]
+def get_rigs_files(
+    request: Request,
+    before: Optional[int] = None,
+    since: Optional[int] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    query = db.query(RigFile.id, RigFile.name, RigFile.created_at, RigFile.rig_size)
+    return _list_page(request, query, RigFile.id, before, since, limit, lambda f: {
+        "id": f.id, "name": f.name, "created_at": _iso(f.created_at), "size": f.rig_size,
+    })
 
 
 @app.get("/rigs/{file_id}")
 def download_rig_file(file_id: int, db: Session = Depends(get_db)):
     rec = db.query(RigFile).filter(RigFile.id == file_id).first()
-    if not rec:
+    if not rec or not rec.rig_sha256:
         raise HTTPException(status_code=404, detail="File not found")
     out = os.path.join("/tmp", f"{rec.name}.blend")
-    with open(out, "wb") as f:
-        f.write(rec.rigdata)
+    shutil.copyfile(blob_store.path_for(rec.rig_sha256), out)
     return {"message": "File restored", "filepath": out}
 
 
@@ -465,16 +1117,18 @@ async def upload_rig(
     if not file.filename.lower().endswith(".blend"):
         raise HTTPException(status_code=400, detail="Only rigified .blend files are supported")
 
-    rigdata = await file.read()
+    rig_sha256, rig_size = await _ingest_upload(file, "rig")
 
     original = os.path.basename(file.filename)
     upload_path = os.path.join(RIG_UPLOAD, original)
-    with open(upload_path, "wb") as f:
-        f.write(rigdata)
+    if os.path.exists(upload_path):
+        os.remove(upload_path)
+    blob_store.link(rig_sha256, upload_path)
 
     unique_name = generate_unique_name(db, name)
-    record = RigFile(name=unique_name, rigdata=rigdata)
+    record = RigFile(name=unique_name, rig_sha256=rig_sha256, rig_size=rig_size, rig_mime=BLEND_MIME)
     db.add(record)
+    ref_blob(db, rig_sha256, rig_size, BLEND_MIME)
     db.commit()
     db.refresh(record)
 
@@ -0,0 +1,60 @@
+# backend/app/metrics.py
+"""Prometheus metrics for the mocap / transform pipeline.
+
+API-side timings are observed directly. Timings from inside Blender come from
+``<name>.timings.json`` sidecars the add-on scripts write next to their output
+(``{"stages": {"<stage>": seconds}}``), see ``observe_sidecar``.
+"""
+from __future__ import annotations
+
+import json, os, logging
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 900, 1800)
+BYTES_BUCKETS = (1e4, 1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 2.5e8, 5e8, 1e9, 2e9)
+
+UPLOAD_BYTES = Histogram(
+    "texel_upload_bytes", "Size of accepted uploads", ["kind"], buckets=BYTES_BUCKETS)
+STAGE_SECONDS = Histogram(
+    "texel_stage_seconds", "Duration of a pipeline stage", ["pipeline", "stage", "source"],
+    buckets=SECONDS_BUCKETS)
+BLENDER_WALL_SECONDS = Histogram(
+    "texel_blender_wall_seconds", "Wall time of a Blender run as seen by the API", ["kind", "mode"],
+    buckets=SECONDS_BUCKETS)
+
+GLB_CACHE_REQUESTS = Counter(
+    "texel_glb_cache_requests_total", "GLB cache lookups on the transform path", ["result"])
+BLENDER_EXITS = Counter(
+    "texel_blender_exits_total", "Finished Blender runs by exit code (pooled runs report ok / error)",
+    ["kind", "code"])
+BLENDER_TIMEOUTS = Counter(
+    "texel_blender_timeouts_total", "Blender runs killed after BLENDER_TIMEOUT", ["kind"])
+
+BLENDER_IN_FLIGHT = Gauge(
+    "texel_blender_in_flight", "Blender runs currently executing", ["kind"])
+JOBS = Gauge(
+    "texel_jobs", "Background jobs by status (queued is the queue depth)", ["status"])
+
+
+def observe_sidecar(pipeline: str, path: str) -> dict:
+    """ Records the stage timings a Blender script wrote to `path` and removes the file. """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            stages = json.load(f).get("stages", {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logging.warning(f"Unreadable timings sidecar {path}")
+        stages = {}
+    for stage, seconds in stages.items():
+        STAGE_SECONDS.labels(pipeline, stage, "blender").observe(float(seconds))
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return stages
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
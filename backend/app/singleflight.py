@@ -0,0 +1,54 @@
+# backend/app/singleflight.py
+"""Collapses concurrent calls for the same key into one execution.
+
+The first caller for a key runs the function, callers arriving while it runs
+block on the same future and get its result (or its exception). Work that isn't
+a single call, like a batch baking many keys, uses claim/resolve directly.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        future = self.claim(key)
+        if future is not None:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.resolve(key, error=e)
+            raise
+        self.resolve(key, result)
+        return result
+
+    def claim(self, key: Hashable) -> Optional[Future]:
+        """Registers the caller as running key; returns None then, or the future of the running call."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                self._calls[key] = Future()
+            return future
+
+    def resolve(self, key: Hashable, result=None, error: Optional[BaseException] = None) -> None:
+        """Completes a claimed key and hands result (or error) to the callers waiting on it."""
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
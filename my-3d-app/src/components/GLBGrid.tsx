@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import Scene from "../Scene";
 
 interface JointFile {
@@ -13,13 +13,23 @@ interface GLBGridProps {
 
 const GLBGrid: React.FC<GLBGridProps> = ({ onSelectGLB, refreshTrigger }) => {
   const [files, setFiles] = useState<JointFile[]>([]);
+  const newestIdRef = useRef<number | null>(null);
 
   useEffect(() => {
     const fetchFiles = async () => {
       try {
-        const res = await fetch("http://127.0.0.1:8000/joints/");
-        const data = await res.json();
-        setFiles(data);
+        // after the first load only ask for files newer than the ones shown
+        const since = newestIdRef.current;
+        const url = since === null
+          ? "http://127.0.0.1:8000/joints/"
+          : `http://127.0.0.1:8000/joints/?since=${since}`;
+        const res = await fetch(url);
+        const data: JointFile[] = await res.json();
+        if (data.length > 0) {
+          newestIdRef.current = Math.max(since ?? 0, ...data.map((f) => f.id));
+        }
+        // newer files arrive oldest first, the grid shows the newest first
+        setFiles((prev) => (since === null ? data : [...data.reverse(), ...prev]));
       } catch (error) {
         console.error("Failed to fetch joint files", error);
       }
@@ -23,6 +23,16 @@ const GenerateFromVideo: React.FC<GenerateFromVideoProps> = ({ changeRigId, trig
 
   const isValidName = (name: string) => /^[a-zA-Z0-9_-]+$/.test(name);
 
+  const waitForJob = async (jobId: string, intervalMs = 2000) => {
+    while (true) {
+      const res = await fetch(`http://127.0.0.1:8000/jobs/${jobId}`);
+      const job = await res.json();
+      if (!res.ok) return { status: "failed", error: job.detail };
+      if (job.status === "done" || job.status === "failed") return job;
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  };
+
   useEffect(() => {
     async function loadMetadata() {
       try {
@@ -80,11 +90,20 @@ const GenerateFromVideo: React.FC<GenerateFromVideoProps> = ({ changeRigId, trig
       });
       const data = await res.json();
 
-      if (res.ok) {
-        setStatus(`✅ Animation saved as: ${data.name}`);
+      if (!res.ok) {
+        setError(data.detail || "Something went wrong.");
+        return;
+      }
+
+      // detection runs in the background; poll the job until it settles
+      setStatus("⏳ Processing video...");
+      const job = await waitForJob(data.job_id);
+      if (job.status === "done") {
+        setStatus(`✅ Animation saved as: ${job.result_name}`);
         triggerGLBRefresh();
       } else {
-        setError(data.error || "Something went wrong.");
+        setStatus("");
+        setError(job.error || "Processing failed.");
       }
     } catch {
       setError("Upload failed. Server error.");